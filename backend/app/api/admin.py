@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Depends
+from datetime import datetime
+from typing import Optional
+from app.dependencies import get_vector_db, get_kb_watcher
+import logging
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+def _iso(timestamp: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(timestamp).isoformat() if timestamp else None
+
+@router.get("/index")
+async def index_status(vector_db=Depends(get_vector_db), watcher=Depends(get_kb_watcher)):
+    """Current knowledge base index version, when it was last (re)loaded, and the file watcher"""
+    info = vector_db.index_info()
+    last_reload = dict(vector_db.last_reload)
+    if last_reload:
+        last_reload["reloaded_at"] = _iso(last_reload["reloaded_at"])
+
+    watcher_stats = watcher.stats()
+    watcher_stats["last_change_at"] = _iso(watcher_stats["last_change_at"])
+    return {
+        "index_version": vector_db.index_version,
+        "loaded": info["loaded"],
+        "loaded_at": _iso(info.get("loaded_at")),
+        "sections": info.get("documents"),
+        "last_reload": last_reload or None,
+        "watcher": watcher_stats,
+    }
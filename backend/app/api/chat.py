@@ -1,9 +1,21 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import Any
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import StreamingResponse
+from typing import Any, Dict
 import time
+import asyncio
 import logging
+from app.config import settings
 from app.models import ChatRequest, ChatResponse, LanguageDetection, EmotionDetection, RetrievedContext
-from app.dependencies import get_language_detector, get_emotion_detector, get_vector_db, get_answer_generator
+from app.core.streaming import format_sse
+from app.core.cancellation import Deadline
+from app.dependencies import (
+    get_language_detector, get_emotion_detector, get_vector_db, get_answer_generator,
+    get_multi_head_detector, get_classifier_batcher, get_embedding_batcher, get_answer_cache,
+    get_stage_pools, get_deadline
+)
+from app.utils.logger import log_performance
+from app.utils.metrics import ANSWERS, CHAT_STAGE_SECONDS, STAGE_SECONDS
+from app.utils.tracing import span, annotate
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -16,109 +28,97 @@ CONFIDENCE_THRESHOLD = 0.3
 @router.post("/chat", response_model=ChatResponse)
 async def chat(
     request: ChatRequest,
+    http_request: Request,
     language_detector=Depends(get_language_detector),
     emotion_detector=Depends(get_emotion_detector),
     vector_db=Depends(get_vector_db),
-    answer_generator=Depends(get_answer_generator)
+    answer_generator=Depends(get_answer_generator),
+    multi_head_detector=Depends(get_multi_head_detector),
+    classifier_batcher=Depends(get_classifier_batcher),
+    embedding_batcher=Depends(get_embedding_batcher),
+    answer_cache=Depends(get_answer_cache),
+    pools=Depends(get_stage_pools),
+    deadline: Deadline = Depends(get_deadline)
 ) -> Any:
     """Process chat with comprehensive error handling"""
     
+    # A client that goes away cancels the deadline, which abandons the remaining stages
+    disconnect_watch = asyncio.create_task(_watch_disconnect(http_request, deadline))
     try:
         start_time = time.time()
+        stage_timings: Dict[str, float] = {}
         
-        # Prepare input
-        full_question = request.question
-        has_attachment = False
+        full_question, has_attachment = _prepare_question(request)
+        search_query = full_question if has_attachment else request.question
         
-        if hasattr(request, 'extracted_text') and request.extracted_text:
-            has_attachment = True
-            # Limit extracted text to prevent overload
-            truncated_text = request.extracted_text[:1000]
-            full_question = f"{request.question}\n\n[Document Content]:\n{truncated_text}"
-            logger.info(f"Processing with attachment ({len(request.extracted_text)} chars)")
-        
-        # 1. Language Detection with fallback
-        try:
-            language, lang_confidence = language_detector.predict(request.question)
-            if lang_confidence < CONFIDENCE_THRESHOLD:
-                logger.warning(f"Low language confidence: {lang_confidence}")
-                language = DEFAULT_LANGUAGE
-                lang_confidence = 0.5
-        except Exception as e:
-            logger.error(f"Language detection failed: {e}")
-            language = DEFAULT_LANGUAGE
-            lang_confidence = 0.0
-            
-        language_result = LanguageDetection(language=language, confidence=lang_confidence)
-        
-        # 2. Emotion Detection with fallback  
-        try:
-            emotion, emo_confidence = emotion_detector.predict(request.question)
-            if emo_confidence < CONFIDENCE_THRESHOLD:
-                logger.warning(f"Low emotion confidence: {emo_confidence}")
-                emotion = DEFAULT_EMOTION
-                emo_confidence = 0.5
-        except Exception as e:
-            logger.error(f"Emotion detection failed: {e}")
-            emotion = DEFAULT_EMOTION
-            emo_confidence = 0.0
-            
-        emotion_result = EmotionDetection(emotion=emotion, confidence=emo_confidence)
+        # 1-3. Language/Emotion Detection and Knowledge Retrieval are independent: run them concurrently
+        (language_result, emotion_result), (query_embedding, retrieved_docs, contexts) = await asyncio.gather(
+            _timed_stage(stage_timings, "classification", _within_deadline(
+                deadline, "classification", _detect_language_and_emotion(
+                    request.question, language_detector, emotion_detector, pools.classifier,
+                    multi_head_detector, classifier_batcher
+                ), _default_detections()
+            )),
+            _timed_stage(stage_timings, "retrieval", _within_deadline(
+                deadline, "retrieval", _retrieve(
+                    search_query, vector_db, pools.retrieval, embedding_batcher
+                ), (None, [], [])
+            ))
+        )
+        language = language_result.language
+        emotion = emotion_result.emotion
         
-        # 3. Knowledge Retrieval with fallback
-        contexts = []
-        retrieved_docs = []
-        try:
-            search_query = full_question if has_attachment else request.question
-            retrieved_docs = vector_db.search(search_query, top_k=4)
-            
-            contexts = [
-                RetrievedContext(
-                    content=doc['content'][:500],  # Limit content size
-                    title=doc['title'],
-                    score=doc['score'],
-                    source=doc.get('source')
+        # Near-identical question already answered? (answers to uploaded documents are never cached)
+        use_answer_cache = answer_cache is not None and not has_attachment and query_embedding is not None
+        if use_answer_cache:
+            cached = answer_cache.get(query_embedding, language, emotion, vector_db.index_version)
+            if cached:
+                logger.info(f"Answer cache hit (similarity {cached['similarity']:.3f})")
+                _log_stage_timings(stage_timings, start_time, "answer_cache", deadline)
+                ANSWERS.inc(method="answer_cache")
+                annotate(method="answer_cache", similarity=round(cached['similarity'], 3))
+                return ChatResponse(
+                    answer=cached['answer'],
+                    language=language_result,
+                    emotion=emotion_result,
+                    contexts=cached['contexts'],
+                    processing_time=time.time() - start_time,
+                    has_attachment=has_attachment,
+                    stage_timings=stage_timings
                 )
-                for doc in retrieved_docs
-            ]
-        except Exception as e:
-            logger.error(f"Knowledge retrieval failed: {e}")
-            # Continue without contexts
             
         # 4. Answer Generation with fallback
+        method = "fallback"
         try:
             # Prepare contexts for generator
-            answer_contexts = []
-            
-            # Add extracted text if available
-            if has_attachment and hasattr(request, 'extracted_text'):
-                answer_contexts.append({
-                    'content': request.extracted_text[:500],
-                    'title': 'Uploaded Document',
-                    'score': 1.0
-                })
-            
-            # Add retrieved contexts
-            if retrieved_docs:
-                answer_contexts.extend([
-                    {'content': doc['content'], 'title': doc['title'], 'score': doc['score']}
-                    for doc in retrieved_docs[:3]
-                ])
+            answer_contexts = _build_answer_contexts(request, has_attachment, retrieved_docs)
             
             # Call the answer generator
             if hasattr(answer_generator, 'generate_answer'):
-                # Using the new generator with error handling
-                answer_result = answer_generator.generate_answer(
+                # Run off the event loop: waiting for a generation slot must not block other requests
+                answer_result = await _timed_stage(stage_timings, "generation", pools.generation.run(
+                    answer_generator.generate_answer,
                     question=request.question,
                     language=language,
                     emotion=emotion,
                     contexts=answer_contexts if answer_contexts else [],
-                    extracted_text=request.extracted_text if hasattr(request, 'extracted_text') else None
-                )
+                    extracted_text=request.extracted_text if hasattr(request, 'extracted_text') else None,
+                    cancel=deadline
+                ))
                 
                 # Extract answer from result
                 if isinstance(answer_result, dict):
                     answer = answer_result.get('answer', '')
+                    method = answer_result.get('method') or method
+                    if answer_result.get('method') == 'retrieval_only_deadline':
+                        deadline.skip("generation", answer_result.get('cancelled') or "budget too small")
+                    # Only cache real model answers, never degraded fallbacks
+                    if use_answer_cache and answer_result.get('method') == 'claire_rag':
+                        answer_cache.put(
+                            query_embedding, language, emotion,
+                            {'answer': answer, 'contexts': contexts},
+                            vector_db.index_version
+                        )
                 else:
                     answer = str(answer_result)
             else:
@@ -129,18 +129,24 @@ async def chat(
                     emotion=emotion,
                     contexts=answer_contexts
                 )
+                method = "simple"
                 
             # Validate answer
             if not answer or len(answer.strip()) < 10:
                 answer = _get_fallback_answer(language)
+                method = "fallback"
                 
         except Exception as e:
             logger.error(f"Answer generation failed: {e}")
             import traceback
             logger.error(f"Traceback: {traceback.format_exc()}")
             answer = _get_fallback_answer(language)
+            method = "fallback"
         
         processing_time = time.time() - start_time
+        _log_stage_timings(stage_timings, start_time, "generated", deadline)
+        ANSWERS.inc(method=method)
+        annotate(method=method)
         
         return ChatResponse(
             answer=answer,
@@ -148,13 +154,16 @@ async def chat(
             emotion=emotion_result,
             contexts=contexts,
             processing_time=processing_time,
-            has_attachment=has_attachment
+            has_attachment=has_attachment,
+            stage_timings=stage_timings
         )
         
     except Exception as e:
         logger.error(f"Chat endpoint critical error: {e}")
         import traceback
         logger.error(f"Full traceback: {traceback.format_exc()}")
+        ANSWERS.inc(method="error")
+        annotate(method="error", reason=str(e))
         
         # Return minimal safe response
         return ChatResponse(
@@ -165,6 +174,301 @@ async def chat(
             processing_time=0.0,
             has_attachment=False
         )
+    finally:
+        disconnect_watch.cancel()
+
+
+@router.post("/stream")
+async def chat_stream(
+    request: ChatRequest,
+    http_request: Request,
+    language_detector=Depends(get_language_detector),
+    emotion_detector=Depends(get_emotion_detector),
+    vector_db=Depends(get_vector_db),
+    answer_generator=Depends(get_answer_generator),
+    multi_head_detector=Depends(get_multi_head_detector),
+    classifier_batcher=Depends(get_classifier_batcher),
+    embedding_batcher=Depends(get_embedding_batcher),
+    pools=Depends(get_stage_pools),
+    deadline: Deadline = Depends(get_deadline)
+):
+    """
+    Stream the chat answer as Server-Sent Events:
+    one 'metadata' event (language, emotion, contexts), 'token' events as the
+    model generates, then a 'done' event with the final answer and timings.
+    """
+    start_time = time.time()
+    
+    full_question, has_attachment = _prepare_question(request)
+    search_query = full_question if has_attachment else request.question
+    (language_result, emotion_result), (_, retrieved_docs, contexts) = await asyncio.gather(
+        _within_deadline(deadline, "classification", _detect_language_and_emotion(
+            request.question, language_detector, emotion_detector, pools.classifier,
+            multi_head_detector, classifier_batcher
+        ), _default_detections()),
+        _within_deadline(deadline, "retrieval", _retrieve(
+            search_query, vector_db, pools.retrieval, embedding_batcher
+        ), (None, [], []))
+    )
+    answer_contexts = _build_answer_contexts(request, has_attachment, retrieved_docs)
+    
+    async def event_stream():
+        yield format_sse("metadata", {
+            "language": language_result.model_dump(),
+            "emotion": emotion_result.model_dump(),
+            "contexts": [ctx.model_dump() for ctx in contexts],
+            "has_attachment": has_attachment
+        })
+        
+        events = answer_generator.generate_answer_stream(
+            question=request.question,
+            language=language_result.language,
+            emotion=emotion_result.emotion,
+            contexts=answer_contexts,
+            extracted_text=request.extracted_text,
+            cancel=deadline
+        )
+        # Starlette cancels this task when the client disconnects, usually while a
+        # generation thread is inside next(events): cancelling the deadline stops
+        # decoding within one token, and the pool closes the generator (releasing
+        # its slot) once that thread is done with it
+        stream = pools.generation.iterate(events, on_cancel=lambda: deadline.cancel("client disconnected"))
+        finished = False
+        try:
+            async for event in stream:
+                if event['type'] == 'token':
+                    if await http_request.is_disconnected():
+                        logger.info("Client disconnected, stopping stream")
+                        deadline.cancel("client disconnected")
+                        break
+                    yield format_sse("token", {"text": event['text']})
+                else:
+                    answer = event.get('answer', '')
+                    method = event.get('method') or "fallback"
+                    if not answer or len(answer.strip()) < 10:
+                        answer = _get_fallback_answer(language_result.language)
+                        method = "fallback"
+                    ANSWERS.inc(method=method)
+                    finished = True
+                    yield format_sse("done", {
+                        "answer": answer,
+                        "method": method,
+                        "time_to_first_token": event.get('time_to_first_token'),
+                        "tokens_per_second": event.get('tokens_per_second'),
+                        "processing_time": time.time() - start_time
+                    })
+        except Exception as e:
+            logger.error(f"Streaming chat failed: {e}")
+            ANSWERS.inc(method="error")
+            yield format_sse("error", {"answer": _get_fallback_answer(language_result.language)})
+        finally:
+            if not finished:
+                deadline.cancel("client disconnected")
+            await stream.aclose()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _prepare_question(request: ChatRequest):
+    """Return (full_question, has_attachment) with any extracted document text appended"""
+    full_question = request.question
+    has_attachment = False
+    
+    if hasattr(request, 'extracted_text') and request.extracted_text:
+        has_attachment = True
+        # Limit extracted text to prevent overload
+        truncated_text = request.extracted_text[:1000]
+        full_question = f"{request.question}\n\n[Document Content]:\n{truncated_text}"
+        logger.info(f"Processing with attachment ({len(request.extracted_text)} chars)")
+    
+    return full_question, has_attachment
+
+async def _watch_disconnect(http_request: Request, deadline: Deadline):
+    """Cancel deadline as soon as the client has gone away"""
+    while not deadline.cancelled:
+        if await http_request.is_disconnected():
+            logger.info(f"Client disconnected, abandoning {deadline.route}")
+            deadline.cancel("client disconnected")
+            return
+        await asyncio.sleep(settings.DISCONNECT_POLL_SECONDS)
+
+async def _within_deadline(deadline: Deadline, stage: str, awaitable, fallback):
+    """
+    Await a stage in what is left of the request's budget (minus the reserve
+    for answering). A stage that has no budget left is not started, and one
+    that overruns is abandoned; both return fallback.
+    """
+    if not deadline.allows(settings.DEADLINE_RESERVE_SECONDS):
+        awaitable.close()
+        deadline.skip(stage, deadline.reason or "no budget left")
+        annotate(skipped=deadline.skipped[stage])
+        return fallback
+    try:
+        return await asyncio.wait_for(awaitable, timeout=deadline.remaining() - settings.DEADLINE_RESERVE_SECONDS)
+    except asyncio.TimeoutError:
+        deadline.skip(stage, "ran out of budget")
+        annotate(skipped=deadline.skipped[stage])
+        return fallback
+
+async def _timed_stage(stage_timings: Dict[str, float], stage: str, awaitable):
+    """Await awaitable, as a trace span, and record its wall time under stage"""
+    start = time.perf_counter()
+    try:
+        with span(stage):
+            return await awaitable
+    finally:
+        stage_timings[stage] = time.perf_counter() - start
+
+def _log_stage_timings(stage_timings: Dict[str, float], start_time: float, outcome: str, deadline: Deadline):
+    duration = time.time() - start_time
+    log_performance(
+        logger, "chat_pipeline", duration, outcome=outcome,
+        budget=deadline.timeout, budget_left=deadline.remaining(), skipped=sorted(deadline.skipped), **stage_timings
+    )
+    for stage, seconds in stage_timings.items():
+        CHAT_STAGE_SECONDS.observe(seconds, stage=stage)
+    CHAT_STAGE_SECONDS.observe(duration, stage="total")
+
+async def _measured(stage: str, awaitable):
+    """Await awaitable as a trace span and observe its wall time in the stage latency histogram"""
+    with span(stage), STAGE_SECONDS.time(stage=stage):
+        return await awaitable
+
+def _default_detections():
+    """Language/emotion used when classification is skipped for lack of budget"""
+    return (
+        LanguageDetection(language=DEFAULT_LANGUAGE, confidence=0.0),
+        EmotionDetection(emotion=DEFAULT_EMOTION, confidence=0.0)
+    )
+
+async def _detect_language_and_emotion(
+    question: str,
+    language_detector,
+    emotion_detector,
+    pool,
+    multi_head_detector=None,
+    classifier_batcher=None
+):
+    """Run both classifiers (in the classifier pool) with per-classifier fallbacks"""
+    # Shared backbone / micro-batcher: tokenize and encode once for both classifiers
+    predictions = None
+    try:
+        if classifier_batcher is not None:
+            predictions = await _measured("language_emotion_detection", classifier_batcher.submit(question))
+        elif multi_head_detector is not None:
+            predictions = await _measured("language_emotion_detection", pool.run(multi_head_detector.predict, question))
+    except Exception as e:
+        logger.error(f"Shared language/emotion detection failed: {e}")
+    
+    if not predictions:
+        # Separate models: run both at once, each failure handled below
+        predictions = await asyncio.gather(
+            _measured("language_detection", pool.run(language_detector.predict, question)),
+            _measured("emotion_detection", pool.run(emotion_detector.predict, question)),
+            return_exceptions=True
+        )
+    language_prediction, emotion_prediction = predictions
+    
+    # 1. Language Detection with fallback
+    try:
+        if isinstance(language_prediction, Exception):
+            raise language_prediction
+        language, lang_confidence = language_prediction
+        if lang_confidence < CONFIDENCE_THRESHOLD:
+            logger.warning(f"Low language confidence: {lang_confidence}")
+            language = DEFAULT_LANGUAGE
+            lang_confidence = 0.5
+    except Exception as e:
+        logger.error(f"Language detection failed: {e}")
+        language = DEFAULT_LANGUAGE
+        lang_confidence = 0.0
+    
+    # 2. Emotion Detection with fallback  
+    try:
+        if isinstance(emotion_prediction, Exception):
+            raise emotion_prediction
+        emotion, emo_confidence = emotion_prediction
+        if emo_confidence < CONFIDENCE_THRESHOLD:
+            logger.warning(f"Low emotion confidence: {emo_confidence}")
+            emotion = DEFAULT_EMOTION
+            emo_confidence = 0.5
+    except Exception as e:
+        logger.error(f"Emotion detection failed: {e}")
+        emotion = DEFAULT_EMOTION
+        emo_confidence = 0.0
+    
+    return (
+        LanguageDetection(language=language, confidence=lang_confidence),
+        EmotionDetection(emotion=emotion, confidence=emo_confidence)
+    )
+
+async def _embed_query(search_query: str, vector_db, pool, embedding_batcher=None):
+    """Normalized query embedding (cached, else micro-batched when enabled); None on failure"""
+    with span("query_embedding"):
+        try:
+            cached = vector_db.lookup_query_embedding(search_query)
+            if cached is not None:
+                annotate(cached=True)
+                return cached
+            if embedding_batcher is not None:
+                return await embedding_batcher.submit(search_query)
+            return (await pool.run(vector_db.encode_queries, [search_query]))[0]
+        except Exception as e:
+            logger.error(f"Query embedding failed: {e}")
+            annotate(error=str(e))
+            return None
+
+async def _retrieve(search_query: str, vector_db, pool, embedding_batcher=None):
+    """Embed and search in the retrieval pool; returns (query_embedding, retrieved_docs, contexts)"""
+    query_embedding = await _embed_query(search_query, vector_db, pool, embedding_batcher)
+    retrieved_docs, contexts = await pool.run(_retrieve_contexts, search_query, vector_db, query_embedding)
+    return query_embedding, retrieved_docs, contexts
+
+def _retrieve_contexts(search_query: str, vector_db, query_embedding=None):
+    """Return (retrieved_docs, response contexts); empty on failure"""
+    contexts = []
+    retrieved_docs = []
+    try:
+        retrieved_docs = vector_db.search(search_query, top_k=4, query_embedding=query_embedding)
+        
+        contexts = [
+            RetrievedContext(
+                content=doc['content'][:500],  # Limit content size
+                title=doc['title'],
+                score=doc['score'],
+                source=doc.get('source')
+            )
+            for doc in retrieved_docs
+        ]
+    except Exception as e:
+        logger.error(f"Knowledge retrieval failed: {e}")
+        # Continue without contexts
+    
+    return retrieved_docs, contexts
+
+def _build_answer_contexts(request: ChatRequest, has_attachment: bool, retrieved_docs: list) -> list:
+    """Contexts passed to the answer generator: uploaded document first, then top 3 hits"""
+    answer_contexts = []
+    
+    # Add extracted text if available
+    if has_attachment and hasattr(request, 'extracted_text'):
+        answer_contexts.append({
+            'content': request.extracted_text[:500],
+            'title': 'Uploaded Document',
+            'score': 1.0
+        })
+    
+    # Add retrieved contexts
+    if retrieved_docs:
+        answer_contexts.extend([
+            {'content': doc['content'], 'title': doc['title'], 'score': doc['score']}
+            for doc in retrieved_docs[:3]
+        ])
+    
+    return answer_contexts
 
 def _generate_simple_answer(question: str, language: str, emotion: str, contexts: list) -> str:
     """Simple answer generation fallback"""
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from app.dependencies import get_trace_buffer
+import logging
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+@router.get("/traces")
+async def recent_traces(
+    limit: int = Query(20, ge=1, le=1000),
+    route: str = Query(None, description="Only traces whose route starts with this"),
+    traces=Depends(get_trace_buffer)
+):
+    """The last traced requests, newest first: span tree, durations, answer method and fallback reasons"""
+    recent = [trace for trace in traces.recent() if not route or trace.route.startswith(route)]
+    return [trace.to_dict() for trace in recent[:limit]]
+
+@router.get("/traces/{trace_id}")
+async def trace_detail(trace_id: str, traces=Depends(get_trace_buffer)):
+    """One trace by the id returned in the X-Trace-Id header"""
+    trace = traces.get(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace not found (expired from the buffer or never recorded)")
+    return trace.to_dict()
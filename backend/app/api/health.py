@@ -1,7 +1,12 @@
 from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse
 from datetime import datetime
 from app.models import HealthResponse
-from app.dependencies import get_language_detector, get_emotion_detector, get_vector_db, get_answer_generator
+from app.dependencies import (
+    get_language_detector, get_emotion_detector, get_vector_db, get_answer_generator,
+    get_classifier_batcher, get_embedding_batcher, get_answer_cache, get_stage_pools, get_thread_budget,
+    get_startup_state
+)
 import os
 import pytesseract
 import logging
@@ -9,6 +14,17 @@ import logging
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+@router.get("/live")
+async def liveness():
+    """Process is up and the event loop answers; says nothing about the models"""
+    return {"status": "alive", "uptime": get_startup_state().stats()["uptime"]}
+
+@router.get("/ready")
+async def readiness():
+    """Models loaded and warmed; 503 until then, so load balancers only route to warm instances"""
+    stats = get_startup_state().stats()
+    return JSONResponse(status_code=200 if stats["ready"] else 503, content=stats)
+
 @router.get("/health", response_model=HealthResponse)
 async def health_check(
     language_detector=Depends(get_language_detector),
@@ -113,4 +129,58 @@ async def health_check(
         vector_db_ready=vector_db_ready,
         ocr_available=ocr_available,
         timestamp=datetime.now()
-    )
\ No newline at end of file
+    )
+
+@router.get("/health/batching")
+async def batching_stats():
+    """Micro-batcher batch sizes and queue waits since startup"""
+    stats = {}
+    for batcher in (get_classifier_batcher(), get_embedding_batcher()):
+        if batcher is not None:
+            stats[batcher.name] = {
+                "max_batch_size": batcher.max_batch_size,
+                "max_wait_ms": batcher.max_wait * 1000,
+                **batcher.stats.to_dict()
+            }
+    return {"enabled": bool(stats), "batchers": stats}
+
+@router.get("/health/generation")
+async def generation_stats(answer_generator=Depends(get_answer_generator)):
+    """Generation slot utilisation, queue waits, speculative-decoding acceptance and adaptive max_tokens"""
+    scheduler = getattr(answer_generator, 'scheduler', None)
+    if scheduler is None:
+        return {"enabled": False}
+    return {
+        "enabled": True,
+        **scheduler.stats(),
+        "speculative": answer_generator.speculation_stats(),
+        "adaptive_tokens": answer_generator.decode_speed_stats()
+    }
+
+@router.get("/health/answer-cache")
+async def answer_cache_stats():
+    """Semantic answer cache hit/miss counters, for tuning the similarity threshold"""
+    answer_cache = get_answer_cache()
+    if answer_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **answer_cache.stats()}
+
+@router.get("/health/search-cache")
+async def search_cache_stats():
+    """Query-embedding and search-result LRU counters"""
+    return get_vector_db().cache_stats()
+
+@router.get("/health/pools")
+async def stage_pool_stats():
+    """Chat pipeline worker pools: in-flight work, queue waits and run times per stage"""
+    return get_stage_pools().stats()
+
+@router.get("/health/index")
+async def index_info():
+    """Vector index type, build parameters, query knobs and memory"""
+    return get_vector_db().index_info()
+
+@router.get("/health/threads")
+async def thread_budget():
+    """CPU cores and threads allotted to each engine (llama, classifiers, encoder, FAISS, OCR)"""
+    return get_thread_budget().stats()
\ No newline at end of file
@@ -0,0 +1,55 @@
+from fastapi import APIRouter, HTTPException, Depends, Body, Query
+from typing import Any, List, Optional
+import time
+import logging
+from app.config import settings
+from app.models import BatchRetrieveResult, RetrievedContext
+from app.dependencies import get_vector_db, get_stage_pools
+from app.utils.logger import log_performance
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+@router.post("/batch", response_model=List[BatchRetrieveResult])
+async def retrieve_batch(
+    queries: List[str] = Body(..., description="Questions to retrieve contexts for"),
+    top_k: int = Query(settings.TOP_K, ge=1, le=50),
+    mode: Optional[str] = Query(None, pattern="^(dense|hybrid)$", description="Defaults to RETRIEVAL_MODE"),
+    vector_db=Depends(get_vector_db),
+    pools=Depends(get_stage_pools)
+) -> Any:
+    """Retrieve knowledge base contexts for many questions at once; results are in request order"""
+    if len(queries) > settings.RETRIEVE_BATCH_MAX_QUERIES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many queries. Maximum is {settings.RETRIEVE_BATCH_MAX_QUERIES} per request"
+        )
+    if not queries:
+        return []
+
+    start_time = time.time()
+    try:
+        hits = await pools.bulk_retrieval.run(vector_db.search_batch, queries, top_k, mode=mode)
+    except Exception as e:
+        logger.error(f"Batch retrieval failed for {len(queries)} queries: {e}")
+        raise HTTPException(status_code=500, detail="Knowledge retrieval failed")
+
+    duration = time.time() - start_time
+    log_performance(logger, "retrieve_batch", duration, queries=len(queries), top_k=top_k, mode=mode or settings.RETRIEVAL_MODE,
+                    queries_per_second=len(queries) / duration if duration else 0.0)
+
+    return [
+        BatchRetrieveResult(
+            query=query,
+            contexts=[
+                RetrievedContext(
+                    content=doc['content'],
+                    title=doc['title'],
+                    score=doc['score'],
+                    source=doc.get('source')
+                )
+                for doc in docs
+            ]
+        )
+        for query, docs in zip(queries, hits)
+    ]
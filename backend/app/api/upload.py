@@ -3,9 +3,13 @@ from typing import Any
 import time
 import logging
 import asyncio
+import contextvars
 from concurrent.futures import ThreadPoolExecutor, TimeoutError
 from app.models import FileUploadResponse
 from app.core.ocr_processor import OCRProcessor
+from app.core.thread_budget import get_thread_budget
+from app.utils.metrics import OCR_TIMEOUTS
+from app.utils.tracing import span, annotate
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -17,8 +21,12 @@ ocr_processor = OCRProcessor()
 MAX_FILE_SIZE = 5 * 1024 * 1024  # Reduced to 5MB for faster processing
 OCR_TIMEOUT = 30  # seconds
 
-# Thread pool for OCR processing
-executor = ThreadPoolExecutor(max_workers=2)
+# Thread pool for OCR processing: one tesseract per core of the OCR budget
+executor = ThreadPoolExecutor(
+    max_workers=get_thread_budget().threads("ocr", 2),
+    thread_name_prefix="ocr",
+    initializer=get_thread_budget().pinner("ocr")
+)
 
 @router.post("/extract-text", response_model=FileUploadResponse)
 async def extract_text_from_file(
@@ -41,20 +49,24 @@ async def extract_text_from_file(
         
         # Process with timeout
         try:
-            # Run OCR in thread pool with timeout
-            loop = asyncio.get_event_loop()
-            future = loop.run_in_executor(
-                executor,
-                ocr_processor.process_file,
-                contents,
-                file.filename
-            )
-            
-            # Wait with timeout
-            result = await asyncio.wait_for(future, timeout=OCR_TIMEOUT)
+            with span("ocr", file_type=file.filename.split('.')[-1].lower(), size_bytes=len(contents)):
+                # Run OCR in thread pool with timeout (in this request's trace context)
+                loop = asyncio.get_event_loop()
+                future = loop.run_in_executor(
+                    executor,
+                    contextvars.copy_context().run,
+                    ocr_processor.process_file,
+                    contents,
+                    file.filename
+                )
+                
+                # Wait with timeout
+                result = await asyncio.wait_for(future, timeout=OCR_TIMEOUT)
             
         except asyncio.TimeoutError:
             logger.error(f"OCR timeout for {file.filename}")
+            OCR_TIMEOUTS.inc(file_type=file.filename.split('.')[-1].lower())
+            annotate(fallback="timeout", reason=f"text extraction exceeded {OCR_TIMEOUT}s")
             raise HTTPException(
                 status_code=408,
                 detail="Text extraction is taking too long. Please try with a smaller or clearer file."
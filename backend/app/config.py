@@ -20,6 +20,10 @@ class Settings(BaseSettings):
     KNOWLEDGE_BASE_PATH: str = Field(default_factory=lambda: str(Path(__file__).parent.parent / "knowledge_base"))
     VECTOR_STORE_PATH: str = Field(default_factory=lambda: str(Path(__file__).parent.parent / "vector_store"))
     
+    # Re-index knowledge base files in the background as they change
+    KB_WATCH_ENABLED: bool = True
+    KB_WATCH_DEBOUNCE_MS: int = 1600  # Group edits arriving within this window into one reload
+    
     # Model Paths - these will be loaded from env
     CLAIRE_MODEL_Q4_PATH: str = Field(default_factory=lambda: str(Path(__file__).parent.parent / "models/claire_v1.0.0_q4_k_m.gguf"))
     CLAIRE_MODEL_F16_PATH: str = Field(default_factory=lambda: str(Path(__file__).parent.parent / "models/claire_v1.0.0_f16.gguf"))
@@ -34,6 +38,31 @@ class Settings(BaseSettings):
     MAX_LENGTH: int = 512
     TOP_K: int = 4
     
+    # Vector index: flat (exact), hnsw, ivf_flat or ivf_pq for large knowledge bases
+    VECTOR_INDEX_TYPE: str = "flat"
+    HNSW_M: int = 32
+    HNSW_EF_CONSTRUCTION: int = 200
+    HNSW_EF_SEARCH: int = 64  # Query time: higher = better recall, slower
+    IVF_NLIST: int = 0  # 0 = ~4*sqrt(n) lists
+    IVF_NPROBE: int = 16  # Query time: lists scanned per query
+    IVF_PQ_M: int = 48  # Sub-quantizers, must divide the embedding dimension (384)
+    IVF_PQ_NBITS: int = 8
+    
+    # Retrieval: dense (embeddings only) or hybrid (BM25 + dense, reciprocal rank fusion)
+    RETRIEVAL_MODE: str = "dense"
+    HYBRID_CANDIDATES: int = 50  # Candidates taken from each ranking before fusion
+    HYBRID_RRF_K: int = 60
+    HYBRID_PREFILTER_MIN_DOCS: int = 100000  # Above this, only score BM25 candidates densely (0 = never)
+    HYBRID_PREFILTER_CANDIDATES: int = 2000
+    
+    # Run language and emotion detection over one shared DistilBERT encoder
+    SHARED_CLASSIFIER_BACKBONE: bool = True
+    
+    # Classifier inference backend: eager, torchscript or onnx (int8 ONNX Runtime, CPU)
+    CLASSIFIER_BACKEND: str = "eager"
+    CLASSIFIER_ONNX_QUANTIZE: bool = True
+    CLASSIFIER_EXPORT_DIR: str = Field(default_factory=lambda: str(Path(__file__).parent.parent / "cache" / "classifiers"))
+    
     # GGUF Model Settings
     MODEL_CONTEXT_SIZE: int = 2048
     MODEL_MAX_TOKENS: int = 1024
@@ -43,6 +72,13 @@ class Settings(BaseSettings):
     MODEL_N_BATCH: int = 512  # For GPU
     MODEL_N_BATCH_CPU: int = 256  # For CPU
     
+    # Prompt token budget, measured with the GGUF tokenizer: whatever the window has
+    # left after the reserve goes to the question, document excerpt and contexts
+    PROMPT_ANSWER_RESERVE: int = 512  # Context tokens always kept free for the answer
+    PROMPT_QUESTION_MAX_TOKENS: int = 256
+    PROMPT_DOCUMENT_MAX_TOKENS: int = 384  # Excerpt of an uploaded document (at most half the budget)
+    PROMPT_CONTEXT_MIN_TOKENS: int = 48  # A context that would be trimmed below this is dropped
+    
     # GPU Settings
     GPU_LAYERS: int = 35
     
@@ -57,6 +93,50 @@ class Settings(BaseSettings):
     VECTOR_SEARCH_TIMEOUT: int = 30
     GENERATION_TIMEOUT_COOLDOWN: int = 60
     
+    # Request deadlines: each request gets a latency budget (longest matching path
+    # prefix below, else REQUEST_TIMEOUT) that every chat stage checks before it runs
+    REQUEST_BUDGETS: dict = {"/api/v1/chat/chat": 120, "/api/v1/chat/stream": 300, "/api/v1/upload": 60}
+    DEADLINE_RESERVE_SECONDS: float = 1.0  # Kept back to format and return a fallback answer
+    DEADLINE_MIN_GENERATION_SECONDS: float = 5.0  # Less left than this: answer retrieval-only
+    DISCONNECT_POLL_SECONDS: float = 0.5  # How often a running chat request checks for a gone client
+    
+    # Request tracing: span tree per request, returned as Server-Timing and kept for /debug/traces
+    TRACING_ENABLED: bool = True
+    TRACE_ROUTES: list = ["/api/v1/chat", "/api/v1/upload", "/api/v1/retrieve"]  # Path prefixes traced
+    TRACE_BUFFER_SIZE: int = 200  # Last N traces kept in memory
+    
+    # Generation scheduling: llama.cpp contexts sharing the mmap'd weights,
+    # plus a bounded FIFO queue for requests waiting on a free slot
+    GENERATION_SLOTS: int = 1
+    GENERATION_QUEUE_SIZE: int = 8
+    GENERATION_QUEUE_TIMEOUT: float = 60.0
+    
+    # Worker pools for the blocking chat pipeline stages (kept off the event loop)
+    CLASSIFIER_POOL_WORKERS: int = 2
+    RETRIEVAL_POOL_WORKERS: int = 2
+    BULK_RETRIEVAL_POOL_WORKERS: int = 1  # /retrieve/batch, kept apart from interactive retrieval
+    GENERATION_POOL_WORKERS: int = 0  # 0 = GENERATION_SLOTS + GENERATION_QUEUE_SIZE
+    
+    # KV-cache snapshot of the static prompt preamble (optionally persisted across restarts)
+    PREFIX_CACHE_ENABLED: bool = True
+    PREFIX_CACHE_PERSIST: bool = True
+    PREFIX_CACHE_DIR: str = Field(default_factory=lambda: str(Path(__file__).parent.parent / "cache"))
+    
+    # Prompt-lookup speculative decoding: draft tokens are copied from earlier n-gram
+    # matches in the prompt and verified in one batch (greedy output is unchanged).
+    # llama.cpp then keeps logits for every position (n_ctx x vocab floats per slot).
+    SPECULATIVE_DECODING: bool = False
+    SPECULATIVE_DRAFT_TOKENS: int = 10  # Tokens proposed per decode step
+    SPECULATIVE_NGRAM_SIZE: int = 2  # Longest n-gram matched against the prompt
+    
+    # Adaptive answer length: max_tokens sized from the rolling prefill/decode speed
+    # and the time the request has left, between the floor and the ceiling
+    ADAPTIVE_MAX_TOKENS: bool = True
+    ADAPTIVE_MAX_TOKENS_FLOOR: int = 64
+    ADAPTIVE_MAX_TOKENS_CEILING: int = 0  # 0 = MODEL_MAX_TOKENS
+    ADAPTIVE_SPEED_SMOOTHING: float = 0.2  # Weight of the newest generation in the rolling speed
+    ADAPTIVE_SPEED_SAFETY: float = 0.85  # Fraction of the time left planned for decoding
+    
     # Response Settings
     MAX_RESPONSE_LENGTH: int = 1000
     SHORT_MESSAGE_THRESHOLD: int = 20
@@ -66,9 +146,50 @@ class Settings(BaseSettings):
     MAX_WORKERS: int = 2
     BATCH_SIZE: int = 1
     
+    # Prefork serving (start_claire.py): with several uvicorn workers the index is
+    # built once up front and every worker maps the same files read-only
+    SERVER_WORKERS: int = 1
+    BUILD_INDEX_ON_STARTUP: bool = True  # False = load the saved index instead of rebuilding it
+    VECTOR_INDEX_MMAP: bool = True  # Map the saved FAISS index instead of reading it into each process
+    
+    # Startup: load every model in parallel and run one warm-up inference on each,
+    # so the first request (or load-balancer probe) does not pay for it
+    STARTUP_WARMUP: bool = True  # False = classifiers and GGUF load lazily on first use
+    STARTUP_WARMUP_BACKGROUND: bool = False  # Serve /live while loading; /ready answers 503 until warm
+    
+    # CPU thread budget: each engine gets an explicit share of the cores (shares are
+    # normalized) instead of every thread pool sizing itself to the whole machine
+    THREAD_BUDGET_ENABLED: bool = True
+    THREAD_BUDGET_CORES: int = 0  # 0 = available cores / SERVER_WORKERS
+    THREAD_BUDGET_LLAMA: float = 0.55
+    THREAD_BUDGET_CLASSIFIERS: float = 0.15
+    THREAD_BUDGET_ENCODER: float = 0.1
+    THREAD_BUDGET_FAISS: float = 0.1
+    THREAD_BUDGET_OCR: float = 0.1
+    THREAD_BUDGET_AFFINITY: bool = False  # Pin each engine's threads to its cores (Linux, single worker)
+    
+    # Cross-request micro-batching for the classifiers and query embedder
+    MICRO_BATCH_ENABLED: bool = True
+    MICRO_BATCH_MAX_SIZE: int = 16
+    MICRO_BATCH_MAX_WAIT_MS: float = 5.0
+    
     # Cache Settings
     ENABLE_MODEL_CACHE: bool = True
     USE_CACHE: bool = True
+    EMBEDDING_CACHE_ENABLED: bool = True  # Reuse section embeddings across index rebuilds
+    SEARCH_CACHE_ENABLED: bool = True  # LRU of query embeddings and search results
+    SEARCH_CACHE_MAX_ENTRIES: int = 2048
+    
+    # Batched retrieval (/api/v1/retrieve/batch)
+    RETRIEVE_BATCH_MAX_QUERIES: int = 5000
+    RETRIEVE_BATCH_CHUNK_SIZE: int = 256  # Queries per FAISS search call
+    RETRIEVE_BATCH_ENCODE_SIZE: int = 64  # Encoder batch size within a chunk
+    
+    # Semantic answer cache for near-identical questions
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_SIMILARITY_THRESHOLD: float = 0.95
+    ANSWER_CACHE_TTL: int = 3600
+    ANSWER_CACHE_MAX_ENTRIES: int = 1000
     
     # Skip model loading for testing
     SKIP_MODEL_LOADING: bool = False
@@ -0,0 +1,114 @@
+import time
+import threading
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+import numpy as np
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticAnswerCache:
+    """
+    Answer cache for near-identical questions.
+
+    Entries are keyed by the L2-normalized query embedding (the same vector
+    VectorDatabase.search uses) plus the detected language and emotion. A
+    lookup hits when an unexpired entry with the same language/emotion has
+    cosine similarity >= threshold. Entries expire after ttl seconds, the
+    least recently used entry is evicted beyond max_entries, and the whole
+    cache is dropped whenever the vector index version changes.
+    """
+
+    def __init__(
+        self,
+        threshold: Optional[float] = None,
+        ttl: Optional[float] = None,
+        max_entries: Optional[int] = None
+    ):
+        self.threshold = threshold if threshold is not None else settings.ANSWER_CACHE_SIMILARITY_THRESHOLD
+        self.ttl = ttl if ttl is not None else settings.ANSWER_CACHE_TTL
+        self.max_entries = max_entries or settings.ANSWER_CACHE_MAX_ENTRIES
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._index_version = None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _check_version(self, index_version):
+        if index_version != self._index_version:
+            if self._entries:
+                logger.info(f"Vector index changed, dropping {len(self._entries)} cached answers")
+                self.invalidations += 1
+            self._entries.clear()
+            self._index_version = index_version
+
+    def _expire(self, now: float):
+        expired = [key for key, entry in self._entries.items() if now - entry['created'] > self.ttl]
+        for key in expired:
+            del self._entries[key]
+        self.expirations += len(expired)
+
+    def get(self, embedding: np.ndarray, language: str, emotion: str, index_version=None) -> Optional[Dict[str, Any]]:
+        """Return the cached payload for the most similar matching question, or None"""
+        embedding = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        with self._lock:
+            self._check_version(index_version)
+            self._expire(time.time())
+
+            candidates = [
+                (key, entry) for key, entry in self._entries.items()
+                if entry['language'] == language and entry['emotion'] == emotion
+            ]
+            if candidates:
+                similarities = np.stack([entry['embedding'] for _, entry in candidates]) @ embedding
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    key, entry = candidates[best]
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return {**entry['payload'], 'similarity': float(similarities[best])}
+
+            self.misses += 1
+            return None
+
+    def put(self, embedding: np.ndarray, language: str, emotion: str, payload: Dict[str, Any], index_version=None):
+        with self._lock:
+            self._check_version(index_version)
+            self._entries[self._next_id] = {
+                'embedding': np.asarray(embedding, dtype=np.float32).reshape(-1),
+                'language': language,
+                'emotion': emotion,
+                'payload': payload,
+                'created': time.time()
+            }
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "threshold": self.threshold,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
@@ -1,16 +1,26 @@
 import torch
 import logging
 import time
-import threading
 import os
 import traceback
 import re
-from typing import List, Dict, Any, Optional
-from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import threading
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Iterator
+from app.core.streaming import StreamingTextCleaner
+from app.core.cancellation import CancelToken, GenerationCancelled
+from app.core.generation_scheduler import GenerationScheduler, SchedulerBusy
+from app.core.prefix_cache import PrefixCache, common_prefix_length
+from app.core.prompt_builder import PromptBuilder, BuiltPrompt
+from app.core.speculative import PromptLookupDraft, PROMPT_LOOKUP_AVAILABLE, speculation_stats
+from app.core.token_budget import DecodeSpeed
+from app.utils.logger import log_performance
+from app.utils.metrics import STAGE_SECONDS, LLM_TOKENS, LLM_TOKENS_PER_SECOND, LLM_ROLLING_TOKENS_PER_SECOND
+from app.utils.tracing import span, annotate, record_span
 
 # For GGUF model support
 try:
-    from llama_cpp import Llama
+    from llama_cpp import Llama, StoppingCriteriaList
     LLAMA_CPP_AVAILABLE = True
 except ImportError as e:
     LLAMA_CPP_AVAILABLE = False
@@ -24,6 +34,7 @@ except OSError as e:
 # Import settings with fallback
 try:
     from app.config import settings
+    from app.core.thread_budget import get_thread_budget
 except ImportError:
     # Fallback settings if import fails
     class Settings:
@@ -37,6 +48,18 @@ except ImportError:
         GENERATION_TIMEOUT_COOLDOWN = 60
         MODEL_CONTEXT_SIZE = 2048
         MODEL_MAX_TOKENS = 1024
+        PROMPT_ANSWER_RESERVE = 512
+        PROMPT_QUESTION_MAX_TOKENS = 256
+        PROMPT_DOCUMENT_MAX_TOKENS = 384
+        PROMPT_CONTEXT_MIN_TOKENS = 48
+        SPECULATIVE_DECODING = False
+        SPECULATIVE_DRAFT_TOKENS = 10
+        SPECULATIVE_NGRAM_SIZE = 2
+        ADAPTIVE_MAX_TOKENS = True
+        ADAPTIVE_MAX_TOKENS_FLOOR = 64
+        ADAPTIVE_MAX_TOKENS_CEILING = 0
+        ADAPTIVE_SPEED_SMOOTHING = 0.2
+        ADAPTIVE_SPEED_SAFETY = 0.85
         MODEL_TEMPERATURE = 0.3
         MODEL_TOP_P = 0.9
         MODEL_REPEAT_PENALTY = 1.1
@@ -45,10 +68,34 @@ except ImportError:
         USE_MMAP = True
         USE_MLOCK = False
         F16_KV_CPU = False
+        GENERATION_SLOTS = 1
+        GENERATION_QUEUE_SIZE = 8
+        GENERATION_QUEUE_TIMEOUT = 60
+        DEADLINE_RESERVE_SECONDS = 1.0
+        DEADLINE_MIN_GENERATION_SECONDS = 5.0
+        PREFIX_CACHE_ENABLED = True
+        PREFIX_CACHE_PERSIST = False
+        PREFIX_CACHE_DIR = "./cache"
     settings = Settings()
+    get_thread_budget = None
 
 logger = logging.getLogger(__name__)
 
+# Stop sequences for the Alpaca prompt format
+STOP_SEQUENCES = ["### Instruction:", "### Input:", "### Output:", "\n\n### ", "</s>"]
+
+# Static start of every prompt (EXACT Alpaca format from training); its KV cache is reused
+PROMPT_PREFIX = (
+    "### Instruction:\n"
+    "You are CLAIRE (Conversational Language AI for Resolution & Engagement), "
+    "a banking customer assistant working for BPI (Bank of the Philippine Islands). "
+    "Your role is to answer customer questions accurately, clearly, and empathetically. "
+    "Given the question, its identified language and emotion, and four context documents, "
+    "generate a response that is linguistically accurate, emotionally appropriate, "
+    "and grounded in the most relevant context.\n\n"
+    "### Input:\n"
+)
+
 # Greeting patterns for different languages
 GREETING_PATTERNS = {
     'english': {
@@ -191,11 +238,14 @@ class AnswerGenerator:
         try:
             self.device = torch.device(settings.DEVICE)
             self.model = None
-            self.generation_lock = threading.Lock()
-            self.is_generating = False
+            self.models = []
+            self.scheduler = None
+            self.prefix_cache = None
             self.last_timeout = 0
             self.timeout_cooldown = settings.GENERATION_TIMEOUT_COOLDOWN
-            self._stop_generation = False
+            self._active_tokens = set()  # CancelTokens of generations in progress
+            self._active_lock = threading.Lock()
+            self.decode_speed = self._create_decode_speed()
             
             # Model path for GGUF (auto-selected based on device)
             self.model_path = settings.CLAIRE_MODEL_PATH
@@ -232,11 +282,14 @@ class AnswerGenerator:
             logger.error(f"Traceback: {traceback.format_exc()}")
             # Set minimal defaults to prevent crashes
             self.model = None
-            self.generation_lock = threading.Lock()
-            self.is_generating = False
+            self.models = []
+            self.scheduler = None
+            self.prefix_cache = None
             self.last_timeout = 0
             self.timeout_cooldown = 60
-            self._stop_generation = False
+            self._active_tokens = set()
+            self._active_lock = threading.Lock()
+            self.decode_speed = None
             self.generation_timeout = 300
             self.device = torch.device("cpu")
     
@@ -307,42 +360,18 @@ class AnswerGenerator:
             file_size = os.path.getsize(self.model_path) / (1024 * 1024 * 1024)  # Convert to GB
             logger.info(f"Model file size: {file_size:.2f} GB")
             
-            # Configure based on device
-            if settings.DEVICE == "cuda" and torch.cuda.is_available():
-                # GPU configuration
-                self.model = Llama(
-                    model_path=self.model_path,
-                    n_ctx=settings.MODEL_CONTEXT_SIZE,
-                    n_batch=settings.MODEL_BATCH_SIZE,
-                    n_gpu_layers=self.n_gpu_layers,
-                    n_threads=8,  # CPU threads for non-offloaded operations
-                    use_mmap=settings.USE_MMAP,
-                    use_mlock=settings.USE_MLOCK,
-                    verbose=False
-                )
-                logger.info(f"GPU model loaded with {self.n_gpu_layers} layers offloaded")
-            else:
-                # CPU configuration - optimized
-                n_threads = settings.LLAMA_CPP_THREADS
-                
-                self.model = Llama(
-                    model_path=self.model_path,
-                    n_ctx=settings.MODEL_CONTEXT_SIZE,
-                    n_batch=settings.MODEL_BATCH_SIZE,
-                    n_gpu_layers=0,
-                    n_threads=n_threads,
-                    use_mmap=settings.USE_MMAP,
-                    use_mlock=settings.USE_MLOCK,
-                    seed=-1,
-                    f16_kv=settings.F16_KV_CPU,
-                    logits_all=False,
-                    vocab_only=False,
-                    embedding=False,
-                    verbose=False
-                )
-                logger.info(f"CPU model loaded with {n_threads} threads")
+            # One llama.cpp context per generation slot. With use_mmap the
+            # weights are mapped once by the OS and shared; each slot only
+            # adds its own KV cache and compute buffers.
+            n_slots = max(int(getattr(settings, 'GENERATION_SLOTS', 1)), 1)
+            self.models = [self._create_llama(n_slots) for _ in range(n_slots)]
+            self.model = self.models[0]
+            self.scheduler = GenerationScheduler(self.models, max_queue=settings.GENERATION_QUEUE_SIZE)
+            
+            logger.info(f"GGUF model loaded successfully ({n_slots} generation slot(s))")
             
-            logger.info(f"GGUF model loaded successfully")
+            if settings.PREFIX_CACHE_ENABLED:
+                self._warm_prefix_cache()
             
         except FileNotFoundError as e:
             logger.error(f"File not found: {e}")
@@ -359,6 +388,180 @@ class AnswerGenerator:
             logger.warning("GGUF model not available - will use retrieval-only for all responses")
             self.model = None
     
+    def _create_llama(self, n_slots: int = 1):
+        """Create one llama.cpp context; CPU threads are split evenly across slots"""
+        # Configure based on device
+        if settings.DEVICE == "cuda" and torch.cuda.is_available():
+            # GPU configuration
+            model = Llama(
+                model_path=self.model_path,
+                n_ctx=settings.MODEL_CONTEXT_SIZE,
+                n_batch=settings.MODEL_BATCH_SIZE,
+                n_gpu_layers=self.n_gpu_layers,
+                n_threads=8,  # CPU threads for non-offloaded operations
+                use_mmap=settings.USE_MMAP,
+                use_mlock=settings.USE_MLOCK,
+                draft_model=self._create_draft_model(),
+                verbose=False
+            )
+            logger.info(f"GPU model loaded with {self.n_gpu_layers} layers offloaded")
+        else:
+            # CPU configuration - optimized
+            n_threads = settings.LLAMA_CPP_THREADS
+            if get_thread_budget is not None:
+                n_threads = get_thread_budget().threads("llama", n_threads)
+            if n_threads:
+                n_threads = max(n_threads // n_slots, 1)
+            
+            model = Llama(
+                model_path=self.model_path,
+                n_ctx=settings.MODEL_CONTEXT_SIZE,
+                n_batch=settings.MODEL_BATCH_SIZE,
+                n_gpu_layers=0,
+                n_threads=n_threads,
+                use_mmap=settings.USE_MMAP,
+                use_mlock=settings.USE_MLOCK,
+                seed=-1,
+                f16_kv=settings.F16_KV_CPU,
+                logits_all=False,
+                vocab_only=False,
+                embedding=False,
+                draft_model=self._create_draft_model(),
+                verbose=False
+            )
+            logger.info(f"CPU model loaded with {n_threads} threads")
+        return model
+    
+    def _create_draft_model(self):
+        """Prompt-lookup drafter for one slot, or None when speculative decoding is off"""
+        if not settings.SPECULATIVE_DECODING:
+            return None
+        if not PROMPT_LOOKUP_AVAILABLE:
+            logger.warning("llama-cpp-python has no prompt-lookup decoding; speculative decoding disabled")
+            return None
+        return PromptLookupDraft(
+            max_ngram_size=settings.SPECULATIVE_NGRAM_SIZE,
+            num_pred_tokens=settings.SPECULATIVE_DRAFT_TOKENS
+        )
+    
+    @staticmethod
+    def _record_draft(model, generated_tokens: int):
+        draft = getattr(model, 'draft_model', None)
+        if isinstance(draft, PromptLookupDraft):
+            draft.record(generated_tokens)
+    
+    def speculation_stats(self) -> Dict[str, Any]:
+        """Prompt-lookup acceptance over all slots"""
+        drafts = [m.draft_model for m in self.models if isinstance(getattr(m, 'draft_model', None), PromptLookupDraft)]
+        if not drafts:
+            return {"enabled": False}
+        return {"enabled": True, "draft_tokens": settings.SPECULATIVE_DRAFT_TOKENS, **speculation_stats(drafts)}
+    
+    @staticmethod
+    def _create_decode_speed() -> Optional[DecodeSpeed]:
+        """Rolling speed estimate that sizes max_tokens to the time left, or None when disabled"""
+        if not settings.ADAPTIVE_MAX_TOKENS:
+            return None
+        return DecodeSpeed(
+            floor=settings.ADAPTIVE_MAX_TOKENS_FLOOR,
+            ceiling=settings.ADAPTIVE_MAX_TOKENS_CEILING or settings.MODEL_MAX_TOKENS,
+            smoothing=settings.ADAPTIVE_SPEED_SMOOTHING,
+            safety=settings.ADAPTIVE_SPEED_SAFETY
+        )
+    
+    def _answer_budget(self, prompt: BuiltPrompt, cached_tokens: int, token: CancelToken) -> int:
+        """prompt.max_tokens, cut to what the measured speed can decode before token runs out of time"""
+        max_tokens = prompt.max_tokens
+        if self.decode_speed is not None:
+            max_tokens = self.decode_speed.budget(token.remaining(), len(prompt.tokens) - cached_tokens, max_tokens)
+        LLM_TOKENS.observe(max_tokens, kind="max_tokens")
+        return max_tokens
+    
+    def _record_timings(self, prefill_stats: Dict[str, Any], generation_start: float,
+                      first_token_time: Optional[float], n_tokens: int):
+        """Record one generation's prefill and decode timings in the metrics and the rolling speed estimate"""
+        prefilled = prefill_stats['prompt_tokens'] - prefill_stats['cached_tokens']
+        LLM_TOKENS.observe(prefill_stats['prompt_tokens'], kind="prompt")
+        LLM_TOKENS.observe(prefilled, kind="prefilled")
+        LLM_TOKENS.observe(n_tokens, kind="generated")
+        if first_token_time is None:
+            return
+        
+        prefill_time = first_token_time - generation_start
+        decode_time = time.time() - first_token_time
+        STAGE_SECONDS.observe(prefill_time, stage="llama_prefill")
+        STAGE_SECONDS.observe(decode_time, stage="llama_decode")
+        record_span("llama_prefill", prefill_time, ended_ago=decode_time,
+                    prompt_tokens=prefill_stats['prompt_tokens'], prefilled_tokens=prefilled)
+        record_span("llama_decode", decode_time, generated_tokens=n_tokens, max_tokens=prefill_stats['max_tokens'])
+        if prefilled > 0 and prefill_time > 0:
+            LLM_TOKENS_PER_SECOND.observe(prefilled / prefill_time, phase="prefill")
+        if n_tokens > 1 and decode_time > 0:
+            LLM_TOKENS_PER_SECOND.observe((n_tokens - 1) / decode_time, phase="decode")
+        
+        if self.decode_speed is not None:
+            self.decode_speed.record(prefilled, prefill_time, n_tokens - 1, decode_time)
+            for phase, tps in (("prefill", self.decode_speed.prefill_tps), ("decode", self.decode_speed.decode_tps)):
+                if tps is not None:
+                    LLM_ROLLING_TOKENS_PER_SECOND.set(tps, phase=phase)
+    
+    def decode_speed_stats(self) -> Dict[str, Any]:
+        """Rolling prefill/decode tokens/s and the max_tokens budgets chosen from them"""
+        if self.decode_speed is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.decode_speed.stats()}
+    
+    def _warm_prefix_cache(self):
+        """Prefill the static instruction preamble once and share its KV state with every slot"""
+        try:
+            self.prefix_cache = PrefixCache(
+                PROMPT_PREFIX,
+                self.model_path,
+                settings.MODEL_CONTEXT_SIZE,
+                settings.PREFIX_CACHE_DIR if settings.PREFIX_CACHE_PERSIST else None
+            )
+            self.prefix_cache.warm(self.models[0])
+            for model in self.models[1:]:
+                model.load_state(self.prefix_cache.state)
+        except Exception as e:
+            logger.warning(f"Prompt prefix cache disabled: {e}")
+            self.prefix_cache = None
+    
+    def warm_up(self):
+        """
+        One-token completion on a slot before traffic arrives: pages in the
+        mmapped weights and initialises the compute kernels. The weights are
+        shared, so one slot is enough; its KV cache is reconciled with the
+        next prompt by _prepare_prefill as usual.
+        """
+        if self.model is None or self.scheduler is None:
+            return
+        slot_id = self.scheduler.acquire(timeout=settings.GENERATION_QUEUE_TIMEOUT)
+        try:
+            start = time.perf_counter()
+            self.scheduler.slots[slot_id].create_completion(PROMPT_PREFIX, max_tokens=1, temperature=0.0)
+            logger.info(f"GGUF model warmed up in {time.perf_counter() - start:.2f}s")
+        finally:
+            self.scheduler.release(slot_id)
+    
+    def _prepare_prefill(self, model, prompt: BuiltPrompt) -> Dict[str, Any]:
+        """Restore the cached preamble if needed; report the prompt budget and already-cached token counts"""
+        if self.prefix_cache is not None:
+            cached_tokens = self.prefix_cache.prepare(model, prompt.tokens)
+        else:
+            cached_tokens = common_prefix_length(getattr(model, '_input_ids', []), prompt.tokens)
+        return {**prompt.stats, 'cached_tokens': cached_tokens, 'max_tokens': prompt.max_tokens}
+    
+    def _log_prefill(self, prefill_stats: Dict[str, Any], prefill_time: float):
+        log_performance(
+            logger,
+            "llama_prefill",
+            prefill_time,
+            **prefill_stats,
+            prefilled_tokens=prefill_stats['prompt_tokens'] - prefill_stats['cached_tokens'],
+            prefix_cache=self.prefix_cache is not None
+        )
+    
     def _should_skip_generation(self) -> bool:
         """Check if we should skip generation due to recent timeout"""
         try:
@@ -378,12 +581,30 @@ class AnswerGenerator:
         language: str,
         emotion: str,
         contexts: List[Dict[str, Any]],
-        extracted_text: str = None
+        extracted_text: str = None,
+        cancel: Optional[CancelToken] = None
     ) -> Dict[str, Any]:
         """
         Generate answer using CLAIRE GGUF model with retrieved contexts.
         If timeout or error, return formatted retrieved contexts directly.
+        cancel (the request's deadline, or any CancelToken) stops decoding
+        early; generation also stops after generation_timeout.
+        Traced as a span carrying the method and any fallback reason.
         """
+        with span("generate_answer"):
+            result = self._generate_answer(question, language, emotion, contexts, extracted_text, cancel)
+            annotate(method=result['method'], reason=result['fallback_reason'], cancelled=result['cancelled'])
+            return result
+    
+    def _generate_answer(
+        self,
+        question: str,
+        language: str,
+        emotion: str,
+        contexts: List[Dict[str, Any]],
+        extracted_text: str = None,
+        cancel: Optional[CancelToken] = None
+    ) -> Dict[str, Any]:
         
         # Initialize result
         result = {
@@ -391,7 +612,9 @@ class AnswerGenerator:
             'success': False,
             'method': 'none',
             'generation_time': 0,
-            'timeout': False
+            'timeout': False,
+            'cancelled': None,  # Why generation was stopped early (timeout, deadline, shutdown, ...)
+            'fallback_reason': None  # Why the answer did not come from the LLM
         }
         
         try:
@@ -407,66 +630,38 @@ class AnswerGenerator:
             if contexts is None:
                 contexts = []
             
-            # Check if this is a greeting message
-            is_greeting, greeting_type, _ = self._is_greeting_message(question, language)
-            if is_greeting:
-                logger.info(f"Detected greeting message: {greeting_type}")
-                result['answer'] = self._get_greeting_response(greeting_type, language, emotion)
-                result['success'] = True
-                result['method'] = 'greeting_response'
-                result['generation_time'] = time.time() - start_time
-                return result
-                
-            # Check if we have contexts
-            if not contexts or len(contexts) == 0:
-                result['answer'] = self._get_no_context_response(language, emotion)
-                result['method'] = 'no_context'
-                result['success'] = True
-                return result
+            # Greetings, missing contexts/model, cooldown and spent budgets never reach the LLM
+            shortcut = self._get_shortcut_result(result, question, language, emotion, contexts, extracted_text, cancel)
+            if shortcut is not None:
+                shortcut['generation_time'] = time.time() - start_time
+                return shortcut
             
-            # Skip generation if model not loaded or in cooldown
-            if self.model is None:
-                logger.info("Model not loaded, using retrieval-only")
-                result['answer'] = self._format_retrieved_contexts(
-                    question, language, emotion, contexts, extracted_text
-                )
-                result['success'] = True
-                result['method'] = 'retrieval_only_no_model'
-                return result
-            
-            # Check if we're in cooldown period after recent timeout
-            if self._should_skip_generation():
-                logger.info("Using retrieval-only due to recent timeout cooldown")
+            # Wait in FIFO order for a free generation slot instead of rejecting
+            try:
+                with span("generation.queue"):
+                    slot_id = self.scheduler.acquire(timeout=self._queue_timeout(cancel))
+            except SchedulerBusy as e:
+                logger.warning(f"No generation slot available ({e}), skipping to retrieval-only")
                 result['answer'] = self._format_retrieved_contexts(
                     question, language, emotion, contexts, extracted_text
                 )
                 result['success'] = True
-                result['method'] = 'retrieval_only_cooldown'
+                result['method'] = 'retrieval_only_busy'
+                result['fallback_reason'] = str(e)
                 return result
             
-            # Check if we're already generating
-            with self.generation_lock:
-                if self.is_generating:
-                    logger.warning("Already generating, skipping to retrieval-only")
-                    result['answer'] = self._format_retrieved_contexts(
-                        question, language, emotion, contexts, extracted_text
-                    )
-                    result['success'] = True
-                    result['method'] = 'retrieval_only_busy'
-                    return result
-                
-                self.is_generating = True
-                self._stop_generation = False
+            model = self.scheduler.slots[slot_id]
             
             try:
                 # Try CLAIRE generation
                 logger.info(f"Attempting CLAIRE GGUF generation...")
                 
                 try:
-                    # Direct generation with timeout wrapper
-                    generated_answer = self._generate_with_timeout_wrapper(
-                        question, language, emotion, contexts, extracted_text
-                    )
+                    # Token loop in this thread; returns within one token once the cancel token fires
+                    with self._tracked(self._generation_token(cancel)) as token:
+                        generated_answer = self._generate_with_claire_gguf_safe(
+                            question, language, emotion, contexts, extracted_text, model, token
+                        )
                     
                     if generated_answer:
                         result['answer'] = generated_answer
@@ -477,15 +672,21 @@ class AnswerGenerator:
                         return result
                     else:
                         logger.warning("Generation returned empty result")
+                        result['fallback_reason'] = "empty generation"
                         
-                except TimeoutError:
-                    logger.warning("Generation timed out")
-                    result['timeout'] = True
-                    self.last_timeout = time.time()
+                except GenerationCancelled as e:
+                    logger.warning(f"Generation stopped ({e.reason}) after {time.time() - start_time:.1f}s")
+                    result['cancelled'] = e.reason
+                    result['fallback_reason'] = f"generation stopped: {e.reason}"
+                    result['timeout'] = e.reason in ("timeout", "deadline")
+                    if e.reason == "timeout":
+                        # Only the model being too slow starts a cooldown, not a short request budget
+                        self.last_timeout = time.time()
                     
                 except Exception as e:
                     logger.error(f"Error during generation: {e}")
                     logger.error(f"Traceback: {traceback.format_exc()}")
+                    result['fallback_reason'] = f"generation error: {e}"
                 
                 # FALLBACK: Return formatted retrieved contexts
                 logger.info("Using retrieval-only response...")
@@ -505,9 +706,7 @@ class AnswerGenerator:
                     result['answer'] = f"{formatted_answer}\n\n{timeout_note}"
                     
             finally:
-                with self.generation_lock:
-                    self.is_generating = False
-                    self._stop_generation = False
+                self.scheduler.release(slot_id)
                     
         except Exception as e:
             logger.error(f"Critical error in generate_answer: {e}")
@@ -515,51 +714,287 @@ class AnswerGenerator:
             result['answer'] = self._get_error_response(language if 'language' in locals() else 'english')
             result['method'] = 'error'
             result['success'] = False
+            result['fallback_reason'] = str(e)
             
         return result
     
-    def _generate_with_timeout_wrapper(
+    def generate_answer_stream(
         self,
         question: str,
         language: str,
         emotion: str,
         contexts: List[Dict[str, Any]],
-        extracted_text: str
-    ) -> Optional[str]:
+        extracted_text: str = None,
+        cancel: Optional[CancelToken] = None
+    ) -> Iterator[Dict[str, Any]]:
         """
-        Wrapper for generation with timeout.
-        Returns generated text or None if timeout/error.
+        Streaming variant of generate_answer.
+        Yields {'type': 'token', 'text': ...} events as llama.cpp produces them
+        (cleaned incrementally), then one {'type': 'done', ...} event with the
+        full answer, method and timing. Non-LLM paths yield only 'done'.
         """
+        start_time = time.time()
+        result = {
+            'answer': '',
+            'success': False,
+            'method': 'none',
+            'generation_time': 0,
+            'timeout': False,
+            'cancelled': None,
+            'fallback_reason': None,
+            'time_to_first_token': None,
+            'tokens_per_second': None
+        }
+        language = language or "english"
+        emotion = emotion or "neutral"
+        contexts = contexts or []
         
-        timeout_seconds = self.generation_timeout
+        shortcut = self._get_shortcut_result(result, question or "", language, emotion, contexts, extracted_text, cancel)
+        if shortcut is not None:
+            shortcut['generation_time'] = time.time() - start_time
+            yield {'type': 'done', **shortcut}
+            return
         
-        with ThreadPoolExecutor(max_workers=1) as executor:
-            future = executor.submit(
-                self._generate_with_claire_gguf_safe,
+        try:
+            slot_id = self.scheduler.acquire(timeout=self._queue_timeout(cancel))
+        except SchedulerBusy as e:
+            logger.warning(f"No generation slot available ({e}), skipping to retrieval-only")
+            result['answer'] = self._format_retrieved_contexts(
                 question, language, emotion, contexts, extracted_text
             )
+            result['success'] = True
+            result['method'] = 'retrieval_only_busy'
+            result['fallback_reason'] = str(e)
+            yield {'type': 'done', **result}
+            return
+        
+        token = self._generation_token(cancel)
+        stream = None
+        answer_parts = []
+        self._track(token)
+        try:
+            model = self.scheduler.slots[slot_id]
+            prompt = self._build_prompt(model, question, language, emotion, contexts, extracted_text)
+            prefill_stats = self._prepare_prefill(model, prompt)
+            prefill_stats['max_tokens'] = self._answer_budget(prompt, prefill_stats['cached_tokens'], token)
+            cleaner = StreamingTextCleaner()
+            generation_start = time.time()
+            first_token_time = None
+            n_tokens = 0
             
             try:
-                result = future.result(timeout=timeout_seconds)
-                return result
-                
-            except FutureTimeoutError:
-                logger.warning(f"Generation timed out after {timeout_seconds}s")
-                self._stop_generation = True
-                future.cancel()
-                
-                # Clean up
-                if hasattr(self, 'device') and self.device.type == "cuda":
-                    try:
-                        torch.cuda.empty_cache()
-                    except:
-                        pass
-                
-                raise TimeoutError("Generation timed out")
+                self._prefill(model, prompt, prefill_stats['cached_tokens'], token)
+                stream = model(
+                    prompt.tokens,
+                    max_tokens=prefill_stats['max_tokens'],
+                    temperature=settings.MODEL_TEMPERATURE,
+                    top_p=settings.MODEL_TOP_P,
+                    echo=False,
+                    stop=STOP_SEQUENCES,
+                    repeat_penalty=settings.MODEL_REPEAT_PENALTY,
+                    stopping_criteria=self._stopping_criteria(token),
+                    stream=True,
+                )
                 
-            except Exception as e:
-                logger.error(f"Error in generation wrapper: {e}")
-                return None
+                for chunk in stream:
+                    n_tokens += 1
+                    if first_token_time is None:
+                        first_token_time = time.time()
+                        self._log_prefill(prefill_stats, first_token_time - generation_start)
+                    
+                    text = cleaner.feed(chunk['choices'][0]['text'])
+                    if text:
+                        answer_parts.append(text)
+                        yield {'type': 'token', 'text': text}
+                    token.check()
+                # The stopping criterion ends the stream like a stop sequence would
+                token.check()
+            except GenerationCancelled as e:
+                logger.warning(f"Streaming generation stopped ({e.reason}) after {n_tokens} tokens")
+                result['timeout'] = e.reason in ("timeout", "deadline")
+                result['cancelled'] = e.reason
+                result['fallback_reason'] = f"generation stopped: {e.reason}"
+            
+            self._record_draft(model, n_tokens)
+            self._record_timings(prefill_stats, generation_start, first_token_time, n_tokens)
+            tail = cleaner.finish()
+            if tail:
+                answer_parts.append(tail)
+                yield {'type': 'token', 'text': tail}
+            
+            end_time = time.time()
+            if first_token_time is not None:
+                result['time_to_first_token'] = first_token_time - start_time
+                decode_time = end_time - first_token_time
+                result['tokens_per_second'] = (n_tokens - 1) / decode_time if n_tokens > 1 and decode_time > 0 else None
+                logger.info(
+                    f"Streaming generation: TTFT {result['time_to_first_token']:.2f}s, "
+                    f"{n_tokens} tokens, {result['tokens_per_second'] or 0:.1f} tokens/s"
+                )
+            
+            if result['cancelled'] == "timeout":
+                self.last_timeout = time.time()
+            
+            result['answer'] = ''.join(answer_parts)
+            result['success'] = bool(result['answer'])
+            result['method'] = 'claire_rag' if result['answer'] else 'retrieval_only'
+            
+        except Exception as e:
+            logger.error(f"Error during streaming generation: {e}")
+            logger.error(f"Traceback: {traceback.format_exc()}")
+            result['method'] = 'retrieval_only'
+            result['fallback_reason'] = f"generation error: {e}"
+            
+        finally:
+            # Closing the llama.cpp generator stops decoding if the client went away
+            if stream is not None and hasattr(stream, 'close'):
+                stream.close()
+            self._untrack(token)
+            self.scheduler.release(slot_id)
+        
+        if not result['answer']:
+            # Nothing was streamed: send the retrieval-only answer in one piece
+            result['answer'] = self._format_retrieved_contexts(
+                question, language, emotion, contexts, extracted_text
+            )
+            result['success'] = True
+            result['fallback_reason'] = result['fallback_reason'] or "empty generation"
+            if result['timeout']:
+                result['answer'] = f"{result['answer']}\n\n{self._get_timeout_note(language)}"
+        
+        result['generation_time'] = time.time() - start_time
+        yield {'type': 'done', **result}
+    
+    def _get_shortcut_result(
+        self,
+        result: Dict[str, Any],
+        question: str,
+        language: str,
+        emotion: str,
+        contexts: List[Dict[str, Any]],
+        extracted_text: str,
+        cancel: Optional[CancelToken] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Fill in and return result for requests answered without the LLM
+        (greeting, no context, no model, cooldown, budget spent), or None to generate.
+        """
+        # Check if this is a greeting message
+        is_greeting, greeting_type, _ = self._is_greeting_message(question, language)
+        if is_greeting:
+            logger.info(f"Detected greeting message: {greeting_type}")
+            result['answer'] = self._get_greeting_response(greeting_type, language, emotion)
+            result['success'] = True
+            result['method'] = 'greeting_response'
+            result['fallback_reason'] = f"greeting ({greeting_type})"
+            return result
+            
+        # Check if we have contexts
+        if not contexts or len(contexts) == 0:
+            result['answer'] = self._get_no_context_response(language, emotion)
+            result['method'] = 'no_context'
+            result['success'] = True
+            result['fallback_reason'] = "no retrieved contexts"
+            return result
+        
+        # Skip generation if model not loaded or in cooldown
+        if self.model is None:
+            logger.info("Model not loaded, using retrieval-only")
+            result['answer'] = self._format_retrieved_contexts(
+                question, language, emotion, contexts, extracted_text
+            )
+            result['success'] = True
+            result['method'] = 'retrieval_only_no_model'
+            result['fallback_reason'] = "model not loaded"
+            return result
+        
+        # Check if we're in cooldown period after recent timeout
+        if self._should_skip_generation():
+            logger.info("Using retrieval-only due to recent timeout cooldown")
+            result['answer'] = self._format_retrieved_contexts(
+                question, language, emotion, contexts, extracted_text
+            )
+            result['success'] = True
+            result['method'] = 'retrieval_only_cooldown'
+            result['fallback_reason'] = f"cooldown after a generation timeout ({self.timeout_cooldown}s)"
+            return result
+        
+        # Not enough of the request's budget left for a useful answer, or the client is gone
+        if cancel is not None and (cancel.cancelled or not self._has_generation_budget(cancel)):
+            logger.info(f"Using retrieval-only: {cancel.reason or 'request budget too small for generation'}")
+            result['answer'] = self._format_retrieved_contexts(
+                question, language, emotion, contexts, extracted_text
+            )
+            result['success'] = True
+            result['method'] = 'retrieval_only_deadline'
+            result['cancelled'] = cancel.reason
+            result['fallback_reason'] = cancel.reason or "request budget too small for generation"
+            return result
+        
+        return None
+    
+    @staticmethod
+    def _has_generation_budget(cancel: CancelToken) -> bool:
+        remaining = cancel.remaining()
+        return remaining is None or remaining >= settings.DEADLINE_RESERVE_SECONDS + settings.DEADLINE_MIN_GENERATION_SECONDS
+    
+    @staticmethod
+    def _queue_timeout(cancel: Optional[CancelToken]) -> float:
+        """How long to wait for a slot: never so long that no useful generation time would be left"""
+        remaining = cancel.remaining() if cancel is not None else None
+        if remaining is None:
+            return settings.GENERATION_QUEUE_TIMEOUT
+        spare = remaining - settings.DEADLINE_RESERVE_SECONDS - settings.DEADLINE_MIN_GENERATION_SECONDS
+        return max(min(settings.GENERATION_QUEUE_TIMEOUT, spare), 0.0)
+    
+    def _generation_token(self, cancel: Optional[CancelToken]) -> CancelToken:
+        """
+        Token for one generation. It fires after generation_timeout or with
+        cancel, and DEADLINE_RESERVE_SECONDS before cancel's own time runs out,
+        so the fallback answer still gets back to the client in time. Stopping
+        for the request budget reports "deadline", which starts no cooldown.
+        """
+        timeout, reason = self.generation_timeout, "timeout"
+        remaining = cancel.remaining() if cancel is not None else None
+        if remaining is not None and remaining - settings.DEADLINE_RESERVE_SECONDS < timeout:
+            timeout, reason = max(remaining - settings.DEADLINE_RESERVE_SECONDS, 0.0), "deadline"
+        return CancelToken(timeout, parent=cancel, expiry_reason=reason)
+    
+    def _track(self, token: CancelToken):
+        with self._active_lock:
+            self._active_tokens.add(token)
+    
+    def _untrack(self, token: CancelToken):
+        with self._active_lock:
+            self._active_tokens.discard(token)
+    
+    @contextmanager
+    def _tracked(self, token: CancelToken):
+        """Register token so shutdown() can cancel the generation it belongs to"""
+        self._track(token)
+        try:
+            yield token
+        finally:
+            self._untrack(token)
+    
+    @staticmethod
+    def _stopping_criteria(token: CancelToken):
+        """Ends llama.cpp's token loop as soon as token fires, even while output is held back for stop sequences"""
+        return StoppingCriteriaList([lambda input_ids, logits: token.cancelled])
+    
+    def _prefill(self, model, prompt: BuiltPrompt, cached_tokens: int, token: CancelToken):
+        """
+        Evaluate the uncached prompt tokens in n_batch chunks, checking token in
+        between, so a long prefill cannot overrun the deadline by more than one
+        chunk. The last prompt token is left for llama.cpp's generate(), which
+        always re-evaluates at least one token and reuses the rest as a prefix.
+        """
+        model.n_tokens = cached_tokens
+        end = len(prompt.tokens) - 1
+        for start in range(cached_tokens, end, settings.MODEL_BATCH_SIZE):
+            token.check()
+            model.eval(prompt.tokens[start:min(start + settings.MODEL_BATCH_SIZE, end)])
+        token.check()
     
     def _generate_with_claire_gguf_safe(
         self,
@@ -567,73 +1002,67 @@ class AnswerGenerator:
         language: str,
         emotion: str,
         contexts: List[Dict[str, Any]],
-        extracted_text: str
+        extracted_text: str,
+        model=None,
+        cancel: Optional[CancelToken] = None
     ) -> Optional[str]:
         """
         Safe generation with GGUF model using llama-cpp-python.
         Uses Alpaca format matching the training template.
+        Raises GenerationCancelled within one token of cancel firing.
         """
         
         try:
+            model = model if model is not None else self.model
+            cancel = cancel or CancelToken(self.generation_timeout)
+            
             # Validate model
-            if self.model is None:
+            if model is None:
                 logger.error("Model is None")
                 return None
             
-            # Format contexts exactly as in training (4 contexts with scores)
-            context_texts = []
-            for i, ctx in enumerate(contexts[:4]):  # Use up to 4 contexts as in training
-                try:
-                    score = ctx.get('score', 0)
-                    content = ctx.get('content', '')[:500]
-                    context_texts.append(f"Context {i+1} (Score: {score:.2f}): {content}")
-                except Exception as e:
-                    logger.warning(f"Error formatting context {i}: {e}")
-                    continue
-            
-            # Ensure we have exactly 4 contexts (pad with empty if needed)
-            while len(context_texts) < 4:
-                context_texts.append(f"Context {len(context_texts)+1} (Score: 0.00): No additional context available.")
-            
-            formatted_contexts = "\n\n".join(context_texts)
-            
-            # Add extracted text if available (prepend to contexts)
-            if extracted_text:
-                formatted_contexts = f"User Document: {extracted_text[:500]}\n\n{formatted_contexts}"
-            
-            # Create prompt using EXACT Alpaca format from training
-            prompt = (
-                f"### Instruction:\n"
-                f"You are CLAIRE (Conversational Language AI for Resolution & Engagement), "
-                f"a banking customer assistant working for BPI (Bank of the Philippine Islands). "
-                f"Your role is to answer customer questions accurately, clearly, and empathetically. "
-                f"Given the question, its identified language and emotion, and four context documents, "
-                f"generate a response that is linguistically accurate, emotionally appropriate, "
-                f"and grounded in the most relevant context.\n\n"
-                f"### Input:\n"
-                f"Question: {question}\n"
-                f"Language: {language}\n"
-                f"Emotion: {emotion}\n\n"
-                f"Contexts:\n{formatted_contexts}\n\n"
-                f"### Output:\n"
-            )
+            prompt = self._build_prompt(model, question, language, emotion, contexts, extracted_text)
             
             # Generate response using llama-cpp-python
-            logger.debug(f"Generating with Alpaca format prompt ({len(prompt)} chars)")
+            logger.debug(f"Generating with Alpaca format prompt ({len(prompt.tokens)} tokens)")
+            prefill_stats = self._prepare_prefill(model, prompt)
+            # Only as many answer tokens as the measured speed can decode in the time left
+            prefill_stats['max_tokens'] = self._answer_budget(prompt, prefill_stats['cached_tokens'], cancel)
             
-            response = self.model(
-                prompt,
-                max_tokens=settings.MODEL_MAX_TOKENS,
+            # Streamed internally so the time to the first token (prefill) can be
+            # measured and the cancel token checked after every token
+            generation_start = time.time()
+            first_token_time = None
+            chunks = []
+            self._prefill(model, prompt, prefill_stats['cached_tokens'], cancel)
+            stream = model(
+                prompt.tokens,
+                max_tokens=prefill_stats['max_tokens'],
                 temperature=settings.MODEL_TEMPERATURE,
                 top_p=settings.MODEL_TOP_P,
                 echo=False,
-                stop=["### Instruction:", "### Input:", "### Output:", "\n\n### ", "</s>"],
+                stop=STOP_SEQUENCES,
                 repeat_penalty=settings.MODEL_REPEAT_PENALTY,
+                stopping_criteria=self._stopping_criteria(cancel),
+                stream=True,
             )
+            try:
+                for chunk in stream:
+                    if first_token_time is None:
+                        first_token_time = time.time()
+                        self._log_prefill(prefill_stats, first_token_time - generation_start)
+                    chunks.append(chunk['choices'][0]['text'])
+                    cancel.check()
+                cancel.check()
+            finally:
+                # Stops llama.cpp's generator right here instead of at the next token
+                stream.close()
+                self._record_draft(model, len(chunks))
+                self._record_timings(prefill_stats, generation_start, first_token_time, len(chunks))
             
             # Extract the generated text
-            if response and 'choices' in response and len(response['choices']) > 0:
-                generated_text = response['choices'][0]['text'].strip()
+            if chunks:
+                generated_text = ''.join(chunks).strip()
                 
                 # Clean up the response (remove any Alpaca artifacts)
                 generated_text = self._clean_generated_text(generated_text)
@@ -643,11 +1072,36 @@ class AnswerGenerator:
                 logger.warning("No valid response from model")
                 return None
             
+        except GenerationCancelled:
+            raise
         except Exception as e:
             logger.error(f"Error in safe GGUF generation: {e}")
             logger.error(f"Traceback: {traceback.format_exc()}")
             return None
     
+    def _build_prompt(
+        self,
+        model,
+        question: str,
+        language: str,
+        emotion: str,
+        contexts: List[Dict[str, Any]],
+        extracted_text: str
+    ) -> BuiltPrompt:
+        """Build the Alpaca-format prompt (training template), fitted to the context window with model's tokenizer"""
+        builder = PromptBuilder(
+            model,
+            PROMPT_PREFIX,
+            n_ctx=settings.MODEL_CONTEXT_SIZE,
+            max_answer_tokens=settings.MODEL_MAX_TOKENS,
+            answer_reserve=settings.PROMPT_ANSWER_RESERVE,
+            max_question_tokens=settings.PROMPT_QUESTION_MAX_TOKENS,
+            max_document_tokens=settings.PROMPT_DOCUMENT_MAX_TOKENS,
+            min_context_tokens=settings.PROMPT_CONTEXT_MIN_TOKENS
+        )
+        with span("prompt_build"), STAGE_SECONDS.time(stage="prompt_build"):
+            return builder.build(question, language, emotion, contexts, extracted_text)
+    
     def _clean_generated_text(self, text: str) -> str:
         """Clean up generated text by removing artifacts from Alpaca format"""
         try:
@@ -789,13 +1243,17 @@ class AnswerGenerator:
         try:
             logger.info("Shutting down AnswerGenerator...")
             
-            # Set stop flag
-            self._stop_generation = True
+            # Stop generations in progress; their requests get the retrieval-only answer
+            with self._active_lock:
+                for token in list(self._active_tokens):
+                    token.cancel("shutdown")
             
             # Clear model from memory
             if self.model is not None:
                 del self.model
                 self.model = None
+            self.models = []
+            self.scheduler = None
             
             # Clean up CUDA memory if applicable
             if hasattr(self, 'device') and self.device.type == "cuda":
@@ -0,0 +1,99 @@
+import time
+import logging
+import threading
+from typing import Dict, Optional
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class GenerationCancelled(Exception):
+    """Raised from a generation loop once its CancelToken has fired"""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class CancelToken:
+    """
+    Per-request cancellation of a llama.cpp generation.
+
+    The token fires when cancel() is called (shutdown, client gone) or when
+    its timeout passes. The generation loop checks it between prefill chunks
+    and after every decoded token. A fired token therefore stops decoding
+    within one token and prefill within one n_batch chunk, and the slot is
+    released straight away.
+
+    A token with a parent also fires when the parent does (for example the
+    request's Deadline), taking over the parent's reason.
+    """
+
+    def __init__(self, timeout: Optional[float] = None, parent: Optional["CancelToken"] = None,
+                 expiry_reason: str = "timeout"):
+        self.timeout = timeout
+        self.deadline = time.monotonic() + timeout if timeout is not None else None
+        self.parent = parent
+        self.expiry_reason = expiry_reason
+        self.reason: Optional[str] = None
+        self._event = threading.Event()
+
+    def cancel(self, reason: str = "cancelled"):
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        if not self._event.is_set():
+            if self.parent is not None and self.parent.cancelled:
+                self.cancel(self.parent.reason)
+            elif self.deadline is not None and time.monotonic() >= self.deadline:
+                self.cancel(self.expiry_reason)
+        return self._event.is_set()
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left before this token or its parent times out, or None without a timeout"""
+        remaining = None if self.deadline is None else max(self.deadline - time.monotonic(), 0.0)
+        parent = self.parent.remaining() if self.parent is not None else None
+        if parent is not None and (remaining is None or parent < remaining):
+            return parent
+        return remaining
+
+    def check(self):
+        if self.cancelled:
+            raise GenerationCancelled(self.reason)
+
+
+class Deadline(CancelToken):
+    """
+    A request's end-to-end latency budget, visible to every chat stage.
+
+    The deadline middleware creates one per request from route_budget(). Each
+    stage asks allows() before it starts, and skips or shortens its work when
+    too little budget is left: classification falls back to defaults,
+    retrieval is skipped, and generation answers retrieval-only. cancel()
+    abandons the request, for example when the client has gone away.
+    Generation tokens created with the deadline as parent stop with it.
+    """
+
+    def __init__(self, budget: float, route: str = ""):
+        super().__init__(budget, expiry_reason="deadline")
+        self.route = route
+        self.skipped: Dict[str, str] = {}  # Stage -> why it was skipped or cut short
+
+    def allows(self, seconds: float) -> bool:
+        """True if seconds of work still fit in the budget"""
+        return not self.cancelled and self.remaining() >= seconds
+
+    def skip(self, stage: str, reason: str):
+        self.skipped[stage] = reason
+        logger.warning(f"{self.route}: {stage} skipped ({reason}, {self.remaining():.1f}s of {self.timeout:.0f}s left)")
+
+
+def route_budget(path: str) -> float:
+    """Budget for path: the longest matching prefix in REQUEST_BUDGETS, else REQUEST_TIMEOUT"""
+    matches = [prefix for prefix in settings.REQUEST_BUDGETS if path.startswith(prefix)]
+    if not matches:
+        return float(settings.REQUEST_TIMEOUT)
+    return float(settings.REQUEST_BUDGETS[max(matches, key=len)])
@@ -0,0 +1,162 @@
+import os
+import time
+import hashlib
+import logging
+from pathlib import Path
+from typing import List, Optional, Sequence
+import numpy as np
+import torch
+from app.config import settings
+from app.core.thread_budget import get_thread_budget
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("eager", "torchscript", "onnx")
+INPUT_NAMES = ["input_ids", "attention_mask"]
+
+
+def _example_inputs(device) -> tuple:
+    """Padded batch of two so tracing/export does not specialise on batch size 1 or an all-ones mask"""
+    input_ids = torch.randint(1000, 2000, (2, 16), dtype=torch.long, device=device)
+    attention_mask = torch.ones((2, 16), dtype=torch.long, device=device)
+    attention_mask[1, 10:] = 0
+    return input_ids, attention_mask
+
+
+def _export_stem(name: str, sources: Sequence[str]) -> str:
+    """File stem that changes whenever one of the source checkpoints changes"""
+    parts = [name]
+    for path in sources:
+        stat = os.stat(path)
+        parts.append(f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}")
+    return f"{name}-{hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()[:12]}"
+
+
+def export_onnx(module: torch.nn.Module, output_names: List[str], path: Path, quantize: bool = True) -> Path:
+    """
+    Export module(input_ids, attention_mask) to ONNX with dynamic batch/sequence
+    axes, optionally followed by int8 dynamic quantization of the weights.
+    Returns the path of the model to load (the .int8.onnx file when quantized).
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in INPUT_NAMES}
+    dynamic_axes.update({name: {0: "batch"} for name in output_names})
+
+    start = time.perf_counter()
+    module.eval()
+    with torch.no_grad():
+        torch.onnx.export(
+            module,
+            _example_inputs(next(module.parameters()).device),
+            str(path),
+            input_names=INPUT_NAMES,
+            output_names=output_names,
+            dynamic_axes=dynamic_axes,
+            opset_version=17,
+            dynamo=False
+        )
+    logger.info(f"Exported {path.name} in {time.perf_counter() - start:.1f}s")
+
+    if not quantize:
+        return path
+
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+    quantized_path = path.with_suffix(".int8.onnx")
+    quantize_dynamic(str(path), str(quantized_path), weight_type=QuantType.QInt8)
+    logger.info(
+        f"Quantized {path.name}: {path.stat().st_size / 1e6:.0f} MB -> "
+        f"{quantized_path.stat().st_size / 1e6:.0f} MB"
+    )
+    return quantized_path
+
+
+class ClassifierRunner:
+    """
+    Callable with the eager forward signature, (input_ids, attention_mask) ->
+    logits (or a tuple of logits), backed by the configured inference backend.
+
+    Detectors call runner(...) where they used to call the nn.Module, so
+    tokenization, bucketing and softmax/argmax stay the same for every backend.
+    """
+
+    def __init__(self, backend: str, fn, num_outputs: int, location: Optional[str] = None):
+        self.backend = backend
+        self.location = location
+        self._fn = fn
+        self._num_outputs = num_outputs
+
+    def __call__(self, input_ids, attention_mask):
+        return self._fn(input_ids, attention_mask)
+
+    def eval(self):
+        return self
+
+    @classmethod
+    def eager(cls, module: torch.nn.Module, num_outputs: int) -> "ClassifierRunner":
+        return cls("eager", module.forward, num_outputs)
+
+    @classmethod
+    def torchscript(cls, module: torch.nn.Module, num_outputs: int) -> "ClassifierRunner":
+        device = next(module.parameters()).device
+        with torch.no_grad():
+            traced = torch.jit.trace(module.eval(), _example_inputs(device), strict=False)
+            traced = torch.jit.optimize_for_inference(torch.jit.freeze(traced))
+        return cls("torchscript", traced, num_outputs)
+
+    @classmethod
+    def onnx(cls, module: torch.nn.Module, num_outputs: int, name: str, sources: Sequence[str]) -> "ClassifierRunner":
+        import onnxruntime as ort
+
+        quantize = settings.CLASSIFIER_ONNX_QUANTIZE
+        fp32_path = Path(settings.CLASSIFIER_EXPORT_DIR) / f"{_export_stem(name, sources)}.onnx"
+        model_path = fp32_path.with_suffix(".int8.onnx") if quantize else fp32_path
+        if not model_path.exists():
+            output_names = [f"logits_{i}" for i in range(num_outputs)]
+            model_path = export_onnx(module, output_names, fp32_path, quantize=quantize)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = get_thread_budget().threads("classifiers", torch.get_num_threads())
+        session = ort.InferenceSession(str(model_path), options, providers=["CPUExecutionProvider"])
+
+        def run(input_ids, attention_mask):
+            outputs = session.run(None, {
+                "input_ids": input_ids.cpu().numpy().astype(np.int64),
+                "attention_mask": attention_mask.cpu().numpy().astype(np.int64)
+            })
+            logits = tuple(torch.from_numpy(output) for output in outputs)
+            return logits if num_outputs > 1 else logits[0]
+
+        logger.info(f"Loaded ONNX Runtime session from {model_path.name}")
+        return cls("onnx", run, num_outputs, location=str(model_path))
+
+
+def build_runner(module: torch.nn.Module, name: str, sources: Sequence[str], num_outputs: int = 1) -> ClassifierRunner:
+    """
+    Wrap a loaded classifier in the backend selected by CLASSIFIER_BACKEND.
+
+    ONNX exports are cached under CLASSIFIER_EXPORT_DIR keyed by the source
+    checkpoints, so the export only happens on the first start after a
+    checkpoint changes. The ONNX backend always runs on CPU. A backend that
+    cannot be built (missing onnxruntime, export/trace failure) falls back to
+    eager with a warning instead of taking the classifiers down.
+    """
+    get_thread_budget().apply("classifiers")
+    backend = settings.CLASSIFIER_BACKEND.lower()
+    if backend not in BACKENDS:
+        logger.warning(f"Unknown CLASSIFIER_BACKEND '{backend}', using eager")
+        backend = "eager"
+
+    try:
+        if backend == "torchscript":
+            runner = ClassifierRunner.torchscript(module, num_outputs)
+        elif backend == "onnx":
+            runner = ClassifierRunner.onnx(module, num_outputs, name, sources)
+        else:
+            runner = ClassifierRunner.eager(module, num_outputs)
+    except Exception as e:
+        logger.warning(f"Could not build {backend} backend for {name} classifier, using eager: {e}")
+        runner = ClassifierRunner.eager(module, num_outputs)
+
+    logger.info(f"{name} classifier inference backend: {runner.backend}")
+    return runner
@@ -0,0 +1,210 @@
+import os
+import mmap
+import json
+import pickle
+import struct
+import logging
+from collections.abc import Mapping, Sequence
+from pathlib import Path
+from array import array
+from typing import Any, Dict, Iterable, List, Union
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"CLAIREDS"
+FORMAT_VERSION = 1
+ALIGNMENT = 8
+
+# Free text stored in the UTF-8 blob; every other key is a metadata column
+TEXT_FIELDS = ("content", "title")
+MISSING = -1
+
+
+def _align(n: int) -> int:
+    return (n + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def write_document_store(path: Union[str, Path], documents: Iterable[Mapping]):
+    """
+    Write documents to a single file:
+
+        MAGIC | u32 header length | JSON header | aligned sections
+
+    Text fields are concatenated into one UTF-8 blob addressed by a uint64
+    offsets table per field. Metadata fields (category, source, ...) repeat a
+    handful of values, so each distinct value is stored once in the header
+    and documents hold an int32 code (-1 = key absent).
+    """
+    documents = list(documents)
+    count = len(documents)
+    meta_fields = [
+        key for key in dict.fromkeys(key for doc in documents for key in doc)
+        if key not in TEXT_FIELDS
+    ]
+
+    blob = bytearray()
+    offsets = {field: array('Q') for field in TEXT_FIELDS}
+    for field in TEXT_FIELDS:
+        for doc in documents:
+            offsets[field].append(len(blob))
+            blob += str(doc.get(field, '')).encode('utf-8')
+        offsets[field].append(len(blob))
+
+    tables: Dict[str, List[Any]] = {}
+    codes = {}
+    for field in meta_fields:
+        interned: Dict[Any, int] = {}
+        column = array('i', [MISSING]) * count
+        for i, doc in enumerate(documents):
+            if field in doc:
+                column[i] = interned.setdefault(doc[field], len(interned))
+        tables[field] = list(interned)
+        codes[field] = column
+
+    sections = [(f"{field}.offsets", offsets[field].tobytes()) for field in TEXT_FIELDS]
+    sections += [(f"{field}.codes", codes[field].tobytes()) for field in meta_fields]
+    sections.append(("text", bytes(blob)))
+
+    layout = {}
+    position = 0
+    for name, data in sections:
+        layout[name] = [position, len(data)]
+        position = _align(position + len(data))
+
+    header = json.dumps({
+        "version": FORMAT_VERSION,
+        "count": count,
+        "text_fields": list(TEXT_FIELDS),
+        "meta_fields": tables,
+        "sections": layout,
+    }, ensure_ascii=False).encode('utf-8')
+
+    path = Path(path)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    data_start = _align(len(MAGIC) + 4 + len(header))
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<I', len(header)))
+        f.write(header)
+        for name, data in sections:
+            f.seek(data_start + layout[name][0])
+            f.write(data)
+    os.replace(tmp_path, path)
+
+
+def migrate_pickle(pickle_path: Union[str, Path], store_path: Union[str, Path]) -> int:
+    """Convert a documents.pkl (list of dicts) into a document store; returns the document count"""
+    with open(pickle_path, 'rb') as f:
+        documents = pickle.load(f)
+    write_document_store(store_path, documents)
+    logger.info(f"Migrated {len(documents)} documents from {Path(pickle_path).name} to {Path(store_path).name}")
+    return len(documents)
+
+
+class StoredDocument(Mapping):
+    """Read-only document view; fields are decoded from the mapped file on access"""
+
+    __slots__ = ("_store", "_index")
+
+    def __init__(self, store: "DocumentStore", index: int):
+        self._store = store
+        self._index = index
+
+    def __getitem__(self, key):
+        return self._store.field(self._index, key)
+
+    def __iter__(self):
+        yield from self._store.text_fields
+        for field, codes in self._store._codes.items():
+            if codes[self._index] != MISSING:
+                yield field
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"StoredDocument({self._index}, title={self.get('title')!r})"
+
+
+class DocumentStore(Sequence):
+    """
+    Memory-mapped document store written by write_document_store.
+
+    Opening it only parses the header; the pages holding a document's text are
+    read from disk (and shared between processes mapping the same file) when a
+    field of that document is accessed.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._view = None
+        self._offsets: Dict[str, memoryview] = {}
+        self._codes: Dict[str, memoryview] = {}
+        self._file = open(self.path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mm[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{self.path} is not a document store")
+        (header_length,) = struct.unpack_from('<I', self._mm, len(MAGIC))
+        header_start = len(MAGIC) + 4
+        header = json.loads(self._mm[header_start:header_start + header_length].decode('utf-8'))
+        if header["version"] != FORMAT_VERSION:
+            self.close()
+            raise ValueError(f"Unsupported document store version {header['version']}")
+
+        data_start = _align(header_start + header_length)
+        sections = header["sections"]
+        self.count = header["count"]
+        self.text_fields = tuple(header["text_fields"])
+        self._tables = header["meta_fields"]
+        self._view = memoryview(self._mm)
+        self._offsets = {
+            field: self._section(data_start, sections[f"{field}.offsets"], 'Q')
+            for field in self.text_fields
+        }
+        self._codes = {
+            field: self._section(data_start, sections[f"{field}.codes"], 'i')
+            for field in self._tables
+        }
+        self._text_start = data_start + sections["text"][0]
+
+    def _section(self, data_start: int, location: List[int], fmt: str) -> memoryview:
+        start = data_start + location[0]
+        return self._view[start:start + location[1]].cast(fmt)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [StoredDocument(self, i) for i in range(*index.indices(self.count))]
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("document index out of range")
+        return StoredDocument(self, index)
+
+    def field(self, index: int, key: str):
+        offsets = self._offsets.get(key)
+        if offsets is not None:
+            start = self._text_start + int(offsets[index])
+            end = self._text_start + int(offsets[index + 1])
+            return self._mm[start:end].decode('utf-8')
+        codes = self._codes.get(key)
+        if codes is None or codes[index] == MISSING:
+            raise KeyError(key)
+        return self._tables[key][codes[index]]
+
+    def close(self):
+        # Exported views pin the mapping; release them before closing it
+        for view in (*self._offsets.values(), *self._codes.values()):
+            view.release()
+        self._offsets = {}
+        self._codes = {}
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+        if not self._mm.closed:
+            self._mm.close()
+        self._file.close()
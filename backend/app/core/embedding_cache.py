@@ -0,0 +1,77 @@
+import hashlib
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    """
+    Persistent, content-addressed store of section embeddings.
+
+    Entries are keyed by sha256(model name + section content), so a vector is
+    reused only if both the text and the embedding model are unchanged.
+    Stored on disk as a single .npz (keys + float32 matrix).
+    """
+
+    def __init__(self, path: Path, model_name: str):
+        self.path = Path(path)
+        self.model_name = model_name
+        self._vectors: Dict[str, np.ndarray] = {}
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def key(self, content: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\x00{content}".encode("utf-8")).hexdigest()
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                self._vectors = dict(zip(data["keys"].tolist(), data["vectors"]))
+            logger.info(f"Loaded {len(self._vectors)} cached embeddings from {self.path}")
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable embedding cache {self.path}: {e}")
+            self._vectors = {}
+
+    def lookup(self, texts: List[str]) -> Tuple[List[str], Dict[int, np.ndarray], List[int]]:
+        """Return (keys, {position: cached vector}, positions that still need encoding)"""
+        keys = [self.key(text) for text in texts]
+        found = {}
+        missing = []
+        for i, key in enumerate(keys):
+            vector = self._vectors.get(key)
+            if vector is not None:
+                found[i] = vector
+            else:
+                missing.append(i)
+        self.hits += len(found)
+        self.misses += len(missing)
+        return keys, found, missing
+
+    def update(self, keys: List[str], vectors: np.ndarray):
+        for key, vector in zip(keys, vectors):
+            self._vectors[key] = np.asarray(vector, dtype=np.float32)
+
+    def save(self, keep: Optional[List[str]] = None):
+        """Write the cache to disk, optionally keeping only the given keys"""
+        if keep is not None:
+            keep_set = set(keep)
+            self._vectors = {k: v for k, v in self._vectors.items() if k in keep_set}
+        if not self._vectors:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        keys = list(self._vectors.keys())
+        # np.savez appends .npz unless the name already ends with it
+        tmp_path = self.path.with_name(self.path.stem + ".tmp.npz")
+        np.savez(tmp_path, keys=np.array(keys), vectors=np.stack([self._vectors[k] for k in keys]))
+        tmp_path.replace(self.path)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
@@ -1,8 +1,9 @@
 import torch
-from typing import Tuple
+from typing import Tuple, List
 import logging
 from app.config import settings
-from app.core.language_model import AdvancedSingleTaskModel
+from app.core.language_model import AdvancedSingleTaskModel, tokenize_in_buckets
+from app.core.classifier_backends import build_runner
 from transformers import DistilBertTokenizer
 
 logger = logging.getLogger(__name__)
@@ -61,6 +62,9 @@ class EmotionDetector:
                 
             self.model.eval()
             
+            # Swap the nn.Module for the configured inference backend (eager / torchscript / onnx)
+            self.model = build_runner(self.model, "emotion", [settings.EMOTION_MODEL_PATH])
+            
             logger.info(f"Emotion model loaded successfully on {self.device}")
         except Exception as e:
             logger.error(f"Error loading emotion model: {e}")
@@ -80,4 +84,17 @@ class EmotionDetector:
             probs = torch.softmax(logits, dim=1)
             idx = probs.argmax(dim=1).item()
             
-        return self.emotion_mapping[idx], probs[0][idx].item()
\ No newline at end of file
+        return self.emotion_mapping[idx], probs[0][idx].item()
+    
+    def predict_batch(self, texts: List[str]) -> List[Tuple[str, float]]:
+        """Predict many texts, one dynamically padded forward pass per length bucket"""
+        results = [None] * len(texts)
+        
+        with torch.no_grad():
+            for bucket, enc in tokenize_in_buckets(self.tokenizer, texts, self.device):
+                logits = self.model(enc["input_ids"], enc["attention_mask"])
+                confidences, indices = torch.softmax(logits, dim=1).max(dim=1)
+                for row, i in enumerate(bucket):
+                    results[i] = (self.emotion_mapping[indices[row].item()], confidences[row].item())
+                    
+        return results
\ No newline at end of file
@@ -0,0 +1,105 @@
+import time
+import threading
+import logging
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SchedulerBusy(Exception):
+    """Raised when the wait queue is full or a queued request waited too long"""
+
+
+class GenerationScheduler:
+    """
+    Hands out a fixed pool of generation slots (one llama.cpp context each)
+    to requests in strict FIFO order.
+
+    A request that finds no free slot waits in a bounded queue instead of
+    being turned away; it is only rejected when the queue is already full or
+    when it has waited longer than its timeout.
+    """
+
+    def __init__(self, slots: List[Any], max_queue: int):
+        self.slots = slots
+        self.max_queue = max_queue
+        self._cond = threading.Condition()
+        self._free = deque(range(len(slots)))
+        self._waiters = deque()
+        self._busy_since: Dict[int, float] = {}
+        self._started = time.monotonic()
+
+        # Counters
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.busy_seconds = 0.0
+
+    @property
+    def size(self) -> int:
+        return len(self.slots)
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def acquire(self, timeout: Optional[float] = None) -> int:
+        """Wait (FIFO) for a free slot and return its id; raises SchedulerBusy"""
+        enqueued = time.monotonic()
+        with self._cond:
+            if self._waiters or not self._free:
+                if len(self._waiters) >= self.max_queue:
+                    self.rejected += 1
+                    raise SchedulerBusy(f"generation queue full ({self.max_queue} waiting)")
+
+                ticket = object()
+                self._waiters.append(ticket)
+                deadline = None if timeout is None else enqueued + timeout
+                while not (self._waiters[0] is ticket and self._free):
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        self._waiters.remove(ticket)
+                        self.timed_out += 1
+                        self._cond.notify_all()
+                        raise SchedulerBusy(f"no generation slot free after {timeout:.0f}s")
+                    self._cond.wait(remaining)
+                self._waiters.popleft()
+
+            slot_id = self._free.popleft()
+            now = time.monotonic()
+            wait = now - enqueued
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            self._busy_since[slot_id] = now
+            # Let the next waiter re-check now that the head of the queue moved
+            self._cond.notify_all()
+            return slot_id
+
+    def release(self, slot_id: int):
+        with self._cond:
+            self.busy_seconds += time.monotonic() - self._busy_since.pop(slot_id)
+            self.completed += 1
+            self._free.append(slot_id)
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            now = time.monotonic()
+            busy_now = sum(now - since for since in self._busy_since.values())
+            uptime = max(now - self._started, 1e-9)
+            admitted = self.completed + len(self._busy_since)
+            return {
+                "slots": self.size,
+                "busy_slots": len(self._busy_since),
+                "queue_depth": len(self._waiters),
+                "max_queue": self.max_queue,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+                "mean_wait_ms": self.total_wait / admitted * 1000 if admitted else 0.0,
+                "max_wait_ms": self.max_wait * 1000,
+                "utilisation": (self.busy_seconds + busy_now) / (uptime * self.size) if self.size else 0.0,
+            }
@@ -0,0 +1,140 @@
+import math
+import time
+import logging
+from typing import Any, Dict, Optional
+import numpy as np
+import faiss
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+INDEX_TYPES = ("flat", "hnsw", "ivf_flat", "ivf_pq")
+
+# faiss warns below ~39 training points per centroid; PQ codebooks have 2**nbits centroids
+MIN_POINTS_PER_CENTROID = 39
+
+
+def _nlist_for(n: int) -> int:
+    """Configured IVF list count, or ~4*sqrt(n) capped so every list gets enough training points"""
+    if settings.IVF_NLIST > 0:
+        return settings.IVF_NLIST
+    return max(1, min(int(4 * math.sqrt(n)), n // MIN_POINTS_PER_CENTROID))
+
+
+def _base_index(index):
+    """The index inside an IndexIDMap wrapper (or index itself)"""
+    if isinstance(index, faiss.IndexIDMap):
+        return faiss.downcast_index(index.index)
+    return index
+
+
+def build_faiss_index(embeddings: np.ndarray, index_type: Optional[str] = None, ids: Optional[np.ndarray] = None):
+    """
+    Build an inner-product index of the configured VECTOR_INDEX_TYPE over
+    L2-normalized embeddings (so scores stay cosine similarities).
+
+    Vectors are stored under ids (default 0..n-1) and searches return those
+    ids: IVF indexes keep them natively, flat and HNSW are wrapped in an
+    IndexIDMap2 so sections can be added and removed individually.
+
+    Returns (index, index_type, build_params). Corpora too small to train the
+    requested IVF / PQ quantizers fall back to flat, and the returned type
+    says so.
+    """
+    index_type = (index_type or settings.VECTOR_INDEX_TYPE).lower()
+    if index_type not in INDEX_TYPES:
+        logger.warning(f"Unknown VECTOR_INDEX_TYPE '{index_type}', using flat")
+        index_type = "flat"
+
+    n, dimension = embeddings.shape
+    embeddings = np.ascontiguousarray(embeddings, dtype='float32')
+    ids = np.arange(n, dtype='int64') if ids is None else np.ascontiguousarray(ids, dtype='int64')
+    params: Dict[str, Any] = {}
+
+    if index_type in ("ivf_flat", "ivf_pq"):
+        nlist = _nlist_for(n)
+        needed = nlist * MIN_POINTS_PER_CENTROID
+        if index_type == "ivf_pq":
+            needed = max(needed, (2 ** settings.IVF_PQ_NBITS) * MIN_POINTS_PER_CENTROID)
+            if dimension % settings.IVF_PQ_M:
+                logger.warning(f"IVF_PQ_M={settings.IVF_PQ_M} does not divide dimension {dimension}, using ivf_flat")
+                index_type = "ivf_flat"
+        if n < needed:
+            logger.warning(f"{n} vectors are too few to train {index_type} (need {needed}), using flat")
+            index_type = "flat"
+
+    start = time.perf_counter()
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dimension, settings.HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = settings.HNSW_EF_CONSTRUCTION
+        params = {"M": settings.HNSW_M, "efConstruction": settings.HNSW_EF_CONSTRUCTION}
+    elif index_type == "ivf_flat":
+        quantizer = faiss.IndexFlatIP(dimension)
+        index = faiss.IndexIVFFlat(quantizer, dimension, nlist, faiss.METRIC_INNER_PRODUCT)
+        index.train(embeddings)
+        params = {"nlist": nlist}
+    elif index_type == "ivf_pq":
+        quantizer = faiss.IndexFlatIP(dimension)
+        index = faiss.IndexIVFPQ(
+            quantizer, dimension, nlist, settings.IVF_PQ_M, settings.IVF_PQ_NBITS, faiss.METRIC_INNER_PRODUCT
+        )
+        index.train(embeddings)
+        params = {"nlist": nlist, "m": settings.IVF_PQ_M, "nbits": settings.IVF_PQ_NBITS}
+    else:
+        index = faiss.IndexFlatIP(dimension)
+
+    if faiss.try_extract_index_ivf(index) is None:
+        index = faiss.IndexIDMap2(index)
+    index.add_with_ids(embeddings, ids)
+    enable_reconstruct(index)
+    logger.info(f"Built {index_type} index over {n} vectors in {time.perf_counter() - start:.2f}s {params}")
+    return index, index_type, params
+
+
+def configure_search(index, ef_search: Optional[int] = None, nprobe: Optional[int] = None) -> Dict[str, Any]:
+    """Apply query-time knobs (HNSW efSearch, IVF nprobe); returns what was set"""
+    applied: Dict[str, Any] = {}
+    base = _base_index(index)
+    if isinstance(base, faiss.IndexHNSW):
+        base.hnsw.efSearch = ef_search or settings.HNSW_EF_SEARCH
+        applied["efSearch"] = base.hnsw.efSearch
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = min(nprobe or settings.IVF_NPROBE, ivf.nlist)
+        applied["nprobe"] = ivf.nprobe
+    return applied
+
+
+def enable_reconstruct(index):
+    """
+    Let index.reconstruct_batch look vectors up by id. IVF indexes need a
+    hashtable direct map for that, which (unlike the array one) also allows
+    arbitrary ids and remove_ids.
+    """
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None and ivf.direct_map.type != faiss.DirectMap.Hashtable:
+        ivf.set_direct_map_type(faiss.DirectMap.Hashtable)
+
+
+def supports_removal(index) -> bool:
+    """Whether sections can be removed in place: ID-mapped flat and IVF yes, HNSW and unmapped indexes no"""
+    if faiss.try_extract_index_ivf(index) is not None:
+        return True
+    return isinstance(index, faiss.IndexIDMap2) and not isinstance(_base_index(index), faiss.IndexHNSW)
+
+
+def search_params(index) -> Dict[str, Any]:
+    """Query-time knobs currently set on index"""
+    params: Dict[str, Any] = {}
+    base = _base_index(index)
+    if isinstance(base, faiss.IndexHNSW):
+        params["efSearch"] = base.hnsw.efSearch
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        params["nprobe"] = ivf.nprobe
+    return params
+
+
+def index_memory_bytes(index) -> int:
+    """Serialized size of the index, a close proxy for its resident memory"""
+    return int(faiss.serialize_index(index).nbytes)
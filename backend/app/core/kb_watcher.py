@@ -0,0 +1,108 @@
+import time
+import asyncio
+import logging
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+from watchfiles import awatch, Change
+from app.config import settings
+from app.core.knowledge_base import KnowledgeBaseProcessor
+
+logger = logging.getLogger(__name__)
+
+
+class KnowledgeBaseWatcher:
+    """
+    Watches KNOWLEDGE_BASE_PATH and applies markdown changes to the vector
+    database while the server keeps answering. Only the changed files are
+    re-parsed; VectorDatabase.update_sections embeds their sections and
+    swaps in the new index atomically.
+    """
+
+    def __init__(self, vector_db, kb_path: Optional[str] = None):
+        self.vector_db = vector_db
+        self.kb_path = Path(kb_path or settings.KNOWLEDGE_BASE_PATH)
+        self._task: Optional[asyncio.Task] = None
+        self._stop: Optional[asyncio.Event] = None
+        self.reloads = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self.last_change_at: Optional[float] = None
+
+    def start(self):
+        if self._task is None:
+            self._stop = asyncio.Event()
+            self._task = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        if self._task is not None:
+            self._stop.set()
+            await self._task
+            self._task = None
+
+    @staticmethod
+    def _filter(change: Change, path: str) -> bool:
+        # Deleted or added directories arrive as a single event for the directory
+        return path.endswith('.md') or change == Change.deleted or Path(path).is_dir()
+
+    async def _watch(self):
+        logger.info(f"Watching {self.kb_path} for knowledge base changes")
+        async for changes in awatch(
+            self.kb_path,
+            watch_filter=self._filter,
+            debounce=settings.KB_WATCH_DEBOUNCE_MS,
+            stop_event=self._stop
+        ):
+            self.last_change_at = time.time()
+            try:
+                # Parsing and embedding are blocking; keep them off the event loop
+                await asyncio.to_thread(self.reload, {Path(path) for _, path in changes})
+                self.reloads += 1
+                self.last_error = None
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                logger.error(f"Knowledge base reload failed, still serving index version "
+                             f"{self.vector_db.index_version}: {e}")
+
+    def reload(self, paths: Iterable[Path]) -> Dict[str, Any]:
+        """Re-parse the given files (or directories) and apply them to the vector database"""
+        processor = KnowledgeBaseProcessor(str(self.kb_path))
+        if not self.vector_db.tracks_files():
+            # Stores written before documents recorded their file cannot be patched
+            logger.info("Index does not record source files; rebuilding the whole knowledge base")
+            documents = processor.process_all_files()
+            self.vector_db.build_index(documents, lexical_index=processor.build_lexical_index())
+            return {}
+
+        changed: Dict[str, List[Dict[str, Any]]] = {}
+        removed: List[str] = []
+        for path in sorted(paths):
+            if path.is_dir():
+                files = sorted(path.glob("**/*.md"))
+            elif path.exists():
+                files = [path] if path.suffix == '.md' else []
+            else:
+                removed.append(processor.file_key(path))
+                continue
+            for file_path in files:
+                try:
+                    changed[processor.file_key(file_path)] = processor.parse_markdown_file(file_path)
+                except Exception as e:
+                    # Keep serving the file's previous sections
+                    logger.error(f"Error processing {file_path}: {e}")
+
+        if not changed and not removed:
+            return {}
+        logger.info(f"Reloading knowledge base: {len(changed)} changed, {len(removed)} removed")
+        return self.vector_db.update_sections(changed, removed)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.KB_WATCH_ENABLED,
+            "running": self._task is not None and not self._task.done(),
+            "path": str(self.kb_path),
+            "reloads": self.reloads,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "last_change_at": self.last_change_at,
+        }
@@ -4,6 +4,7 @@ from bs4 import BeautifulSoup
 from pathlib import Path
 from typing import List, Dict, Any
 import logging
+from app.core.lexical_index import LexicalIndex
 
 logger = logging.getLogger(__name__)
 
@@ -51,12 +52,17 @@ class KnowledgeBaseProcessor:
                     'title': section_title,
                     'category': metadata.get('category', 'general'),
                     'source': metadata.get('source', ''),
-                    'last_updated': metadata.get('last_updated', '')
+                    'last_updated': metadata.get('last_updated', ''),
+                    'file': self.file_key(file_path)
                 }
                 documents.append(doc)
                 
         return documents
         
+    def file_key(self, file_path: Path) -> str:
+        """Path of a knowledge base file relative to the knowledge base root, e.g. 'billing/gcash.md'"""
+        return Path(file_path).resolve().relative_to(self.kb_path.resolve()).as_posix()
+        
     def _extract_metadata(self, content: str) -> Dict:
         """Extract metadata from YAML front matter"""
         metadata = {}
@@ -92,4 +98,8 @@ class KnowledgeBaseProcessor:
                 logger.error(f"Error processing {file_path}: {e}")
                 
         logger.info(f"Total documents processed: {len(self.documents)}")
-        return self.documents
\ No newline at end of file
+        return self.documents
+        
+    def build_lexical_index(self) -> LexicalIndex:
+        """BM25 inverted index over the titles and content of the processed sections"""
+        return LexicalIndex.build(self.documents)
\ No newline at end of file
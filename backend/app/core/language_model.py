@@ -2,12 +2,27 @@ import torch
 import torch.nn as nn
 import torch.nn.functional as F
 from transformers import DistilBertTokenizer, DistilBertModel
-from typing import Tuple
+from typing import Tuple, List
 import logging
 from app.config import settings
+from app.core.micro_batcher import length_buckets
+from app.core.classifier_backends import build_runner
 
 logger = logging.getLogger(__name__)
 
+def tokenize_in_buckets(tokenizer, texts: List[str], device):
+    """Yield (indices, encoding) per length bucket, each padded only to its own longest text"""
+    enc = tokenizer(texts, truncation=True, max_length=settings.MAX_LENGTH)
+    for bucket in length_buckets([len(ids) for ids in enc["input_ids"]]):
+        padded = tokenizer.pad(
+            {
+                "input_ids": [enc["input_ids"][i] for i in bucket],
+                "attention_mask": [enc["attention_mask"][i] for i in bucket]
+            },
+            return_tensors="pt"
+        )
+        yield bucket, padded.to(device)
+
 class AdvancedSingleTaskModel(nn.Module):
     def __init__(self, num_classes, dropout_rate=0.3, freeze_layers=0,
                  use_attention_pooling=True):
@@ -125,6 +140,9 @@ class LanguageDetector:
                 
             self.model.eval()
             
+            # Swap the nn.Module for the configured inference backend (eager / torchscript / onnx)
+            self.model = build_runner(self.model, "language", [settings.LANGUAGE_MODEL_PATH])
+            
             logger.info(f"Language model loaded successfully on {self.device}")
         except Exception as e:
             logger.error(f"Error loading language model: {e}")
@@ -144,4 +162,17 @@ class LanguageDetector:
             probs = torch.softmax(logits, dim=1)
             idx = probs.argmax(dim=1).item()
             
-        return self.language_mapping[idx], probs[0][idx].item()
\ No newline at end of file
+        return self.language_mapping[idx], probs[0][idx].item()
+    
+    def predict_batch(self, texts: List[str]) -> List[Tuple[str, float]]:
+        """Predict many texts, one dynamically padded forward pass per length bucket"""
+        results = [None] * len(texts)
+        
+        with torch.no_grad():
+            for bucket, enc in tokenize_in_buckets(self.tokenizer, texts, self.device):
+                logits = self.model(enc["input_ids"], enc["attention_mask"])
+                confidences, indices = torch.softmax(logits, dim=1).max(dim=1)
+                for row, i in enumerate(bucket):
+                    results[i] = (self.language_mapping[indices[row].item()], confidences[row].item())
+                    
+        return results
\ No newline at end of file
@@ -0,0 +1,174 @@
+import re
+import math
+import unicodedata
+import logging
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Tuple, Union
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Function words that carry no retrieval signal in English, Tagalog or Taglish
+STOPWORDS = frozenset("""
+a an and are as at be but by can do does for from how i if in is it me my of on or our so that the their
+them there these this to was we what when where which who why will with you your yours
+ako ang ano anong at ay ba bakit din daw ito iyan iyon ka kami kay kayo ko kung lang mga mo na naman nang
+ng ni nila niya pa paano pano po rin sa si siya sila tayo yan yon yung
+""".split())
+
+# Tagalog verb/noun prefixes, longest first; only stripped when a real stem remains.
+# Short ones (ma-, na-, i-) are left out: they would mangle English words.
+TAGALOG_PREFIXES = ("makapag", "nakapag", "pinag", "ipag", "maka", "naka", "mag", "nag", "pag")
+MIN_STEM = 4
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-'][a-z0-9]+)*")
+_VOWELS = set("aeiou")
+
+
+def _fold(text: str) -> str:
+    """Lowercase and strip accents (ñ -> n, é -> e) so spellings match"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+
+def _tagalog_stem(token: str) -> str:
+    """
+    Strip one Tagalog prefix and a CV reduplication (magbabayad -> bayad,
+    pagbabayad -> bayad). Returns '' when nothing sensible is left.
+    """
+    for prefix in TAGALOG_PREFIXES:
+        if token.startswith(prefix) and len(token) - len(prefix) >= MIN_STEM:
+            stem = token[len(prefix):]
+            break
+    else:
+        stem = token
+    # Reduplicated first syllable: ba-bayad, ka-kain
+    if len(stem) >= MIN_STEM + 2 and stem[1] in _VOWELS and stem[:2] == stem[2:4]:
+        stem = stem[2:]
+    return stem if stem != token else ""
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Terms for the inverted index. Besides the surface token this also emits
+    the parts of hyphenated forms (i-activate -> activate, 889-10000 -> 889,
+    10000), a Tagalog stem and an English singular, so queries and sections
+    match across affixed, hyphenated and plural spellings. Product names and
+    codes ("bizlink", "eon", "amore") pass through unchanged.
+    """
+    terms = []
+    for token in _TOKEN_RE.findall(_fold(text)):
+        if token in STOPWORDS:
+            continue
+        terms.append(token)
+        parts = re.split(r"[-']", token) if ("-" in token or "'" in token) else []
+        for part in parts:
+            if len(part) > 1 and part not in STOPWORDS and part not in TAGALOG_PREFIXES:
+                terms.append(part)
+        for word in parts or [token]:
+            if word.isalpha():
+                stem = _tagalog_stem(word)
+                if stem:
+                    terms.append(stem)
+                if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+                    terms.append(word[:-1])
+    return terms
+
+
+class LexicalIndex:
+    """
+    Compact BM25 inverted index over section titles and content.
+
+    Postings for all terms live in two flat arrays (doc ids, precomputed BM25
+    term weights) addressed by a per-term offsets table, so a query is a few
+    array slices plus one scatter-add. Title terms count TITLE_BOOST times.
+    """
+
+    K1 = 1.2
+    B = 0.75
+    TITLE_BOOST = 2
+
+    def __init__(self, terms: List[str], offsets: np.ndarray, doc_ids: np.ndarray,
+                 weights: np.ndarray, idf: np.ndarray, num_documents: int):
+        self.vocab: Dict[str, int] = {term: i for i, term in enumerate(terms)}
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.weights = weights
+        self.idf = idf
+        self.num_documents = num_documents
+
+    @classmethod
+    def build(cls, documents: Iterable[Mapping]) -> "LexicalIndex":
+        postings: Dict[str, List[Tuple[int, float]]] = {}
+        lengths = []
+        counts = []
+        for doc in documents:
+            tf = Counter(tokenize(doc.get('content', '')))
+            for term in tokenize(doc.get('title', '')):
+                tf[term] += cls.TITLE_BOOST
+            counts.append(tf)
+            lengths.append(sum(tf.values()))
+
+        num_documents = len(counts)
+        avg_length = (sum(lengths) / num_documents) if num_documents else 1.0
+        for doc_id, (tf, length) in enumerate(zip(counts, lengths)):
+            norm = cls.K1 * (1 - cls.B + cls.B * length / max(avg_length, 1e-9))
+            for term, freq in tf.items():
+                postings.setdefault(term, []).append((doc_id, freq * (cls.K1 + 1) / (freq + norm)))
+
+        terms = sorted(postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        doc_ids, weights, idf = [], [], np.zeros(len(terms), dtype=np.float32)
+        for i, term in enumerate(terms):
+            entries = postings[term]
+            offsets[i + 1] = offsets[i] + len(entries)
+            doc_ids.extend(doc_id for doc_id, _ in entries)
+            weights.extend(weight for _, weight in entries)
+            df = len(entries)
+            idf[i] = math.log(1 + (num_documents - df + 0.5) / (df + 0.5))
+
+        index = cls(terms, offsets, np.asarray(doc_ids, dtype=np.int32),
+                    np.asarray(weights, dtype=np.float32), idf, num_documents)
+        logger.info(f"Lexical index: {num_documents} sections, {len(terms)} terms, {len(doc_ids)} postings")
+        return index
+
+    def scores(self, query: str) -> np.ndarray:
+        """BM25 score of every document for query (zeros where no term matches)"""
+        scores = np.zeros(self.num_documents, dtype=np.float32)
+        for term in set(tokenize(query)):
+            term_id = self.vocab.get(term)
+            if term_id is None:
+                continue
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            np.add.at(scores, self.doc_ids[start:end], self.idf[term_id] * self.weights[start:end])
+        return scores
+
+    def search(self, query: str, top_k: int) -> List[Tuple[int, float]]:
+        """Best top_k (doc id, BM25 score) pairs with a non-zero score, best first"""
+        scores = self.scores(query)
+        matched = np.flatnonzero(scores)
+        if len(matched) > top_k:
+            matched = matched[np.argpartition(-scores[matched], top_k - 1)[:top_k]]
+        order = matched[np.argsort(-scores[matched], kind='stable')]
+        return [(int(i), float(scores[i])) for i in order]
+
+    def save(self, path: Union[str, Path]):
+        terms = sorted(self.vocab, key=self.vocab.get)
+        np.savez(
+            path,
+            terms=np.array(terms, dtype=str),
+            offsets=self.offsets,
+            doc_ids=self.doc_ids,
+            weights=self.weights,
+            idf=self.idf,
+            num_documents=np.array(self.num_documents)
+        )
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "LexicalIndex":
+        with np.load(path) as data:
+            return cls(
+                data['terms'].tolist(), data['offsets'], data['doc_ids'],
+                data['weights'], data['idf'], int(data['num_documents'])
+            )
@@ -0,0 +1,159 @@
+import asyncio
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def length_buckets(lengths: Sequence[int], max_pad_ratio: float = 1.5, min_slack: int = 8) -> List[List[int]]:
+    """
+    Group item indices into buckets of similar length so each bucket can be
+    padded to its own longest member without wasting much compute on padding.
+    A new bucket starts once an item is longer than max_pad_ratio times the
+    shortest item in the current bucket (plus a small fixed slack).
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    buckets: List[List[int]] = []
+    current: List[int] = []
+    shortest = 0
+
+    for i in order:
+        if current and lengths[i] > shortest * max_pad_ratio + min_slack:
+            buckets.append(current)
+            current = []
+        if not current:
+            shortest = lengths[i]
+        current.append(i)
+
+    if current:
+        buckets.append(current)
+    return buckets
+
+
+class BatcherStats:
+    """Running counters for batch sizes and time spent waiting in the queue"""
+
+    def __init__(self):
+        self.batches = 0
+        self.items = 0
+        self.errors = 0
+        self.batch_size_histogram: Dict[int, int] = {}
+        self.total_queue_wait = 0.0
+        self.max_queue_wait = 0.0
+        self.total_batch_time = 0.0
+
+    def record(self, batch_size: int, queue_waits: List[float], batch_time: float):
+        self.batches += 1
+        self.items += batch_size
+        self.batch_size_histogram[batch_size] = self.batch_size_histogram.get(batch_size, 0) + 1
+        self.total_queue_wait += sum(queue_waits)
+        self.max_queue_wait = max(self.max_queue_wait, max(queue_waits, default=0.0))
+        self.total_batch_time += batch_time
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "errors": self.errors,
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+            "batch_size_histogram": dict(sorted(self.batch_size_histogram.items())),
+            "mean_queue_wait_ms": self.total_queue_wait / self.items * 1000 if self.items else 0.0,
+            "max_queue_wait_ms": self.max_queue_wait * 1000,
+            "mean_batch_time_ms": self.total_batch_time / self.batches * 1000 if self.batches else 0.0,
+        }
+
+
+class MicroBatcher:
+    """
+    Merge concurrent single-item requests into batched calls.
+
+    Callers `await submit(item)`; a background task collects up to
+    max_batch_size items (waiting at most max_wait_ms after the first one),
+    runs batch_fn(items) -> results once in a dedicated worker thread so the
+    event loop stays free, and resolves each caller's future with its result.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Any]], List[Any]],
+        name: str,
+        max_batch_size: Optional[int] = None,
+        max_wait_ms: Optional[float] = None,
+        initializer: Optional[Callable[[], None]] = None
+    ):
+        self.batch_fn = batch_fn
+        self.name = name
+        self.max_batch_size = max_batch_size or settings.MICRO_BATCH_MAX_SIZE
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else settings.MICRO_BATCH_MAX_WAIT_MS) / 1000
+        self.stats = BatcherStats()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"batcher-{name}", initializer=initializer)
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    def _ensure_worker(self):
+        # Created lazily so the queue and task bind to the running event loop
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, item: Any) -> Any:
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self) -> list:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            # Take whatever is already queued without waiting
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+
+            # Drop callers that already went away
+            batch = [entry for entry in batch if not entry[1].cancelled()]
+            if not batch:
+                continue
+
+            items = [item for item, _, _ in batch]
+            dispatched = time.perf_counter()
+            queue_waits = [dispatched - enqueued for _, _, enqueued in batch]
+
+            try:
+                results = await loop.run_in_executor(self._executor, self.batch_fn, items)
+                for (_, future, _), result in zip(batch, results):
+                    if not future.done():
+                        future.set_result(result)
+            except Exception as e:
+                logger.error(f"Micro-batch '{self.name}' failed for {len(items)} items: {e}")
+                self.stats.errors += 1
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+            self.stats.record(len(items), queue_waits, time.perf_counter() - dispatched)
+
+    def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,260 @@
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from transformers import DistilBertTokenizer, DistilBertModel
+from typing import Tuple, Dict, Any, List
+import logging
+from app.config import settings
+from app.core.language_model import tokenize_in_buckets
+from app.core.classifier_backends import build_runner
+
+logger = logging.getLogger(__name__)
+
+BACKBONE_NAME = "distilbert-base-multilingual-cased"
+BACKBONE_PREFIX = "distilbert."
+
+
+class ClassificationHead(nn.Module):
+    """Attention pooling + classifier of AdvancedSingleTaskModel without the backbone.
+
+    Attribute names match AdvancedSingleTaskModel so the non-backbone part of an
+    existing checkpoint loads with strict=True.
+    """
+
+    def __init__(self, num_classes, hidden_size, dropout_rate=0.3, use_attention_pooling=True):
+        super(ClassificationHead, self).__init__()
+        self.use_attention_pooling = use_attention_pooling
+
+        if use_attention_pooling:
+            self.attention = nn.Sequential(
+                nn.Linear(hidden_size, 128),
+                nn.Tanh(),
+                nn.Linear(128, 1, bias=False)
+            )
+
+        self.pre_classifier = nn.Linear(hidden_size, hidden_size)
+        self.classifier = nn.Sequential(
+            nn.Dropout(dropout_rate),
+            nn.Linear(hidden_size, hidden_size // 2),
+            nn.LayerNorm(hidden_size // 2),
+            nn.ReLU(),
+            nn.Dropout(dropout_rate * 0.8),
+            nn.Linear(hidden_size // 2, hidden_size // 4),
+            nn.LayerNorm(hidden_size // 4),
+            nn.ReLU(),
+            nn.Dropout(dropout_rate * 0.6),
+            nn.Linear(hidden_size // 4, num_classes)
+        )
+
+    def attention_pooling(self, hidden_states, attention_mask):
+        attention_scores = self.attention(hidden_states).squeeze(-1)
+        attention_scores = attention_scores.masked_fill(attention_mask == 0, -1e9)
+        attention_weights = F.softmax(attention_scores, dim=1).unsqueeze(-1)
+        return (hidden_states * attention_weights).sum(dim=1)
+
+    def forward(self, hidden_states, attention_mask):
+        if self.use_attention_pooling:
+            pooled_output = self.attention_pooling(hidden_states, attention_mask)
+        else:
+            pooled_output = hidden_states[:, 0]
+
+        pre_output = F.relu(self.pre_classifier(pooled_output))
+        combined = pre_output + pooled_output
+        return self.classifier(combined)
+
+
+class MultiHeadDetector(nn.Module):
+    """Language + emotion detection over a single tokenization and a shared encoder trunk.
+
+    The two checkpoints were fine-tuned independently, so their DistilBERT weights
+    are only shared where they are bit-identical: the embeddings and the longest
+    run of identical leading transformer layers are loaded once and evaluated once
+    per batch, and only the remaining (diverging) layers are run per task. When the
+    backbones are identical this is a single encoder pass; when they diverge from
+    the first layer it still saves one tokenization and one copy of the embeddings.
+    Either way the outputs match the separate LanguageDetector / EmotionDetector.
+    """
+
+    def __init__(self):
+        super(MultiHeadDetector, self).__init__()
+        device_name = settings.DEVICE
+        if device_name == "cuda" and not torch.cuda.is_available():
+            logger.warning("CUDA requested but not available, falling back to CPU")
+            device_name = "cpu"
+
+        self.device = torch.device(device_name)
+        self.tokenizer = DistilBertTokenizer.from_pretrained(BACKBONE_NAME)
+        self.language_mapping = {0: 'english', 1: 'tagalog', 2: 'taglish'}
+        self.emotion_mapping = {
+            0: 'confused', 1: 'frustrated', 2: 'grateful',
+            3: 'neutral', 4: 'urgent', 5: 'worried'
+        }
+        self.share_embeddings = False
+        self.shared_layers = 0
+        self._load_model()
+
+        # Per-task views so callers that expect a LanguageDetector/EmotionDetector
+        # (health checks, dependencies) keep working against the shared model.
+        self.language = _TaskView(self, "language")
+        self.emotion = _TaskView(self, "emotion")
+
+    def _load_checkpoint(self, path: str) -> Dict[str, Any]:
+        logger.info(f"Loading classifier checkpoint from {path}")
+        checkpoint = torch.load(path, map_location='cpu')
+        logger.info(f"Model config: {checkpoint.get('config', {})}")
+        return checkpoint["model_state_dict"]
+
+    @staticmethod
+    def _split_state_dict(state_dict: Dict[str, torch.Tensor]):
+        backbone = {k[len(BACKBONE_PREFIX):]: v for k, v in state_dict.items() if k.startswith(BACKBONE_PREFIX)}
+        head = {k: v for k, v in state_dict.items() if not k.startswith(BACKBONE_PREFIX)}
+        return backbone, head
+
+    @staticmethod
+    def _same_tensors(a: Dict[str, torch.Tensor], b: Dict[str, torch.Tensor], prefix: str) -> bool:
+        keys_a = sorted(k for k in a if k.startswith(prefix))
+        keys_b = sorted(k for k in b if k.startswith(prefix))
+        if not keys_a or keys_a != keys_b:
+            return False
+        return all(torch.equal(a[k], b[k]) for k in keys_a)
+
+    def _build_head(self, head_state: Dict[str, torch.Tensor], num_classes: int, hidden_size: int) -> ClassificationHead:
+        use_attention_pooling = any(k.startswith("attention.") for k in head_state)
+        head = ClassificationHead(
+            num_classes=num_classes,
+            hidden_size=hidden_size,
+            dropout_rate=0.3,
+            use_attention_pooling=use_attention_pooling
+        )
+        head.load_state_dict(head_state)
+        return head
+
+    def _load_model(self):
+        try:
+            lang_backbone_state, lang_head_state = self._split_state_dict(
+                self._load_checkpoint(settings.LANGUAGE_MODEL_PATH)
+            )
+            emo_backbone_state, emo_head_state = self._split_state_dict(
+                self._load_checkpoint(settings.EMOTION_MODEL_PATH)
+            )
+
+            # Eager attention keeps the per-layer mask format stable when the
+            # encoder is run layer by layer below.
+            self.language_backbone = DistilBertModel.from_pretrained(BACKBONE_NAME, attn_implementation="eager")
+            self.language_backbone.load_state_dict(lang_backbone_state)
+            num_layers = len(self.language_backbone.transformer.layer)
+
+            # Find how much of the encoder the two checkpoints have in common
+            self.share_embeddings = self._same_tensors(lang_backbone_state, emo_backbone_state, "embeddings.")
+            if self.share_embeddings:
+                while (self.shared_layers < num_layers and self._same_tensors(
+                        lang_backbone_state, emo_backbone_state, f"transformer.layer.{self.shared_layers}.")):
+                    self.shared_layers += 1
+
+            if self.share_embeddings and self.shared_layers == num_layers:
+                self.emotion_backbone = self.language_backbone
+            else:
+                self.emotion_backbone = DistilBertModel.from_pretrained(BACKBONE_NAME, attn_implementation="eager")
+                self.emotion_backbone.load_state_dict(emo_backbone_state)
+                # Point the emotion encoder at the shared modules so the weights are held once
+                if self.share_embeddings:
+                    self.emotion_backbone.embeddings = self.language_backbone.embeddings
+                    for i in range(self.shared_layers):
+                        self.emotion_backbone.transformer.layer[i] = self.language_backbone.transformer.layer[i]
+
+            hidden_size = self.language_backbone.config.hidden_size
+            self.language_head = self._build_head(lang_head_state, len(self.language_mapping), hidden_size)
+            self.emotion_head = self._build_head(emo_head_state, len(self.emotion_mapping), hidden_size)
+
+            self.to(self.device)
+            self.eval()
+
+            self.runner = build_runner(
+                self, "multi_head", [settings.LANGUAGE_MODEL_PATH, settings.EMOTION_MODEL_PATH], num_outputs=2
+            )
+            if self.runner.backend != "eager":
+                # The exported/traced graph carries its own weights; drop the torch copies
+                for name in ("language_backbone", "emotion_backbone", "language_head", "emotion_head"):
+                    delattr(self, name)
+
+            logger.info(
+                f"Multi-head detector loaded on {self.device} "
+                f"(shared embeddings: {self.share_embeddings}, shared layers: {self.shared_layers}/{num_layers}, "
+                f"backend: {self.runner.backend})"
+            )
+        except Exception as e:
+            logger.error(f"Error loading multi-head detector: {e}")
+            raise
+
+    @staticmethod
+    def _run_layers(backbone, hidden_states, attention_mask, start: int, end: int):
+        for layer in backbone.transformer.layer[start:end]:
+            hidden_states = layer(x=hidden_states, attn_mask=attention_mask)[-1]
+        return hidden_states
+
+    def forward(self, input_ids, attention_mask):
+        num_layers = len(self.language_backbone.transformer.layer)
+
+        if self.share_embeddings:
+            shared = self.language_backbone.embeddings(input_ids)
+            shared = self._run_layers(self.language_backbone, shared, attention_mask, 0, self.shared_layers)
+            lang_hidden = self._run_layers(self.language_backbone, shared, attention_mask, self.shared_layers, num_layers)
+            emo_hidden = self._run_layers(self.emotion_backbone, shared, attention_mask, self.shared_layers, num_layers)
+        else:
+            lang_hidden = self.language_backbone(input_ids=input_ids, attention_mask=attention_mask).last_hidden_state
+            emo_hidden = self.emotion_backbone(input_ids=input_ids, attention_mask=attention_mask).last_hidden_state
+
+        return self.language_head(lang_hidden, attention_mask), self.emotion_head(emo_hidden, attention_mask)
+
+    def predict(self, text: str) -> Tuple[Tuple[str, float], Tuple[str, float]]:
+        """Return ((language, confidence), (emotion, confidence)) for one question"""
+        enc = self.tokenizer(
+            text,
+            return_tensors="pt",
+            truncation=True,
+            padding=True,
+            max_length=settings.MAX_LENGTH
+        ).to(self.device)
+
+        with torch.no_grad():
+            lang_logits, emo_logits = self.runner(enc["input_ids"], enc["attention_mask"])
+            lang_probs = torch.softmax(lang_logits, dim=1)
+            emo_probs = torch.softmax(emo_logits, dim=1)
+            lang_idx = lang_probs.argmax(dim=1).item()
+            emo_idx = emo_probs.argmax(dim=1).item()
+
+        return (
+            (self.language_mapping[lang_idx], lang_probs[0][lang_idx].item()),
+            (self.emotion_mapping[emo_idx], emo_probs[0][emo_idx].item())
+        )
+
+    def predict_batch(self, texts: List[str]) -> List[Tuple[Tuple[str, float], Tuple[str, float]]]:
+        """Batched predict(), one dynamically padded forward pass per length bucket"""
+        results = [None] * len(texts)
+
+        with torch.no_grad():
+            for bucket, enc in tokenize_in_buckets(self.tokenizer, texts, self.device):
+                lang_logits, emo_logits = self.runner(enc["input_ids"], enc["attention_mask"])
+                lang_conf, lang_idx = torch.softmax(lang_logits, dim=1).max(dim=1)
+                emo_conf, emo_idx = torch.softmax(emo_logits, dim=1).max(dim=1)
+                for row, i in enumerate(bucket):
+                    results[i] = (
+                        (self.language_mapping[lang_idx[row].item()], lang_conf[row].item()),
+                        (self.emotion_mapping[emo_idx[row].item()], emo_conf[row].item())
+                    )
+
+        return results
+
+
+class _TaskView:
+    """Single-task facade over a MultiHeadDetector"""
+
+    def __init__(self, detector: MultiHeadDetector, task: str):
+        self.detector = detector
+        self.task = task
+        self.model = detector
+        self.device = detector.device
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        language, emotion = self.detector.predict(text)
+        return language if self.task == "language" else emotion
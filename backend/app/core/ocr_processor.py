@@ -8,6 +8,8 @@ import PyPDF2
 from pathlib import Path
 import docx
 import time
+from app.utils.metrics import OCR_SECONDS
+from app.utils.tracing import record_span
 
 logger = logging.getLogger(__name__)
 
@@ -76,7 +78,12 @@ class OCRProcessor:
             result['fallback_used'] = True
             result['text'] = "[Document processing error - using question only]"
             
-        result['processing_time'] = time.time() - start_time
+        finally:
+            # Every exit, including the unsupported-format returns, is timed and recorded
+            result['processing_time'] = time.time() - start_time
+            outcome = 'success' if result['success'] else 'fallback' if result['fallback_used'] else 'error'
+            OCR_SECONDS.observe(result['processing_time'], file_type=file_ext.lstrip('.'), outcome=outcome)
+            record_span("ocr.extract", result['processing_time'], outcome=outcome, reason=result['error'])
         return result
     
     def _extract_text_from_image_optimized(self, image_bytes: bytes) -> str:
@@ -0,0 +1,110 @@
+import os
+import time
+import pickle
+import hashlib
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def common_prefix_length(a, b) -> int:
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        n += 1
+    return n
+
+
+class PrefixCache:
+    """
+    KV-cache snapshot of the static instruction preamble shared by every prompt.
+
+    warm() evaluates the preamble once and snapshots the llama state (optionally
+    persisting it to disk, keyed by model file, context size and preamble text).
+    prepare() restores that snapshot into a context whose KV cache does not
+    already start with the preamble. llama-cpp-python reuses the longest
+    matching token prefix on the next call, so only the variable part of the
+    prompt is prefilled.
+    """
+
+    def __init__(self, prefix: str, model_path: str, n_ctx: int, cache_dir: Optional[str] = None):
+        self.prefix = prefix
+        self.model_path = model_path
+        self.n_ctx = n_ctx
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.tokens: List[int] = []
+        self.state = None
+        self.prefill_time: Optional[float] = None
+
+    def _cache_file(self) -> Optional[Path]:
+        if self.cache_dir is None:
+            return None
+        stat = os.stat(self.model_path)
+        key = f"{os.path.abspath(self.model_path)}|{stat.st_size}|{stat.st_mtime_ns}|{self.n_ctx}|{self.prefix}"
+        return self.cache_dir / f"prefix_state_{hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]}.pkl"
+
+    def _load_from_disk(self, model) -> bool:
+        cache_file = self._cache_file()
+        if cache_file is None or not cache_file.exists():
+            return False
+        try:
+            with open(cache_file, 'rb') as f:
+                state = pickle.load(f)
+            model.load_state(state)
+            self.state = state
+            logger.info(f"Restored prompt prefix KV cache from {cache_file.name} ({len(self.tokens)} tokens)")
+            return True
+        except Exception as e:
+            logger.warning(f"Ignoring unusable prefix cache {cache_file}: {e}")
+            return False
+
+    def _save_to_disk(self):
+        cache_file = self._cache_file()
+        if cache_file is None:
+            return
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            # Per-process temp name: prefork workers may warm the cache at the same time
+            tmp_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_file, 'wb') as f:
+                pickle.dump(self.state, f)
+            tmp_file.replace(cache_file)
+        except Exception as e:
+            logger.warning(f"Could not persist prefix cache: {e}")
+
+    def warm(self, model):
+        """Evaluate (or restore) the preamble in model and keep a snapshot of the state"""
+        self.tokens = model.tokenize(self.prefix.encode('utf-8'), add_bos=True)
+        if self._load_from_disk(model):
+            return
+
+        model.reset()
+        start = time.perf_counter()
+        model.eval(self.tokens)
+        self.prefill_time = time.perf_counter() - start
+        self.state = model.save_state()
+        self._save_to_disk()
+        logger.info(f"Prompt prefix prefilled once: {len(self.tokens)} tokens in {self.prefill_time:.2f}s")
+
+    def prepare(self, model, prompt_tokens: List[int]) -> int:
+        """
+        Make sure model's KV cache starts with the preamble.
+        Returns how many leading prompt tokens are already evaluated.
+        """
+        current = list(getattr(model, '_input_ids', []))
+        cached = common_prefix_length(current, prompt_tokens)
+        if self.state is not None and cached < len(self.tokens) and \
+                common_prefix_length(self.tokens, prompt_tokens) == len(self.tokens):
+            model.load_state(self.state)
+            cached = len(self.tokens)
+        return cached
+
+    def stats(self) -> Dict:
+        return {
+            "prefix_tokens": len(self.tokens),
+            "warm": self.state is not None,
+            "prefill_time": self.prefill_time,
+        }
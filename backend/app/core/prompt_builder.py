@@ -0,0 +1,147 @@
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class BuiltPrompt:
+    """A prompt ready for llama.cpp: its text, its tokens and how the budget was spent"""
+
+    def __init__(self, text: str, tokens: List[int], max_tokens: int, stats: Dict[str, Any]):
+        self.text = text
+        self.tokens = tokens
+        self.max_tokens = max_tokens  # Answer tokens that still fit in the context window
+        self.stats = stats
+
+
+class _Context:
+    def __init__(self, score: float, content: str, tokens: List[int], overhead: int):
+        self.score = score
+        self.content = content
+        self.tokens = tokens
+        self.overhead = overhead  # "Context N (Score: ...): " header and separator
+        self.keep = len(tokens)
+
+    @property
+    def cost(self) -> int:
+        return self.overhead + self.keep if self.keep else 0
+
+
+class PromptBuilder:
+    """
+    Builds the Alpaca prompt to fit the model's context window. Every part is
+    measured with the GGUF tokenizer instead of being sliced by characters.
+
+    The window holds the fixed part (preamble, field labels, question,
+    language and emotion) and answer_reserve tokens kept free for the answer.
+    The rest is the prefill budget for the uploaded-document excerpt (capped
+    at max_document_tokens and half the budget) and the retrieved contexts.
+    Contexts stay in rank order. When they do not fit, the lowest-scoring
+    one is trimmed first, and dropped if it would fall below
+    min_context_tokens, then the next-lowest. Unused context slots are not
+    padded with filler.
+    """
+
+    def __init__(self, model, prefix: str, n_ctx: int, max_answer_tokens: int, answer_reserve: int,
+                 max_question_tokens: int, max_document_tokens: int, min_context_tokens: int,
+                 max_contexts: int = 4):
+        self.model = model
+        self.prefix = prefix
+        self.n_ctx = n_ctx
+        self.max_answer_tokens = max_answer_tokens
+        self.answer_reserve = min(answer_reserve, max_answer_tokens)
+        self.max_question_tokens = max_question_tokens
+        self.max_document_tokens = max_document_tokens
+        self.min_context_tokens = min_context_tokens
+        self.max_contexts = max_contexts
+
+    def _tokenize(self, text: str, add_bos: bool = False) -> List[int]:
+        return self.model.tokenize(text.encode('utf-8'), add_bos=add_bos)
+
+    def _truncate(self, text: str, tokens: List[int], limit: int) -> str:
+        """text cut to its first limit tokens"""
+        if len(tokens) <= limit:
+            return text
+        return self.model.detokenize(tokens[:max(limit, 0)]).decode('utf-8', errors='ignore').strip()
+
+    def render(self, question: str, language: str, emotion: str, document: Optional[str],
+               contexts: List[Tuple[float, str]]) -> str:
+        """Prompt text in the training template; contexts are (score, content) pairs in rank order"""
+        parts = [f"User Document: {document}"] if document else []
+        parts += [f"Context {i + 1} (Score: {score:.2f}): {content}" for i, (score, content) in enumerate(contexts)]
+        formatted_contexts = "\n\n".join(parts)
+        return (
+            f"{self.prefix}"
+            f"Question: {question}\n"
+            f"Language: {language}\n"
+            f"Emotion: {emotion}\n\n"
+            f"Contexts:\n{formatted_contexts}\n\n"
+            f"### Output:\n"
+        )
+
+    def _fit(self, contexts: List[_Context], budget: int):
+        """Set each context's kept token count so their total cost is within budget"""
+        for ctx in contexts:
+            ctx.keep = len(ctx.tokens)
+        total = sum(ctx.cost for ctx in contexts)
+        for ctx in sorted(contexts, key=lambda c: c.score):
+            if total <= budget:
+                break
+            excess = total - budget
+            keep = len(ctx.tokens) - excess
+            total -= ctx.cost
+            ctx.keep = keep if keep >= self.min_context_tokens else 0
+            total += ctx.cost
+
+    def build(self, question: str, language: str, emotion: str, contexts: List[Dict[str, Any]],
+              extracted_text: Optional[str] = None) -> BuiltPrompt:
+        limit = self.n_ctx - self.answer_reserve
+
+        question_tokens = self._tokenize(question)
+        question = self._truncate(question, question_tokens, self.max_question_tokens)
+        fixed = len(self._tokenize(self.render(question, language, emotion, None, []), add_bos=True))
+        budget = max(limit - fixed, 0)
+
+        document = None
+        document_cost = 0
+        if extracted_text:
+            document_tokens = self._tokenize(extracted_text)
+            document = self._truncate(extracted_text, document_tokens, min(self.max_document_tokens, budget // 2))
+            document_cost = len(self._tokenize(f"User Document: {document}\n\n")) if document else 0
+
+        candidates = []
+        for rank, ctx in enumerate(contexts[:self.max_contexts]):
+            content = ctx.get('content', '') or ''
+            score = float(ctx.get('score', 0) or 0)
+            overhead = len(self._tokenize(f"Context {rank + 1} (Score: {score:.2f}): \n\n"))
+            candidates.append(_Context(score, content, self._tokenize(content), overhead))
+
+        # Piecewise counts can differ slightly from the tokenized whole; shrink and retry on overflow
+        context_budget = budget - document_cost
+        for _ in range(3):
+            self._fit(candidates, context_budget)
+            kept = [ctx for ctx in candidates if ctx.keep]
+            text = self.render(question, language, emotion, document, [
+                (ctx.score, self._truncate(ctx.content, ctx.tokens, ctx.keep)) for ctx in kept
+            ])
+            tokens = self._tokenize(text, add_bos=True)
+            overflow = len(tokens) - limit
+            if overflow <= 0:
+                break
+            context_budget -= overflow
+        else:
+            logger.warning(f"Prompt is {overflow} tokens over its budget of {limit}")
+
+        stats = {
+            'prompt_tokens': len(tokens),
+            'prompt_budget': limit,
+            'question_tokens': min(len(question_tokens), self.max_question_tokens),
+            'question_truncated': len(question_tokens) > self.max_question_tokens,
+            'document_tokens': document_cost,
+            'context_tokens': sum(ctx.cost for ctx in kept),
+            'contexts_used': len(kept),
+            'contexts_trimmed': sum(1 for ctx in kept if ctx.keep < len(ctx.tokens)),
+            'contexts_dropped': len(candidates) - len(kept),
+        }
+        max_tokens = max(min(self.max_answer_tokens, self.n_ctx - len(tokens)), 1)
+        return BuiltPrompt(text, tokens, max_tokens, stats)
@@ -0,0 +1,94 @@
+import threading
+import unicodedata
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Any, Dict, Hashable, Optional
+
+
+def normalize_query(query: str) -> str:
+    """Cache key for a query: NFC-normalized with whitespace collapsed (case is kept; the encoder is cased)"""
+    return " ".join(unicodedata.normalize("NFC", query).split())
+
+
+class LRUCache:
+    """Small thread-safe LRU map with hit/miss counters"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """get() without touching recency or counters"""
+        with self._lock:
+            return self._data.get(key)
+
+    def put(self, key: Hashable, value: Any):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "max_entries": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+
+class SearchHit(Mapping):
+    """
+    Read-only view of a stored document plus its search score.
+
+    Behaves like the dict copies search() used to return (hit['content'],
+    hit.get('source'), hit['score'], ...) without copying the document.
+    """
+
+    __slots__ = ("_doc", "_score")
+
+    def __init__(self, doc: Mapping, score: float):
+        self._doc = doc
+        self._score = score
+
+    def __getitem__(self, key):
+        if key == "score":
+            return self._score
+        return self._doc[key]
+
+    def __iter__(self):
+        yield from self._doc
+        if "score" not in self._doc:
+            yield "score"
+
+    def __len__(self):
+        return len(self._doc) + (0 if "score" in self._doc else 1)
+
+    def __repr__(self):
+        return f"SearchHit(title={self._doc.get('title')!r}, score={self._score:.4f})"
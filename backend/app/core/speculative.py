@@ -0,0 +1,65 @@
+import logging
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+try:
+    from llama_cpp.llama_speculative import LlamaPromptLookupDecoding
+    PROMPT_LOOKUP_AVAILABLE = True
+except ImportError:
+    LlamaPromptLookupDecoding = object
+    PROMPT_LOOKUP_AVAILABLE = False
+
+
+class PromptLookupDraft(LlamaPromptLookupDecoding):
+    """
+    llama-cpp-python's prompt-lookup (n-gram) drafter, with counters.
+
+    At each decode step it finds the latest earlier occurrence of the last
+    max_ngram_size tokens in the prompt plus the answer so far, and proposes
+    the num_pred_tokens that followed it. Copied spans such as fee tables,
+    hotline numbers and step lists come out several tokens per step. llama.cpp
+    evaluates the proposal in one batch and keeps only the prefix the model
+    would have sampled itself, so greedy output is identical to plain decoding.
+
+    A request's first token comes from the prompt; after that each step
+    yields one sampled token plus the accepted draft tokens, so accepted =
+    generated - steps - requests. This is an estimate: the last step of a
+    request may be cut short by a stop sequence.
+    """
+
+    def __init__(self, max_ngram_size: int = 2, num_pred_tokens: int = 10):
+        super().__init__(max_ngram_size=max_ngram_size, num_pred_tokens=num_pred_tokens)
+        self.steps = 0
+        self.proposed = 0
+        self.generated = 0
+        self.requests = 0
+
+    def __call__(self, input_ids, /, **kwargs):
+        draft = super().__call__(input_ids, **kwargs)
+        self.steps += 1
+        self.proposed += len(draft)
+        return draft
+
+    def record(self, generated_tokens: int):
+        """Count one finished generation of generated_tokens tokens"""
+        self.generated += generated_tokens
+        self.requests += 1
+
+
+def speculation_stats(drafts: List[PromptLookupDraft]) -> Dict[str, Any]:
+    """Acceptance over all generation slots"""
+    steps = sum(d.steps for d in drafts)
+    proposed = sum(d.proposed for d in drafts)
+    generated = sum(d.generated for d in drafts)
+    requests = sum(d.requests for d in drafts)
+    accepted = max(generated - steps - requests, 0)
+    return {
+        "requests": requests,
+        "steps": steps,
+        "proposed_tokens": proposed,
+        "generated_tokens": generated,
+        "accepted_tokens": accepted,
+        "acceptance_rate": accepted / proposed if proposed else None,
+        "tokens_per_step": generated / steps if steps else None,
+    }
@@ -0,0 +1,148 @@
+import asyncio
+import time
+import threading
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, Optional
+from app.config import settings
+from app.core.thread_budget import get_thread_budget
+from app.utils.tracing import record_span
+
+logger = logging.getLogger(__name__)
+
+_EXHAUSTED = object()
+
+
+class StagePool:
+    """
+    Bounded worker pool for one blocking pipeline stage.
+
+    `await pool.run(fn, ...)` executes fn in one of max_workers threads so the
+    event loop keeps serving other requests; calls beyond max_workers queue
+    inside the executor. Queue wait and run time are tracked per stage. fn
+    runs in a copy of the caller's context, so its spans join the request's
+    trace; the queue wait is recorded there as "<stage>.queue".
+    """
+
+    def __init__(self, name: str, max_workers: int, initializer: Optional[Callable[[], None]] = None):
+        self.name = name
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=f"stage-{name}", initializer=initializer
+        )
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.errors = 0
+        self.total_queue_wait = 0.0
+        self.max_queue_wait = 0.0
+        self.total_run_time = 0.0
+        self.max_run_time = 0.0
+
+    def _call(self, submitted: float, trace_queue: bool, fn: Callable, args, kwargs):
+        started = time.perf_counter()
+        if trace_queue:
+            record_span(f"{self.name}.queue", started - submitted)
+        ok = False
+        try:
+            result = fn(*args, **kwargs)
+            ok = True
+            return result
+        finally:
+            run_time = time.perf_counter() - started
+            with self._lock:
+                self.in_flight -= 1
+                self.completed += 1
+                self.errors += 0 if ok else 1
+                self.total_queue_wait += started - submitted
+                self.max_queue_wait = max(self.max_queue_wait, started - submitted)
+                self.total_run_time += run_time
+                self.max_run_time = max(self.max_run_time, run_time)
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        return await self._submit(fn, args, kwargs, trace_queue=True)
+
+    async def _submit(self, fn: Callable, args, kwargs, trace_queue: bool) -> Any:
+        with self._lock:
+            self.in_flight += 1
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(
+            self._executor, context.run, self._call, time.perf_counter(), trace_queue, fn, args, kwargs
+        )
+
+    async def iterate(self, iterator: Iterator, on_cancel: Optional[Callable[[], None]] = None):
+        """
+        Async iterator over a blocking iterator, each next() running in this pool
+        (queue waits not traced). A generator is closed in this pool once no
+        next() is running: closing it while it executes in another thread
+        raises ValueError. If the consumer is cancelled mid-next(), on_cancel()
+        is called first so that next() returns soon.
+        """
+        step = None
+        try:
+            while True:
+                step = asyncio.ensure_future(self._submit(next, (iterator, _EXHAUSTED), {}, trace_queue=False))
+                item = await asyncio.shield(step)
+                if item is _EXHAUSTED:
+                    break
+                yield item
+        except asyncio.CancelledError:
+            if on_cancel is not None:
+                on_cancel()
+            raise
+        finally:
+            # Not awaited: a cancelled consumer would be cancelled again at the next await
+            close = getattr(iterator, 'close', None)
+            if close is not None:
+                if step is not None and not step.done():
+                    step.add_done_callback(lambda _: self._executor.submit(close))
+                else:
+                    self._executor.submit(close)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "in_flight": self.in_flight,
+                "completed": self.completed,
+                "errors": self.errors,
+                "mean_queue_wait_ms": self.total_queue_wait / self.completed * 1000 if self.completed else 0.0,
+                "max_queue_wait_ms": self.max_queue_wait * 1000,
+                "mean_run_ms": self.total_run_time / self.completed * 1000 if self.completed else 0.0,
+                "max_run_ms": self.max_run_time * 1000,
+            }
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+
+class StagePools:
+    """The chat pipeline's worker pools (classifiers, retrieval, generation) and one for bulk retrieval"""
+
+    def __init__(self):
+        # With THREAD_BUDGET_AFFINITY each pool's threads run on their engines' cores
+        budget = get_thread_budget()
+        self.classifier = StagePool("classifier", settings.CLASSIFIER_POOL_WORKERS, budget.pinner("classifiers"))
+        self.retrieval = StagePool("retrieval", settings.RETRIEVAL_POOL_WORKERS, budget.pinner("encoder", "faiss"))
+        # A long /retrieve/batch job must not hold the threads chat requests retrieve in
+        self.bulk_retrieval = StagePool(
+            "bulk_retrieval", max(settings.BULK_RETRIEVAL_POOL_WORKERS, 1), budget.pinner("encoder", "faiss")
+        )
+        # Generation threads mostly wait for a scheduler slot; size the pool so
+        # every request the scheduler would admit or queue has a thread to wait in.
+        generation_workers = settings.GENERATION_POOL_WORKERS or (
+            settings.GENERATION_SLOTS + settings.GENERATION_QUEUE_SIZE
+        )
+        self.generation = StagePool("generation", max(generation_workers, 1), budget.pinner("llama"))
+
+    def all(self):
+        return (self.classifier, self.retrieval, self.bulk_retrieval, self.generation)
+
+    def stats(self) -> Dict[str, Any]:
+        return {pool.name: pool.stats() for pool in self.all()}
+
+    def close(self):
+        for pool in self.all():
+            pool.close()
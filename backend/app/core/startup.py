@@ -0,0 +1,82 @@
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Short inputs for the warm-up inferences (one English, one Tagalog)
+WARMUP_TEXTS = [
+    "How do I activate my credit card?",
+    "Paano ko ma-activate ang credit card ko?",
+]
+
+
+class StartupState:
+    """
+    Loads and warms the model components in parallel at startup and records
+    how long each step took.
+
+    Each component is a callable that receives this state and wraps its
+    steps in timed(), e.g. "classifiers.load" and "classifiers.warmup". The
+    instance is ready once every component has finished without raising.
+    /ready reports this, while /live only says the process is up.
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.components: Dict[str, str] = {}  # name -> pending / loading / ready / failed
+        self.errors: Dict[str, str] = {}
+        self.timings: Dict[str, float] = {}
+        self.total: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.total is not None and not self.errors
+
+    @contextmanager
+    def timed(self, step: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.timings[step] = time.perf_counter() - start
+
+    def _run_component(self, name: str, load: Callable[["StartupState"], None]):
+        self.components[name] = "loading"
+        try:
+            with self.timed(name):
+                load(self)
+            self.components[name] = "ready"
+        except Exception as e:
+            self.components[name] = "failed"
+            self.errors[name] = str(e)
+            logger.error(f"Startup: {name} failed: {e}")
+
+    def run(self, components: Dict[str, Callable[["StartupState"], None]]) -> bool:
+        """Run every component on its own thread; returns whether all of them succeeded"""
+        start = time.perf_counter()
+        self.components.update({name: "pending" for name in components})
+        with ThreadPoolExecutor(max_workers=max(len(components), 1), thread_name_prefix="startup") as pool:
+            for name, load in components.items():
+                pool.submit(self._run_component, name, load)
+        self.total = time.perf_counter() - start
+
+        logger.info(f"Startup {'complete' if self.ready else 'incomplete'} in {self.total:.1f}s: " + ", ".join(
+            f"{step}={seconds:.1f}s" for step, seconds in sorted(self.timings.items())
+        ))
+        return self.ready
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "uptime": time.time() - self.started_at,
+            "startup_seconds": self.total,
+            "components": dict(self.components),
+            "timings": {step: round(seconds, 3) for step, seconds in sorted(self.timings.items())},
+            "errors": dict(self.errors),
+        }
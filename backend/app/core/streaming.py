@@ -0,0 +1,87 @@
+import re
+import json
+from typing import Any
+
+# Alpaca/special-token artifacts removed from generated text (longest first)
+ARTIFACTS = ["### Instruction:", "### Input:", "### Output:", "<|endoftext|>", "###", "</s>", "<s>"]
+_ARTIFACT_RE = re.compile("|".join(re.escape(a) for a in ARTIFACTS))
+_CONTEXT_HEADER = "Context "
+
+
+def format_sse(event: str, data: Any) -> str:
+    """Format one Server-Sent Event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+class StreamingTextCleaner:
+    """
+    Incremental version of AnswerGenerator._clean_generated_text.
+
+    feed() takes raw generated chunks and returns the text that is safe to send
+    now. Text is held back only while it could still turn into something the
+    batch cleaner would remove: a partial artifact such as "##", trailing
+    whitespace, or a line that may become a "Context N (Score: ...)" header.
+    Concatenating all feed() outputs plus finish() yields the cleaned answer:
+    artifacts removed, stripped non-empty lines joined by "\n".
+    """
+
+    def __init__(self):
+        self._pending = ""       # raw text that may still be the start of an artifact
+        self._line = ""          # artifact-free text of the current (unfinished) line
+        self._sent = 0           # cleaned chars of the current line already emitted
+        self._has_output = False
+
+    def _consume(self, final: bool):
+        """Move resolved raw text from _pending into _line, dropping artifacts"""
+        i = 0
+        pending = self._pending
+        while i < len(pending):
+            rest = pending[i:]
+            if not final and any(len(rest) < len(a) and a.startswith(rest) for a in ARTIFACTS):
+                break
+            match = _ARTIFACT_RE.match(pending, i)
+            if match:
+                i = match.end()
+            else:
+                self._line += pending[i]
+                i += 1
+        self._pending = pending[i:]
+
+    def _emit(self, cleaned: str) -> str:
+        new = cleaned[self._sent:]
+        if not new:
+            return ""
+        prefix = "\n" if self._sent == 0 and self._has_output else ""
+        self._sent = len(cleaned)
+        self._has_output = True
+        return prefix + new
+
+    def _finish_line(self) -> str:
+        self._consume(final=True)
+        cleaned = self._line.strip()
+        is_header = cleaned.startswith(_CONTEXT_HEADER) and "(Score:" in cleaned
+        out = "" if is_header else self._emit(cleaned)
+        self._line = ""
+        self._sent = 0
+        return out
+
+    def feed(self, chunk: str) -> str:
+        out = []
+        lines = chunk.split("\n")
+
+        for line in lines[:-1]:
+            self._pending += line
+            out.append(self._finish_line())
+
+        self._pending += lines[-1]
+        self._consume(final=False)
+        cleaned = self._line.strip()
+
+        # Wait for the end of the line before deciding on possible context headers
+        if cleaned and not (_CONTEXT_HEADER.startswith(cleaned) or cleaned.startswith(_CONTEXT_HEADER)):
+            out.append(self._emit(cleaned))
+
+        return "".join(out)
+
+    def finish(self) -> str:
+        return self._finish_line()
@@ -0,0 +1,145 @@
+import os
+import logging
+import threading
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Engines that run CPU-bound work concurrently in one worker process
+ENGINES = ("llama", "classifiers", "encoder", "faiss", "ocr")
+
+
+def available_cores() -> List[int]:
+    """CPU ids this process may run on (honours taskset / cgroup cpusets where the OS exposes them)"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+class ThreadBudget:
+    """
+    Splits the worker's cores between the inference engines so their thread
+    pools add up to the machine instead of each sizing itself to every core.
+
+    Shares (THREAD_BUDGET_*) are normalized over the engines and rounded to
+    whole cores, with at least one per engine. On machines with fewer cores
+    than engines, some engines share cores. With THREAD_BUDGET_AFFINITY the
+    threads that drive an engine are pinned to its cores. Threads and
+    processes they start (llama.cpp workers, OpenMP teams, tesseract)
+    inherit that mask.
+
+    torch keeps one intra-op pool per process, so the torch classifiers and
+    the sentence-transformer encoder share torch.set_num_threads. With the
+    ONNX classifier backend, the classifiers get their own ORT pool instead.
+    """
+
+    def __init__(self, cores: List[int], shares: Dict[str, float], affinity: bool = False, enabled: bool = True):
+        self.enabled = enabled
+        self.cores = cores
+        self.affinity = affinity and enabled and hasattr(os, "sched_setaffinity")
+        self.allocation = self._allocate(cores, shares)
+
+    @classmethod
+    def from_settings(cls) -> "ThreadBudget":
+        cores = available_cores()
+        if settings.THREAD_BUDGET_CORES > 0:
+            cores = cores[:settings.THREAD_BUDGET_CORES]
+        elif settings.SERVER_WORKERS > 1:
+            # Prefork workers each get their share of the machine
+            cores = cores[:max(len(cores) // settings.SERVER_WORKERS, 1)]
+        affinity = settings.THREAD_BUDGET_AFFINITY
+        if affinity and settings.SERVER_WORKERS > 1:
+            # Workers do not know which slice of the machine is theirs
+            logger.warning("THREAD_BUDGET_AFFINITY is ignored with SERVER_WORKERS > 1")
+            affinity = False
+        shares = {
+            "llama": settings.THREAD_BUDGET_LLAMA,
+            "classifiers": settings.THREAD_BUDGET_CLASSIFIERS,
+            "encoder": settings.THREAD_BUDGET_ENCODER,
+            "faiss": settings.THREAD_BUDGET_FAISS,
+            "ocr": settings.THREAD_BUDGET_OCR,
+        }
+        budget = cls(cores, shares, affinity=affinity, enabled=settings.THREAD_BUDGET_ENABLED)
+        if budget.enabled:
+            logger.info("Thread budget: " + ", ".join(
+                f"{engine}={len(cores)}" for engine, cores in budget.allocation.items()
+            ) + (" (pinned)" if budget.affinity else ""))
+        return budget
+
+    @staticmethod
+    def _allocate(cores: List[int], shares: Dict[str, float]) -> Dict[str, List[int]]:
+        n = len(cores)
+        total = sum(max(share, 0.0) for share in shares.values()) or 1.0
+        exact = {engine: max(shares.get(engine, 0.0), 0.0) / total * n for engine in ENGINES}
+        counts = {engine: max(int(exact[engine]), 1) for engine in ENGINES}
+        # Hand out the cores left by largest remainder. If the one-core minimums
+        # already exceed the machine, the slices below wrap around and overlap.
+        leftover = n - sum(counts.values())
+        for engine in sorted(ENGINES, key=lambda e: exact[e] - int(exact[e]), reverse=True)[:max(leftover, 0)]:
+            counts[engine] += 1
+
+        allocation = {}
+        position = 0
+        for engine in ENGINES:
+            allocation[engine] = [cores[(position + i) % n] for i in range(counts[engine])]
+            position += counts[engine]
+        return allocation
+
+    def threads(self, engine: str, default: Optional[int] = None) -> Optional[int]:
+        """Thread count for engine, or default when the budget is disabled"""
+        if not self.enabled:
+            return default
+        return len(self.allocation[engine])
+
+    def torch_threads(self) -> int:
+        """torch intra-op threads: the encoder's share, plus the classifiers' unless they run on ONNX Runtime"""
+        threads = self.threads("encoder")
+        if settings.CLASSIFIER_BACKEND.lower() != "onnx":
+            threads += self.threads("classifiers")
+        return threads
+
+    def apply(self, engine: str):
+        """Apply the process-wide thread setting that backs engine (called where its model is loaded)"""
+        if not self.enabled:
+            return
+        if engine in ("classifiers", "encoder"):
+            import torch
+            torch.set_num_threads(self.torch_threads())
+        elif engine == "faiss":
+            import faiss
+            faiss.omp_set_num_threads(self.threads("faiss"))
+
+    def pin_current_thread(self, *engines: str):
+        """Restrict the calling thread to the cores of engines (no-op without affinity)"""
+        if not self.affinity:
+            return
+        cores = sorted({core for engine in engines for core in self.allocation[engine]})
+        try:
+            os.sched_setaffinity(0, cores)
+        except OSError as e:
+            logger.warning(f"Could not pin {threading.current_thread().name} to cores {cores}: {e}")
+
+    def pinner(self, *engines: str) -> Optional[Callable[[], None]]:
+        """ThreadPoolExecutor initializer that pins each pool thread to the cores of engines"""
+        if not self.affinity:
+            return None
+        return lambda: self.pin_current_thread(*engines)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "affinity": self.affinity,
+            "cores": self.cores,
+            "engines": {
+                engine: {"threads": len(cores), "cores": cores}
+                for engine, cores in self.allocation.items()
+            },
+            "torch_threads": self.torch_threads() if self.enabled else None,
+        }
+
+
+@lru_cache()
+def get_thread_budget() -> ThreadBudget:
+    return ThreadBudget.from_settings()
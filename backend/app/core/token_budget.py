@@ -0,0 +1,81 @@
+import threading
+from typing import Any, Dict, Optional
+
+
+class DecodeSpeed:
+    """
+    Rolling prefill and decode speed of the GGUF model, used to size each
+    answer to the time its request has left.
+
+    Speeds are exponentially weighted over recent generations on real
+    traffic, so they follow CPU load, the thread budget and how many slots
+    are busy. budget() predicts how many answer tokens can be decoded in the
+    remaining seconds once the uncached prompt tokens are prefilled. It uses
+    only the safety fraction of that time, because decoding slows down as
+    the KV cache grows, and clamps the result to [floor, ceiling]. Until the
+    first decode has been measured it returns the ceiling.
+    """
+
+    def __init__(self, floor: int, ceiling: int, smoothing: float = 0.2, safety: float = 0.85):
+        self.floor = floor
+        self.ceiling = ceiling
+        self.smoothing = smoothing
+        self.safety = safety
+        self.prefill_tps: Optional[float] = None
+        self.decode_tps: Optional[float] = None
+        self._lock = threading.Lock()
+        self.samples = 0
+        self.budgets = 0
+        self.budget_total = 0
+        self.last_budget: Optional[int] = None
+        self.limited = 0  # Budgets cut below the ceiling by the time left
+        self.at_floor = 0
+
+    def _smooth(self, current: Optional[float], sample: float) -> float:
+        return sample if current is None else current + self.smoothing * (sample - current)
+
+    def record(self, prefill_tokens: int, prefill_seconds: float, decode_tokens: int, decode_seconds: float):
+        """Add one generation's measurements (either part may be empty)"""
+        with self._lock:
+            if prefill_tokens > 0 and prefill_seconds > 0:
+                self.prefill_tps = self._smooth(self.prefill_tps, prefill_tokens / prefill_seconds)
+            if decode_tokens > 0 and decode_seconds > 0:
+                self.decode_tps = self._smooth(self.decode_tps, decode_tokens / decode_seconds)
+                self.samples += 1
+
+    def budget(self, remaining: Optional[float], prefill_tokens: int, ceiling: Optional[int] = None) -> int:
+        """max_tokens for an answer that must finish within remaining seconds (None = no limit)"""
+        ceiling = min(self.ceiling, ceiling) if ceiling is not None else self.ceiling
+        floor = min(self.floor, ceiling)
+        with self._lock:
+            prefill_tps, decode_tps = self.prefill_tps, self.decode_tps
+
+        if remaining is None or decode_tps is None:
+            chosen = ceiling
+        else:
+            prefill_time = prefill_tokens / prefill_tps if prefill_tps else 0.0
+            fits = int((remaining - prefill_time) * self.safety * decode_tps)
+            chosen = min(max(fits, floor), ceiling)
+
+        with self._lock:
+            self.budgets += 1
+            self.budget_total += chosen
+            self.last_budget = chosen
+            self.limited += chosen < ceiling
+            self.at_floor += chosen == floor < ceiling
+        return chosen
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "prefill_tokens_per_second": self.prefill_tps,
+                "decode_tokens_per_second": self.decode_tps,
+                "samples": self.samples,
+                "floor": self.floor,
+                "ceiling": self.ceiling,
+                "budgets": self.budgets,
+                "mean_budget": self.budget_total / self.budgets if self.budgets else None,
+                "last_budget": self.last_budget,
+                "limited_by_deadline": self.limited,
+                "at_floor": self.at_floor,
+            }
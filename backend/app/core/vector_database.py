@@ -1,88 +1,542 @@
 import numpy as np
 import faiss
 from sentence_transformers import SentenceTransformer
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Optional
 from pathlib import Path
-import pickle
+import json
+import time
 import logging
+import threading
 from app.config import settings
+from app.core.embedding_cache import EmbeddingCache
+from app.core.document_store import DocumentStore, write_document_store, migrate_pickle
+from app.core.index_factory import (
+    build_faiss_index, configure_search, enable_reconstruct, supports_removal, search_params, index_memory_bytes
+)
+from app.core.lexical_index import LexicalIndex
+from app.core.search_cache import LRUCache, SearchHit, normalize_query
+from app.core.thread_budget import get_thread_budget
+from app.utils.metrics import STAGE_SECONDS
+from app.utils.tracing import span, annotate
 
 logger = logging.getLogger(__name__)
 
+class IndexState:
+    """
+    One generation of the searchable knowledge base: the FAISS index, the
+    documents, the BM25 index and the FAISS id of every document row.
+
+    A state is never modified once published. Reloads build the next one
+    and swap it in with a single assignment, so a search that picked up the
+    previous state finishes on it, consistently.
+    """
+
+    __slots__ = ("index", "documents", "lexical_index", "ids", "rows", "version", "meta", "loaded_at")
+
+    def __init__(self, index, documents, lexical_index: Optional[LexicalIndex], ids: np.ndarray,
+                 version: int, meta: Dict[str, Any]):
+        self.index = index
+        self.documents = documents
+        self.lexical_index = lexical_index
+        self.ids = np.asarray(ids, dtype='int64')
+        self.rows = {int(faiss_id): row for row, faiss_id in enumerate(self.ids)}
+        self.version = version
+        self.meta = meta
+        self.loaded_at = time.time()
+
+    @classmethod
+    def empty(cls) -> "IndexState":
+        return cls(None, [], None, np.zeros(0, dtype='int64'), 0, {})
+
 class VectorDatabase:
     def __init__(self):
+        get_thread_budget().apply("encoder")
+        get_thread_budget().apply("faiss")
         self.encoder = SentenceTransformer(settings.EMBEDDING_MODEL)
-        self.index = None
-        self.documents = []
+        self._state = IndexState.empty()
+        self._update_lock = threading.Lock()  # One build / reload at a time
         self.dimension = None
         self.index_path = Path(settings.VECTOR_STORE_PATH) / "faiss_index.bin"
-        self.docs_path = Path(settings.VECTOR_STORE_PATH) / "documents.pkl"
+        self.ids_path = Path(settings.VECTOR_STORE_PATH) / "section_ids.npy"
+        self.store_path = Path(settings.VECTOR_STORE_PATH) / "documents.store"
+        self.docs_path = Path(settings.VECTOR_STORE_PATH) / "documents.pkl"  # Legacy pickle, migrated on load
+        self.meta_path = Path(settings.VECTOR_STORE_PATH) / "index_meta.json"
+        self.lexical_path = Path(settings.VECTOR_STORE_PATH) / "lexical_index.npz"
+        self.embedding_cache = None
+        if settings.EMBEDDING_CACHE_ENABLED:
+            self.embedding_cache = EmbeddingCache(
+                Path(settings.VECTOR_STORE_PATH) / "embedding_cache.npz",
+                settings.EMBEDDING_MODEL
+            )
+        self.last_build_stats = {}
+        self.last_reload: Dict[str, Any] = {}
+        # Repeated queries skip the encoder (query_cache) and FAISS (result_cache).
+        # Result keys include index_version, and build/load clear them as well.
+        cache_size = settings.SEARCH_CACHE_MAX_ENTRIES if settings.SEARCH_CACHE_ENABLED else 0
+        self.query_cache = LRUCache(cache_size)
+        self.result_cache = LRUCache(cache_size)
+        
+    # The current state, read-only; build_index / load_index / update_sections replace it
+    @property
+    def index(self):
+        return self._state.index
+        
+    @property
+    def documents(self):
+        return self._state.documents
+        
+    @property
+    def lexical_index(self) -> Optional[LexicalIndex]:
+        return self._state.lexical_index
+        
+    @property
+    def index_version(self) -> int:
+        return self._state.version
+        
+    @property
+    def index_meta(self) -> Dict[str, Any]:
+        return self._state.meta
+        
+    def _embed_documents(self, texts: List[str], keep: Optional[List[str]] = None) -> np.ndarray:
+        """
+        Normalized embeddings for texts, encoding only those missing from the cache.
+        The cache then keeps only the entries for keep (default: texts), i.e. the
+        sections of the generation being built.
+        """
+        if self.embedding_cache is None:
+            embeddings = self.encoder.encode(texts, show_progress_bar=True, convert_to_numpy=True)
+            self.last_build_stats = {'sections': len(texts), 'cache_hits': 0, 'encoded': len(texts)}
+            return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+        
+        keys, cached, missing = self.embedding_cache.lookup(texts)
+        vectors = [None] * len(texts)
+        for i, vector in cached.items():
+            vectors[i] = vector
+        
+        if missing:
+            logger.info(f"Encoding {len(missing)} new or changed sections")
+            encoded = self.encoder.encode(
+                [texts[i] for i in missing],
+                show_progress_bar=True,
+                convert_to_numpy=True
+            )
+            encoded = encoded / np.linalg.norm(encoded, axis=1, keepdims=True)
+            self.embedding_cache.update([keys[i] for i in missing], encoded)
+            for i, vector in zip(missing, encoded):
+                vectors[i] = vector
+        
+        # Drop entries for sections that no longer exist
+        self.embedding_cache.save(keep=keys if keep is None else [self.embedding_cache.key(text) for text in keep])
+        
+        self.last_build_stats = {'sections': len(texts), 'cache_hits': len(cached), 'encoded': len(missing)}
+        return np.stack(vectors).astype('float32')
         
-    def build_index(self, documents: List[Dict[str, Any]]):
-        """Build FAISS index from documents"""
+    def build_index(self, documents: List[Dict[str, Any]], lexical_index: Optional[LexicalIndex] = None):
+        """Build FAISS index (and the BM25 index, unless the caller already built it) from documents"""
         logger.info(f"Building FAISS index for {len(documents)} documents")
-        self.documents = documents
         
-        # Extract text for embedding
-        texts = [doc['content'] for doc in documents]
+        with self._update_lock:
+            # Extract text for embedding
+            texts = [doc['content'] for doc in documents]
+            
+            # Generate (or reuse cached) normalized embeddings
+            embeddings = self._embed_documents(texts)
+            
+            # Create FAISS index (type and build parameters from settings)
+            self.dimension = embeddings.shape[1]
+            ids = np.arange(len(documents), dtype='int64')
+            index, index_type, build_params = build_faiss_index(embeddings, ids=ids)
+            configure_search(index)
+            meta = {
+                'index_type': index_type,
+                'build_params': build_params,
+                'dimension': self.dimension,
+                'documents': len(documents),
+                'embedding_model': settings.EMBEDDING_MODEL
+            }
+            lexical_index = lexical_index or LexicalIndex.build(documents)
+            
+            # Save index and documents, then serve documents from the mapped store
+            # so the parsed list can be freed
+            documents = self._persist(index, documents, lexical_index, ids, meta)
+            self._publish(IndexState(index, documents, lexical_index, ids, self.index_version + 1, meta))
+        logger.info(f"Index built successfully. Type: {index_type}, dimension: {self.dimension}")
         
-        # Generate embeddings
-        embeddings = self.encoder.encode(
-            texts,
-            show_progress_bar=True,
-            convert_to_numpy=True
+    def update_sections(self, changed: Dict[str, List[Dict[str, Any]]], removed: Iterable[str] = ()) -> Dict[str, Any]:
+        """
+        Incrementally apply knowledge base file changes: changed maps a file
+        (as in each document's 'file' key) to its freshly parsed sections,
+        removed lists deleted files or directories. Sections of those files
+        are dropped from a copy of the index, and the new ones are embedded
+        and added under fresh ids. The BM25 index and document store are
+        rebuilt (cheap next to embedding), then the new state is swapped in.
+        HNSW cannot delete vectors, so it is rebuilt from the kept vectors.
+        """
+        start_time = time.time()
+        with self._update_lock:
+            state = self._state
+            removed = tuple(removed)
+            
+            def touched(file: Optional[str]) -> bool:
+                if not file:
+                    return False
+                return file in changed or any(file == path or file.startswith(path + '/') for path in removed)
+            
+            keep = [row for row in range(len(state.documents)) if not touched(state.documents[row].get('file'))]
+            added = [doc for docs in changed.values() for doc in docs]
+            documents = [dict(state.documents[row]) for row in keep] + added
+            if not documents:
+                logger.warning("Knowledge base update would leave no sections; keeping the current index")
+                return {}
+            
+            kept_ids = state.ids[keep]
+            dropped_ids = np.setdiff1d(state.ids, kept_ids)
+            next_id = int(state.ids.max()) + 1 if len(state.ids) else 0
+            added_ids = np.arange(next_id, next_id + len(added), dtype='int64')
+            ids = np.concatenate([kept_ids, added_ids])
+            # Prune the embedding cache to the new generation's sections, so edits don't pile up in it
+            contents = [doc['content'] for doc in documents]
+            embeddings = self._embed_documents([doc['content'] for doc in added], keep=contents) if added else None
+            if not added and self.embedding_cache is not None:
+                self.embedding_cache.save(keep=[self.embedding_cache.key(text) for text in contents])
+            
+            if supports_removal(state.index):
+                # Searches keep using the live index; edit a copy
+                index = faiss.clone_index(state.index)
+                if len(dropped_ids):
+                    index.remove_ids(dropped_ids)
+                if embeddings is not None:
+                    index.add_with_ids(embeddings, added_ids)
+                meta = dict(state.meta)
+            else:
+                vectors = [state.index.reconstruct_batch(kept_ids)] if len(kept_ids) else []
+                if embeddings is not None:
+                    vectors.append(embeddings)
+                index, index_type, build_params = build_faiss_index(
+                    np.vstack(vectors), state.meta.get('index_type'), ids=ids
+                )
+                meta = {**state.meta, 'index_type': index_type, 'build_params': build_params}
+            configure_search(index)
+            enable_reconstruct(index)
+            meta['documents'] = len(documents)
+            
+            lexical_index = LexicalIndex.build(documents)
+            documents = self._persist(index, documents, lexical_index, ids, meta)
+            self._publish(IndexState(index, documents, lexical_index, ids, state.version + 1, meta))
+            
+            self.last_reload = {
+                "files_changed": sorted(changed),
+                "files_removed": sorted(removed),
+                "sections_added": len(added),
+                "sections_removed": len(dropped_ids),
+                "duration": time.time() - start_time,
+                "index_version": self.index_version,
+                "reloaded_at": self._state.loaded_at,
+            }
+        logger.info(
+            f"Knowledge base updated: +{len(added)} / -{len(dropped_ids)} sections "
+            f"in {time.time() - start_time:.2f}s (index version {self.index_version})"
         )
+        return self.last_reload
+        
+    def tracks_files(self) -> bool:
+        """Whether every document records its source file (stores written before that cannot be updated incrementally)"""
+        documents = self.documents
+        return all('file' in documents[row] for row in range(len(documents)))
+        
+    def _publish(self, state: IndexState):
+        # Readers see either the old or the new state, never a mix. The old
+        # document store is not closed here: in-flight searches may still read
+        # it, and the mapping goes away once nothing references it.
+        self._state = state
+        self.result_cache.clear()
         
-        # Normalize embeddings
-        embeddings = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    def lookup_query_embedding(self, query: str) -> Optional[np.ndarray]:
+        """Cached normalized embedding for query (read-only), or None"""
+        return self.query_cache.get(normalize_query(query))
         
-        # Create FAISS index
-        self.dimension = embeddings.shape[1]
-        self.index = faiss.IndexFlatIP(self.dimension)
-        self.index.add(embeddings.astype('float32'))
+    def encode_queries(self, queries: List[str], batch_size: Optional[int] = None, use_cache: bool = True) -> np.ndarray:
+        """Encode and L2-normalize a batch of queries (one row per query)"""
+        if not use_cache:
+            embeddings = self.encoder.encode(queries, batch_size=batch_size or len(queries), convert_to_numpy=True)
+            return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
         
-        # Save index and documents
-        self.save_index()
-        logger.info(f"Index built successfully. Dimension: {self.dimension}")
+        keys = [normalize_query(q) for q in queries]
+        rows = [self.query_cache.peek(key) for key in keys]
+        missing = [i for i, row in enumerate(rows) if row is None]
         
-    def search(self, query: str, top_k: int = 4) -> List[Dict[str, Any]]:
-        """Search for most relevant documents"""
+        if missing:
+            with STAGE_SECONDS.time(stage="query_embedding"):
+                embeddings = self.encoder.encode(
+                    [queries[i] for i in missing],
+                    batch_size=batch_size or len(missing),
+                    convert_to_numpy=True
+                )
+            embeddings = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+            for i, vector in zip(missing, embeddings):
+                vector.flags.writeable = False
+                self.query_cache.put(keys[i], vector)
+                rows[i] = vector
+        
+        return np.stack(rows)
+        
+    @staticmethod
+    def _rank(scores: np.ndarray, indices: np.ndarray, state: IndexState) -> tuple:
+        """One FAISS result row as ((document row, score), ...), dropping padding (-1) ids"""
+        rows = state.rows
+        return tuple(
+            (rows[int(faiss_id)], float(score))
+            for score, faiss_id in zip(scores, indices)
+            if int(faiss_id) in rows
+        )
+        
+    @staticmethod
+    def _dense_scores(state: IndexState, rows: np.ndarray, query_embedding: np.ndarray) -> np.ndarray:
+        """Cosine similarity of query_embedding to the indexed vectors of document rows only"""
+        vectors = state.index.reconstruct_batch(state.ids[np.asarray(rows, dtype='int64')])
+        return vectors @ query_embedding.reshape(-1)
+        
+    def _dense_candidates(self, state: IndexState, query: str, query_embedding: np.ndarray, limit: int) -> tuple:
+        """
+        Dense ranking for hybrid search. On large corpora only the BM25
+        pre-filter candidates are scored; queries with too few lexical
+        matches (pure paraphrases) still get a full index search.
+        """
+        min_docs = settings.HYBRID_PREFILTER_MIN_DOCS
+        if min_docs and state.index.ntotal >= min_docs:
+            candidates = state.lexical_index.search(query, settings.HYBRID_PREFILTER_CANDIDATES)
+            if len(candidates) >= limit:
+                rows = np.array([row for row, _ in candidates])
+                scores = self._dense_scores(state, rows, query_embedding)
+                order = np.argsort(-scores)[:limit]
+                return tuple((int(rows[i]), float(scores[i])) for i in order)
+        scores, indices = state.index.search(query_embedding.reshape(1, -1).astype('float32'), limit)
+        return self._rank(scores[0], indices[0], state)
+        
+    def _fuse(self, state: IndexState, query: str, query_embedding: np.ndarray, top_k: int,
+              dense: Optional[tuple] = None) -> tuple:
+        """
+        Reciprocal rank fusion of the BM25 and dense rankings. Hits keep their
+        cosine score (the prompt and answer heuristics expect one), looked up
+        from the index for documents only the lexical side found.
+        """
+        limit = max(top_k, settings.HYBRID_CANDIDATES)
+        if dense is None:
+            dense = self._dense_candidates(state, query, query_embedding, limit)
+        lexical = state.lexical_index.search(query, limit)
+        
+        fused: Dict[int, float] = {}
+        for ranking in (dense, lexical):
+            for rank, (row, _) in enumerate(ranking):
+                fused[row] = fused.get(row, 0.0) + 1.0 / (settings.HYBRID_RRF_K + rank + 1)
+        top = sorted(fused, key=fused.get, reverse=True)[:top_k]
+        
+        cosine = dict(dense)
+        missing = [row for row in top if row not in cosine]
+        if missing:
+            cosine.update(zip(missing, self._dense_scores(state, np.array(missing), query_embedding).tolist()))
+        return tuple((row, float(cosine[row])) for row in top)
+        
+    @staticmethod
+    def _hybrid(state: IndexState, mode: Optional[str]) -> bool:
+        mode = (mode or settings.RETRIEVAL_MODE).lower()
+        return mode == "hybrid" and state.lexical_index is not None
+        
+    def search(self, query: str, top_k: int = 4, query_embedding: Optional[np.ndarray] = None,
+               mode: Optional[str] = None) -> List[SearchHit]:
+        """
+        Search for most relevant documents, optionally with a precomputed query embedding.
+        mode is "dense" or "hybrid" (BM25 + dense); defaults to RETRIEVAL_MODE.
+        Hits are read-only views (hit['content'], hit['score'], ...) over the stored documents.
+        """
         if self.index is None:
             self.load_index()
-            
-        # Encode query
-        query_embedding = self.encoder.encode([query], convert_to_numpy=True)
-        query_embedding = query_embedding / np.linalg.norm(query_embedding, axis=1, keepdims=True)
         
-        # Search
-        scores, indices = self.index.search(query_embedding.astype('float32'), top_k)
+        state = self._state
+        hybrid = self._hybrid(state, mode)
+        cache_key = (state.version, normalize_query(query), top_k, hybrid)
         
-        # Prepare results
-        results = []
-        for score, idx in zip(scores[0], indices[0]):
-            if idx < len(self.documents):
-                doc = self.documents[idx].copy()
-                doc['score'] = float(score)
-                results.append(doc)
+        with span("vector_search", top_k=top_k, hybrid=hybrid):
+            ranked = self.result_cache.get(cache_key)
+            annotate(cached=ranked is not None)
+            
+            if ranked is None:
+                # Encode query
+                if query_embedding is None:
+                    query_embedding = self.lookup_query_embedding(query)
+                if query_embedding is None:
+                    with span("query_embedding"):
+                        query_embedding = self.encode_queries([query])
+                query_embedding = np.asarray(query_embedding).reshape(1, -1)
                 
+                # Search
+                stage = "hybrid_search" if hybrid else "faiss_search"
+                with span(stage), STAGE_SECONDS.time(stage=stage):
+                    if hybrid:
+                        ranked = self._fuse(state, query, query_embedding, top_k)
+                    else:
+                        scores, indices = state.index.search(query_embedding.astype('float32'), top_k)
+                        ranked = self._rank(scores[0], indices[0], state)
+                self.result_cache.put(cache_key, ranked)
+        
+        # Prepare results
+        return [SearchHit(state.documents[row], score) for row, score in ranked]
+        
+    def search_batch(self, queries: List[str], top_k: int = 4, chunk_size: Optional[int] = None,
+                     mode: Optional[str] = None) -> List[List[SearchHit]]:
+        """
+        search() for many queries: each chunk of queries is encoded in batches and
+        sent to FAISS as a single matrix search. Results are in query order.
+        
+        Bulk traffic (offline evaluation, pre-fetching) bypasses the query and
+        result LRUs so it does not evict the interactive working set.
+        """
+        if self.index is None:
+            self.load_index()
+        
+        state = self._state
+        chunk_size = chunk_size or settings.RETRIEVE_BATCH_CHUNK_SIZE
+        hybrid = self._hybrid(state, mode)
+        min_docs = settings.HYBRID_PREFILTER_MIN_DOCS
+        prefilter = hybrid and min_docs and state.index.ntotal >= min_docs
+        # Hybrid fuses a deeper dense ranking; the pre-filter scores per query instead
+        k = max(top_k, settings.HYBRID_CANDIDATES) if hybrid else top_k
+        results: List[List[SearchHit]] = []
+        
+        for start in range(0, len(queries), chunk_size):
+            chunk = queries[start:start + chunk_size]
+            embeddings = self.encode_queries(chunk, batch_size=settings.RETRIEVE_BATCH_ENCODE_SIZE, use_cache=False)
+            if not prefilter:
+                scores, indices = state.index.search(embeddings.astype('float32'), k)
+            for row in range(len(chunk)):
+                if prefilter:
+                    ranked = self._fuse(state, chunk[row], embeddings[row], top_k)
+                else:
+                    ranked = self._rank(scores[row], indices[row], state)
+                    if hybrid:
+                        ranked = self._fuse(state, chunk[row], embeddings[row], top_k, dense=ranked)
+                results.append([SearchHit(state.documents[doc_row], score) for doc_row, score in ranked])
+        
         return results
         
-    def save_index(self):
-        """Save FAISS index and documents to disk"""
+    def index_info(self) -> Dict[str, Any]:
+        """Type, build parameters, query knobs and size of the current index"""
+        state = self._state
+        if state.index is None:
+            return {"loaded": False}
+        return {
+            "loaded": True,
+            **state.meta,
+            "search_params": search_params(state.index),
+            "vectors": int(state.index.ntotal),
+            "memory_mb": index_memory_bytes(state.index) / (1024 * 1024),
+            "index_version": state.version,
+            "loaded_at": state.loaded_at,
+            "retrieval_mode": settings.RETRIEVAL_MODE,
+            "lexical_terms": len(state.lexical_index.vocab) if state.lexical_index is not None else 0,
+        }
+        
+    def cache_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.SEARCH_CACHE_ENABLED,
+            "index_version": self.index_version,
+            "query_embeddings": self.query_cache.stats(),
+            "results": self.result_cache.stats(),
+        }
+        
+    @staticmethod
+    def _staging_path(path: Path) -> Path:
+        """Temporary name beside path that keeps its suffix (np.save / np.savez would append theirs)"""
+        return path.with_name(f"{path.stem}.tmp{path.suffix}")
+        
+    def _persist(self, index, documents, lexical_index: LexicalIndex, ids: np.ndarray, meta: Dict[str, Any]):
+        """
+        Write one generation to disk; returns the documents to serve (the mapped store once written).
+        Every file is written under a temporary name first and then swapped in,
+        the index last, so an index on disk never sits next to another
+        generation's section ids, lexical index or metadata.
+        """
         Path(settings.VECTOR_STORE_PATH).mkdir(parents=True, exist_ok=True)
+        staged = {
+            path: self._staging_path(path)
+            for path in (self.store_path, self.ids_path, self.lexical_path, self.meta_path, self.index_path)
+        }
         
-        if self.index is not None:
-            faiss.write_index(self.index, str(self.index_path))
-            with open(self.docs_path, 'wb') as f:
-                pickle.dump(self.documents, f)
-            logger.info(f"Index saved to {self.index_path}")
+        try:
+            store_staged = False
+            if not isinstance(documents, DocumentStore):
+                try:
+                    write_document_store(staged[self.store_path], documents)
+                    store_staged = True
+                except OSError as e:
+                    logger.warning(f"Could not write document store, keeping documents in memory: {e}")
+            np.save(staged[self.ids_path], ids)
+            lexical_index.save(staged[self.lexical_path])
+            # Record how the index was built next to it
+            with open(staged[self.meta_path], 'w', encoding='utf-8') as f:
+                json.dump(meta, f, indent=2)
+            faiss.write_index(index, str(staged[self.index_path]))
             
+            # Swap in rather than rewrite: the live files may be memory-mapped
+            if store_staged:
+                try:
+                    staged[self.store_path].replace(self.store_path)
+                    documents = DocumentStore(self.store_path)
+                except OSError as e:
+                    # e.g. Windows refuses to replace a file that is still mapped
+                    logger.warning(f"Could not replace document store, keeping documents in memory: {e}")
+            for path in (self.ids_path, self.lexical_path, self.meta_path, self.index_path):
+                staged[path].replace(path)
+        finally:
+            # Left over only if writing or swapping failed
+            for tmp_path in staged.values():
+                tmp_path.unlink(missing_ok=True)
+        logger.info(f"Index saved to {self.index_path}")
+        return documents
+        
+    def save_index(self):
+        """Save FAISS index and documents to disk"""
+        state = self._state
+        if state.index is not None:
+            self._persist(state.index, state.documents, state.lexical_index, state.ids, state.meta)
+        
+    @staticmethod
+    def _read_flags() -> int:
+        """faiss.read_index flags: map vectors and inverted lists read-only so worker processes share one copy"""
+        if not settings.VECTOR_INDEX_MMAP:
+            return 0
+        # IO_FLAG_MMAP covers IVF lists; IO_FLAG_MMAP_IFC (faiss >= 1.10) flat / HNSW storage
+        return faiss.IO_FLAG_MMAP | getattr(faiss, "IO_FLAG_MMAP_IFC", 0) | faiss.IO_FLAG_READ_ONLY
+        
     def load_index(self):
-        """Load FAISS index and documents from disk"""
-        if self.index_path.exists() and self.docs_path.exists():
-            self.index = faiss.read_index(str(self.index_path))
-            with open(self.docs_path, 'rb') as f:
-                self.documents = pickle.load(f)
-            logger.info(f"Index loaded from {self.index_path}")
+        """Load FAISS index and memory-map the document store (migrating documents.pkl if needed)"""
+        if self.index_path.exists() and not self.store_path.exists() and self.docs_path.exists():
+            migrate_pickle(self.docs_path, self.store_path)
+        
+        if self.index_path.exists() and self.store_path.exists():
+            with self._update_lock:
+                index = faiss.read_index(str(self.index_path), self._read_flags())
+                documents = DocumentStore(self.store_path)
+                meta = {}
+                if self.meta_path.exists():
+                    with open(self.meta_path, 'r', encoding='utf-8') as f:
+                        meta = json.load(f)
+                index_type = meta.get('index_type', 'flat')
+                if index_type != settings.VECTOR_INDEX_TYPE.lower():
+                    logger.warning(
+                        f"Saved index is {index_type} but VECTOR_INDEX_TYPE is {settings.VECTOR_INDEX_TYPE}; "
+                        f"it will be rebuilt as configured on the next build_index"
+                    )
+                # Indexes saved before section ids existed use document positions
+                ids = np.load(self.ids_path) if self.ids_path.exists() else np.arange(len(documents), dtype='int64')
+                if self.lexical_path.exists():
+                    lexical_index = LexicalIndex.load(self.lexical_path)
+                else:
+                    lexical_index = LexicalIndex.build(documents)
+                self.dimension = index.d
+                configure_search(index)
+                enable_reconstruct(index)
+                self._publish(IndexState(index, documents, lexical_index, ids, self.index_version + 1, meta))
+            logger.info(f"Index loaded from {self.index_path} (type: {index_type})")
         else:
-            raise FileNotFoundError("Vector index not found. Please build the index first.")
\ No newline at end of file
+            raise FileNotFoundError("Vector index not found. Please build the index first.")
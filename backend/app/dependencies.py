@@ -1,22 +1,131 @@
-from functools import lru_cache
+import logging
+import threading
+from functools import lru_cache, wraps
+from fastapi import Request
 from app.core.language_model import LanguageDetector
 from app.core.emotion_model import EmotionDetector
+from app.core.multi_head_detector import MultiHeadDetector
 from app.core.vector_database import VectorDatabase
 from app.core.answer_generator import AnswerGenerator
+from app.core.micro_batcher import MicroBatcher
+from app.core.answer_cache import SemanticAnswerCache
+from app.core.stage_pool import StagePools
+from app.core.kb_watcher import KnowledgeBaseWatcher
+from app.core.thread_budget import get_thread_budget
+from app.core.startup import StartupState
+from app.core.cancellation import Deadline, route_budget
+from app.utils.tracing import TraceBuffer
 from app.config import settings
 
+logger = logging.getLogger(__name__)
+
+def _load_once(getter):
+    """
+    lru_cache() whose first call is serialised: a request that arrives while
+    startup is still loading the model waits for that instance instead of
+    loading a second copy.
+    """
+    cached = lru_cache()(getter)
+    lock = threading.Lock()
+    
+    @wraps(getter)
+    def wrapper():
+        if not cached.cache_info().currsize:
+            with lock:
+                return cached()
+        return cached()
+    
+    wrapper.cache_info = cached.cache_info
+    wrapper.cache_clear = cached.cache_clear
+    return wrapper
+
 @lru_cache()
+def get_startup_state():
+    return StartupState()
+
+@_load_once
+def get_multi_head_detector():
+    """Shared-backbone detector, or None when disabled or it failed to load (separate detectors are used then)"""
+    if not settings.SHARED_CLASSIFIER_BACKBONE:
+        return None
+    try:
+        return MultiHeadDetector()
+    except Exception as e:
+        logger.error(f"Multi-head detector unavailable, falling back to separate detectors: {e}")
+        return None
+
+@_load_once
 def get_language_detector():
+    detector = get_multi_head_detector()
+    if detector is not None:
+        return detector.language
     return LanguageDetector()
 
-@lru_cache()
+@_load_once
 def get_emotion_detector():
+    detector = get_multi_head_detector()
+    if detector is not None:
+        return detector.emotion
     return EmotionDetector()
 
-@lru_cache()
+@_load_once
 def get_vector_db():
     return VectorDatabase()
 
-@lru_cache()
+@_load_once
 def get_answer_generator():
-    return AnswerGenerator()
\ No newline at end of file
+    return AnswerGenerator()
+
+@lru_cache()
+def get_classifier_batcher():
+    """Batches classification; each result is ((language, conf), (emotion, conf))"""
+    if not settings.MICRO_BATCH_ENABLED:
+        return None
+    pin = get_thread_budget().pinner("classifiers")
+    detector = get_multi_head_detector()
+    if detector is not None:
+        return MicroBatcher(detector.predict_batch, name="classifiers", initializer=pin)
+    
+    language_detector = get_language_detector()
+    emotion_detector = get_emotion_detector()
+    return MicroBatcher(
+        lambda texts: list(zip(language_detector.predict_batch(texts), emotion_detector.predict_batch(texts))),
+        name="classifiers",
+        initializer=pin
+    )
+
+@lru_cache()
+def get_embedding_batcher():
+    """Batches query embedding for VectorDatabase.search"""
+    if not settings.MICRO_BATCH_ENABLED:
+        return None
+    return MicroBatcher(
+        get_vector_db().encode_queries,
+        name="query_embedder",
+        initializer=get_thread_budget().pinner("encoder")
+    )
+
+@lru_cache()
+def get_answer_cache():
+    if not settings.ANSWER_CACHE_ENABLED:
+        return None
+    return SemanticAnswerCache()
+
+@lru_cache()
+def get_stage_pools():
+    return StagePools()
+
+@lru_cache()
+def get_kb_watcher():
+    return KnowledgeBaseWatcher(get_vector_db())
+
+@lru_cache()
+def get_trace_buffer():
+    return TraceBuffer(settings.TRACE_BUFFER_SIZE)
+
+def get_deadline(request: Request) -> Deadline:
+    """The request's Deadline, set by the deadline middleware (a fresh one outside it)"""
+    deadline = getattr(request.state, 'deadline', None)
+    if deadline is None:
+        deadline = Deadline(route_budget(request.url.path), route=request.url.path)
+    return deadline
\ No newline at end of file
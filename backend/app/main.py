@@ -1,4 +1,4 @@
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
@@ -6,9 +6,16 @@ from contextlib import asynccontextmanager
 import logging
 import asyncio
 from app.config import settings
-from app.api import chat, health, upload
+from app.api import chat, health, upload, retrieve, admin, debug
 from app.core.knowledge_base import KnowledgeBaseProcessor
-from app.dependencies import get_vector_db
+from app.core.startup import StartupState, WARMUP_TEXTS
+from app.core.cancellation import Deadline, route_budget
+from app.utils.metrics import registry, GENERATION_SLOTS
+from app.utils.tracing import Trace
+from app.dependencies import (
+    get_vector_db, get_classifier_batcher, get_embedding_batcher, get_stage_pools, get_kb_watcher,
+    get_language_detector, get_emotion_detector, get_answer_generator, get_startup_state, get_trace_buffer
+)
 
 # Configure logging
 logging.basicConfig(
@@ -17,6 +24,71 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def load_retrieval(startup: StartupState):
+    """Sentence encoder, then the knowledge base index (built, or loaded in prefork workers)"""
+    with startup.timed("retrieval.encoder"):
+        vector_db = get_vector_db()
+        get_embedding_batcher()
+    
+    with startup.timed("retrieval.index"):
+        if settings.BUILD_INDEX_ON_STARTUP:
+            kb_processor = KnowledgeBaseProcessor(settings.KNOWLEDGE_BASE_PATH)
+            documents = kb_processor.process_all_files()
+            vector_db.build_index(documents, lexical_index=kb_processor.build_lexical_index())
+        else:
+            # Prefork worker: the index was built once before the workers started
+            vector_db.load_index()
+    
+    build_stats = vector_db.last_build_stats
+    if build_stats.get('sections'):
+        logger.info(
+            f"Embedding cache hit rate: {build_stats['cache_hits'] / build_stats['sections']:.1%} "
+            f"({build_stats['cache_hits']} reused, {build_stats['encoded']} encoded)"
+        )
+    logger.info("Knowledge base and vector database initialized successfully")
+    
+    if settings.STARTUP_WARMUP:
+        # Pages in the (possibly mmapped) index and runs the encoder once
+        with startup.timed("retrieval.warmup"):
+            vector_db.search_batch(WARMUP_TEXTS)
+
+def load_classifiers(startup: StartupState):
+    with startup.timed("classifiers.load"):
+        language_detector = get_language_detector()
+        emotion_detector = get_emotion_detector()
+        get_classifier_batcher()
+    for name, detector in (("language", language_detector), ("emotion", emotion_detector)):
+        if detector.model is None:
+            raise RuntimeError(f"{name} model not loaded")
+    
+    # Two inputs of different lengths, so traced/ONNX backends see more than one shape
+    with startup.timed("classifiers.warmup"):
+        for text in WARMUP_TEXTS:
+            language_detector.predict(text)
+            emotion_detector.predict(text)
+
+def load_generation(startup: StartupState):
+    with startup.timed("generation.load"):
+        answer_generator = get_answer_generator()
+    # AnswerGenerator logs load errors and answers retrieval-only; don't report that as ready
+    if answer_generator.model is None and not settings.SKIP_MODEL_LOADING:
+        raise RuntimeError(f"GGUF model not loaded from {settings.CLAIRE_MODEL_PATH}")
+    with startup.timed("generation.warmup"):
+        answer_generator.warm_up()
+
+async def start_components():
+    """Load (and warm) the components in parallel, then start the knowledge base watcher"""
+    startup = get_startup_state()
+    components = {"retrieval": load_retrieval}
+    if settings.STARTUP_WARMUP:
+        components.update(classifiers=load_classifiers, generation=load_generation)
+        get_stage_pools()
+    
+    await asyncio.to_thread(startup.run, components)
+    
+    if settings.KB_WATCH_ENABLED and startup.components["retrieval"] == "ready":
+        get_kb_watcher().start()
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
@@ -25,22 +97,24 @@ async def lifespan(app: FastAPI):
     # Set longer timeout for asyncio tasks
     asyncio.get_event_loop().set_debug(False)
     
-    # Initialize knowledge base and vector database
-    try:
-        kb_processor = KnowledgeBaseProcessor(settings.KNOWLEDGE_BASE_PATH)
-        documents = kb_processor.process_all_files()
-        
-        vector_db = get_vector_db()
-        vector_db.build_index(documents)
-        
-        logger.info("Knowledge base and vector database initialized successfully")
-    except Exception as e:
-        logger.error(f"Error during startup: {e}")
+    if settings.STARTUP_WARMUP_BACKGROUND:
+        # Accept connections now: /live answers, /ready stays 503 until the models are warm
+        app.state.startup_task = asyncio.create_task(start_components())
+    else:
+        await start_components()
     
     yield
     
     # Shutdown
     logger.info("Shutting down CLAIRE RAG Backend...")
+    for get_batcher in (get_classifier_batcher, get_embedding_batcher):
+        # Only close batchers that were actually created
+        if get_batcher.cache_info().currsize and get_batcher() is not None:
+            get_batcher().close()
+    if get_kb_watcher.cache_info().currsize:
+        await get_kb_watcher().stop()
+    if get_stage_pools.cache_info().currsize:
+        get_stage_pools().close()
 
 # Create FastAPI app with custom settings
 app = FastAPI(
@@ -52,20 +126,43 @@ app = FastAPI(
     swagger_ui_parameters={"docExpansion": "none", "defaultModelsExpandDepth": -1}
 )
 
-# Add timeout middleware
+# Per-request deadline: stages read it from request.state and fit their work into it
 @app.middleware("http")
-async def timeout_middleware(request: Request, call_next):
+async def deadline_middleware(request: Request, call_next):
+    deadline = Deadline(route_budget(request.url.path), route=request.url.path)
+    request.state.deadline = deadline
     try:
-        # Set 5 minute timeout for all requests
-        response = await asyncio.wait_for(call_next(request), timeout=300.0)
+        # Backstop only: chat stages finish DEADLINE_RESERVE_SECONDS early with a fallback answer
+        response = await asyncio.wait_for(call_next(request), timeout=deadline.timeout)
         return response
     except asyncio.TimeoutError:
-        logger.error(f"Request timeout for {request.url}")
+        deadline.cancel("deadline")
+        logger.error(f"Request timeout for {request.url} after {deadline.timeout:.0f}s")
         return JSONResponse(
             status_code=504,
             content={"detail": "Request processing timeout. This is normal for CPU processing - please try again."}
         )
 
+# Per-request trace (outermost, so it also covers deadline 504s): Server-Timing header + /debug/traces
+@app.middleware("http")
+async def trace_middleware(request: Request, call_next):
+    if not settings.TRACING_ENABLED or not request.url.path.startswith(tuple(settings.TRACE_ROUTES)):
+        return await call_next(request)
+    
+    trace = Trace(request.url.path, request.method)
+    status = 500
+    try:
+        with trace.activate():
+            response = await call_next(request)
+        status = response.status_code
+        response.headers["Server-Timing"] = trace.server_timing()
+        response.headers["X-Trace-Id"] = trace.trace_id
+        return response
+    finally:
+        deadline = getattr(request.state, 'deadline', None)
+        trace.finish(status, **({"skipped": dict(deadline.skipped)} if deadline is not None and deadline.skipped else {}))
+        get_trace_buffer().add(trace)
+
 # Set up CORS with longer max_age
 app.add_middleware(
     CORSMiddleware,
@@ -73,13 +170,18 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Trace-Id"],
     max_age=3600  # Cache CORS for 1 hour
 )
 
 # Include routers
 app.include_router(chat.router, prefix=f"{settings.API_V1_STR}/chat", tags=["chat"])
 app.include_router(upload.router, prefix=f"{settings.API_V1_STR}/upload", tags=["upload"])
+app.include_router(retrieve.router, prefix=f"{settings.API_V1_STR}/retrieve", tags=["retrieve"])
 app.include_router(health.router, prefix=f"{settings.API_V1_STR}", tags=["health"])
+app.include_router(admin.router, prefix=f"{settings.API_V1_STR}/admin", tags=["admin"])
+if settings.TRACING_ENABLED:
+    app.include_router(debug.router, prefix="/debug", tags=["debug"])
 
 @app.get("/")
 async def root():
@@ -88,4 +190,17 @@ async def root():
         "version": settings.VERSION,
         "mode": "CPU Processing - Extended Timeouts",
         "docs": "/docs"
-    }
\ No newline at end of file
+    }
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint: every in-process counter, gauge and histogram"""
+    # Sample the generation queue, without loading the model for a scrape
+    if get_answer_generator.cache_info().currsize:
+        scheduler = getattr(get_answer_generator(), 'scheduler', None)
+        if scheduler is not None:
+            stats = scheduler.stats()
+            GENERATION_SLOTS.set(stats['slots'], state="total")
+            GENERATION_SLOTS.set(stats['busy_slots'], state="busy")
+            GENERATION_SLOTS.set(stats['queue_depth'], state="queued")
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
\ No newline at end of file
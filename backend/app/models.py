@@ -28,6 +28,10 @@ class RetrievedContext(BaseModel):
     score: float
     source: Optional[str] = None
     
+class BatchRetrieveResult(BaseModel):
+    query: str
+    contexts: List[RetrievedContext]
+    
 class ChatResponse(BaseModel):
     answer: str
     language: LanguageDetection
@@ -35,6 +39,7 @@ class ChatResponse(BaseModel):
     contexts: List[RetrievedContext]
     processing_time: float
     has_attachment: bool = False
+    stage_timings: Optional[Dict[str, float]] = None  # Seconds per pipeline stage
     timestamp: datetime = Field(default_factory=datetime.now)
     
 class HealthResponse(BaseModel):
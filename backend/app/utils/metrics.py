@@ -0,0 +1,211 @@
+"""
+In-process metrics for CLAIRE-RAG [BACKEND], exported in the Prometheus text format
+
+Counters, gauges and fixed-bucket histograms keyed by label values. Recording
+is a dict update under a per-metric lock, cheap enough for every request;
+the text is only rendered when /metrics is scraped. Complements
+log_performance(): logs keep the per-request detail, metrics the
+distributions.
+"""
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Sequence, Tuple
+
+# Seconds, from a cache hit to a CPU generation
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 384, 512, 768, 1024, 1536, 2048)
+TOKENS_PER_SECOND_BUCKETS = (1, 2, 5, 10, 15, 20, 30, 50, 100, 200, 500, 1000, 2000)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: Tuple[str, ...], *extra: Tuple[str, str]) -> str:
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def _snapshot(self) -> List[Tuple[Tuple[str, ...], Any]]:
+        with self._lock:
+            return sorted(self._values.items())
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name}{self._labels(key)} {_format_value(value)}" for key, value in self._snapshot()]
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}", *self._samples()]
+
+
+class Counter(_Metric):
+    """Monotonic total, e.g. answers by method"""
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    """Current value, e.g. the rolling decode speed"""
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """Observations counted into fixed upper-bound buckets, plus their sum and count"""
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, description, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        slot = bisect.bisect_left(self.buckets, value)  # First bucket whose bound is >= value; len() = +Inf
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][slot] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall time of the with-block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _snapshot(self):
+        with self._lock:
+            return sorted((key, (list(counts), total, n)) for key, (counts, total, n) in self._values.items())
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, (counts, total, n) in self._snapshot():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{self._labels(key, ('le', _format_value(bound)))} {cumulative}")
+            lines.append(f"{self.name}_sum{self._labels(key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{self._labels(key)} {n}")
+        return lines
+
+
+class MetricsRegistry:
+    """All metrics of the process; registering an existing name returns the existing metric"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> Any:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric):
+                    raise ValueError(f"{metric.name} is already registered as a {existing.kind}")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, description: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, description, labelnames))
+
+    def gauge(self, name: str, description: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, description, labelnames))
+
+    def histogram(self, name: str, description: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, description, labelnames, buckets))
+
+    def render(self) -> str:
+        """Every metric in the Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+
+registry = MetricsRegistry()
+
+# Chat pipeline
+CHAT_STAGE_SECONDS = registry.histogram(
+    "claire_chat_stage_duration_seconds",
+    "Wall time of each chat pipeline stage (classification, retrieval, generation) and of the whole request",
+    ("stage",)
+)
+STAGE_SECONDS = registry.histogram(
+    "claire_stage_duration_seconds",
+    "Wall time of one model or index operation (language/emotion detection, query embedding, FAISS search, "
+    "prompt build, llama prefill/decode)",
+    ("stage",)
+)
+ANSWERS = registry.counter("claire_answers_total", "Answers returned, by how they were produced", ("method",))
+
+# llama.cpp generation
+LLM_TOKENS = registry.histogram(
+    "claire_llm_tokens",
+    "Tokens per generation: prompt, prefilled (prompt minus reused KV cache), generated and max_tokens budget",
+    ("kind",),
+    TOKEN_BUCKETS
+)
+LLM_TOKENS_PER_SECOND = registry.histogram(
+    "claire_llm_tokens_per_second", "Prefill and decode speed of each generation", ("phase",), TOKENS_PER_SECOND_BUCKETS
+)
+LLM_ROLLING_TOKENS_PER_SECOND = registry.gauge(
+    "claire_llm_rolling_tokens_per_second", "Rolling prefill and decode speed used to size max_tokens", ("phase",)
+)
+GENERATION_SLOTS = registry.gauge(
+    "claire_generation_slots", "Generation slots (total, busy) and requests queued for one, sampled at scrape", ("state",)
+)
+
+# OCR
+OCR_SECONDS = registry.histogram(
+    "claire_ocr_duration_seconds", "Text extraction time per uploaded file", ("file_type", "outcome")
+)
+OCR_TIMEOUTS = registry.counter("claire_ocr_timeouts_total", "Uploads whose text extraction timed out", ("file_type",))
@@ -0,0 +1,166 @@
+"""
+Per-request tracing for CLAIRE-RAG [BACKEND]
+
+A Trace is a tree of timed Spans for one request. The trace middleware
+activates it in a context variable; span() opens a child of the current
+span, so nesting follows the call stack, and StagePool copies the context
+into its worker threads. Outside a traced request span() does nothing.
+Finished traces become the Server-Timing header and are kept in a
+TraceBuffer for /debug/traces.
+"""
+import re
+import time
+import uuid
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("claire_current_span", default=None)
+
+
+class Span:
+    """One timed operation; children are appended from any thread"""
+
+    def __init__(self, name: str, start: Optional[float] = None, attrs: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.start = start if start is not None else time.perf_counter()
+        self.end: Optional[float] = None
+        self.attrs: Dict[str, Any] = dict(attrs or {})
+        self.children: List["Span"] = []
+        self._lock = threading.Lock()
+
+    def child(self, name: str, start: Optional[float] = None, **attrs) -> "Span":
+        span = Span(name, start, attrs)
+        with self._lock:
+            self.children.append(span)
+        return span
+
+    def finish(self, end: Optional[float] = None):
+        if self.end is None:
+            self.end = end if end is not None else time.perf_counter()
+
+    @property
+    def duration(self) -> float:
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    def walk(self) -> Iterator["Span"]:
+        yield self
+        with self._lock:
+            children = list(self.children)
+        for child in children:
+            yield from child.walk()
+
+    def to_dict(self, origin: float) -> Dict[str, Any]:
+        with self._lock:
+            children = list(self.children)
+        return {
+            "name": self.name,
+            "start_ms": round((self.start - origin) * 1000, 2),
+            "duration_ms": round(self.duration * 1000, 2),
+            **({"attrs": self.attrs} if self.attrs else {}),
+            **({"children": [child.to_dict(origin) for child in children]} if children else {}),
+        }
+
+
+class Trace:
+    """The spans of one request, rooted at a span named after its route"""
+
+    def __init__(self, route: str, method: str = "GET"):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.route = route
+        self.method = method
+        self.started_at = datetime.now(timezone.utc)
+        self.status: Optional[int] = None
+        self.root = Span("total")
+
+    @contextmanager
+    def activate(self):
+        """Make the root span current for the with-block (and tasks and pool threads started in it)"""
+        token = _current_span.set(self.root)
+        try:
+            yield self
+        finally:
+            _current_span.reset(token)
+
+    def finish(self, status: Optional[int], **attrs):
+        self.status = status
+        self.root.attrs.update(attrs)
+        self.root.finish()
+
+    def server_timing(self) -> str:
+        """Server-Timing header value: one "name;dur=ms" entry per span, in start order"""
+        return ", ".join(
+            f"{re.sub(r'[^A-Za-z0-9_.-]', '_', span.name)};dur={span.duration * 1000:.1f}"
+            for span in self.root.walk()
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "route": self.route,
+            "method": self.method,
+            "status": self.status,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round(self.root.duration * 1000, 2),
+            "spans": self.root.to_dict(self.root.start),
+        }
+
+
+class TraceBuffer:
+    """Ring buffer of the last size finished traces"""
+
+    def __init__(self, size: int = 100):
+        self._traces = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, trace: Trace):
+        with self._lock:
+            self._traces.append(trace)
+
+    def recent(self, limit: Optional[int] = None) -> List[Trace]:
+        """Newest first"""
+        with self._lock:
+            traces = list(reversed(self._traces))
+        return traces[:limit] if limit else traces
+
+    def get(self, trace_id: str) -> Optional[Trace]:
+        with self._lock:
+            return next((trace for trace in self._traces if trace.trace_id == trace_id), None)
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Time the with-block as a child of the current span; yields the Span, or None outside a trace"""
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    current = parent.child(name, **attrs)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except Exception as e:
+        current.attrs["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.finish()
+        _current_span.reset(token)
+
+
+def record_span(name: str, seconds: float, ended_ago: float = 0.0, **attrs):
+    """Add an already measured operation (seconds long, finished ended_ago seconds ago) under the current span"""
+    parent = _current_span.get()
+    if parent is None:
+        return
+    end = time.perf_counter() - ended_ago
+    parent.child(name, start=end - seconds, **attrs).finish(end)
+
+
+def annotate(**attrs):
+    """Attach attributes (fallback branch taken, why, ...) to the current span"""
+    current = _current_span.get()
+    if current is not None:
+        current.attrs.update(attrs)
@@ -0,0 +1,100 @@
+"""
+Benchmark: fixed vs adaptive max_tokens under a request deadline
+
+Answers --questions real knowledge-base questions (section titles), each
+with a --budget second Deadline like the chat route passes, first with the
+fixed MODEL_MAX_TOKENS and then with max_tokens sized from the rolling
+decode speed. Reports per mode:
+  - answers finished by the model vs cut off by the deadline,
+  - p50 / max wall time against the budget,
+  - mean max_tokens chosen and the rolling prefill/decode tokens/s.
+
+Usage (from backend/):
+    python benchmarks/bench_adaptive_max_tokens.py [--questions 12] [--budget 20] [--max-tokens 1024]
+"""
+import os
+import re
+import sys
+import time
+import argparse
+import statistics
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(script_dir))  # Make app/ importable
+
+
+def kb_questions(documents: list, n: int) -> list:
+    """n section titles spread evenly over the knowledge base, without their "12." numbering"""
+    titles = [re.sub(r'^\d+\.\s*', '', doc['title']) for doc in documents]
+    step = max(len(titles) // n, 1)
+    return titles[::step][:n]
+
+
+def run(generator, prepared: list, budget: float) -> list:
+    from app.core.cancellation import Deadline
+
+    results = []
+    for question, contexts in prepared:
+        generator.last_timeout = 0  # No cooldown between questions
+        start = time.perf_counter()
+        result = generator.generate_answer(question, "english", "neutral", contexts, cancel=Deadline(budget))
+        results.append((result, time.perf_counter() - start))
+    return results
+
+
+def summarize(label: str, results: list, budget: float, speed: dict):
+    walls = sorted(wall for _, wall in results)
+    finished = sum(r['method'] == 'claire_rag' for r, _ in results)
+    cut = sum(r['cancelled'] == 'deadline' for r, _ in results)
+    mean_budget = speed.get('mean_budget')
+    print(f"{label:>9s} {finished:8d} {cut:6d} {statistics.median(walls):7.1f}s {walls[-1]:7.1f}s "
+          f"{sum(w > budget for w in walls):5d} {(f'{mean_budget:.0f}' if mean_budget else '-'):>7s} "
+          f"{speed.get('prefill_tokens_per_second') or 0:9.1f} {speed.get('decode_tokens_per_second') or 0:9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--questions", type=int, default=12)
+    parser.add_argument("--budget", type=float, default=20.0, help="Request deadline in seconds")
+    parser.add_argument("--max-tokens", type=int, default=1024, help="MODEL_MAX_TOKENS (the fixed length and the ceiling)")
+    args = parser.parse_args()
+
+    from app.config import settings
+    settings.MODEL_MAX_TOKENS = args.max_tokens
+    settings.GENERATION_SLOTS = 1
+
+    from app.core.answer_generator import AnswerGenerator
+    from app.core.knowledge_base import KnowledgeBaseProcessor
+    from app.core.vector_database import VectorDatabase
+
+    documents = KnowledgeBaseProcessor(settings.KNOWLEDGE_BASE_PATH).process_all_files()
+    vector_db = VectorDatabase()
+    vector_db.build_index(documents)
+    generator = AnswerGenerator()
+    if generator.model is None or generator.decode_speed is None:
+        print("GGUF model not loaded or ADAPTIVE_MAX_TOKENS disabled - nothing to benchmark")
+        sys.exit(1)
+
+    prepared = [
+        (q, [{'content': d['content'], 'title': d['title'], 'score': d['score']} for d in vector_db.search(q, top_k=4)])
+        for q in kb_questions(documents, args.questions)
+    ]
+    decode_speed = generator.decode_speed
+
+    # Fixed length first; the measured speeds also seed the adaptive run
+    generator.decode_speed = None
+    fixed = run(generator, prepared, args.budget)
+    generator.decode_speed = decode_speed
+    run(generator, prepared[:2], args.budget)  # Seed the rolling speed
+    decode_speed.budgets = decode_speed.budget_total = 0
+    adaptive = run(generator, prepared, args.budget)
+
+    print(f"\n{len(prepared)} questions, {args.budget:.0f}s deadline, ceiling {args.max_tokens} tokens")
+    print(f"{'mode':>9s} {'finished':>8s} {'cut':>6s} {'p50':>8s} {'max':>8s} {'late':>5s} {'tokens':>7s} "
+          f"{'prefill/s':>9s} {'decode/s':>9s}")
+    summarize("fixed", fixed, args.budget, {})
+    summarize("adaptive", adaptive, args.budget, decode_speed.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Benchmark: classifier inference backends (eager / torchscript / onnx int8)
+
+Runs the language + emotion classifiers under each CLASSIFIER_BACKEND on the
+same sample set, checks labels and confidence deltas against eager, and
+reports load time, per-question and batched latency, and process RSS. Each
+backend runs in its own subprocess so RSS numbers are not polluted by the
+others. The ONNX export happens on the first onnx run (see export_classifiers.py);
+its load time includes the export only that once.
+
+Usage (from backend/):
+    python benchmarks/bench_classifier_backends.py [--runs 30] [--backends eager onnx]
+    SHARED_CLASSIFIER_BACKBONE=false python benchmarks/bench_classifier_backends.py
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import statistics
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.dirname(script_dir)
+sys.path.insert(0, backend_dir)  # Make app/ importable
+
+os.environ.setdefault("USE_CUDA", "false")
+os.environ.setdefault("DEVICE", "cpu")
+
+SAMPLE_QUESTIONS = [
+    "How do I activate my credit card?",
+    "Pano i-activate ang credit card ko?",
+    "Paano magbukas ng savings account sa BPI?",
+    "My online banking is locked and I need to pay my bills today!",
+    "Thank you so much for the help with my loan",
+    "Hindi ko maintindihan yung fees ng Bizlink",
+    "What are the requirements for a BPI housing loan?",
+    "Nawala ang ATM card ko, ano ang gagawin ko?",
+    "URGENT: may unauthorized transaction sa account ko, paki-block agad",
+    "I'm worried my salary hasn't been credited yet, is there a delay?",
+    "Salamat po sa mabilis na tulong!",
+    "Can I change the billing address on my credit card online?",
+    "Bakit may annual fee pa rin ang card ko kahit waived daw?",
+    "I was charged twice for the same purchase and nobody is answering the hotline",
+    "Ano po ang maintaining balance ng Saver-Plus account?",
+    "Where can I see my loan amortization schedule?",
+]
+
+
+def _rss_mb() -> float:
+    import psutil
+    return psutil.Process().memory_info().rss / (1024 * 1024)
+
+
+def run_backend(backend: str, runs: int) -> dict:
+    """Load the classifiers under one backend and time them (runs in a subprocess)"""
+    import torch
+    torch.set_grad_enabled(False)
+    from app.config import settings
+
+    rss_before = _rss_mb()
+    load_start = time.perf_counter()
+    if settings.SHARED_CLASSIFIER_BACKBONE:
+        from app.core.multi_head_detector import MultiHeadDetector
+        detector = MultiHeadDetector()
+        predict, predict_batch = detector.predict, detector.predict_batch
+        actual_backend = detector.runner.backend
+    else:
+        from app.core.language_model import LanguageDetector
+        from app.core.emotion_model import EmotionDetector
+        language_detector = LanguageDetector()
+        emotion_detector = EmotionDetector()
+        predict = lambda q: (language_detector.predict(q), emotion_detector.predict(q))
+        predict_batch = lambda qs: list(zip(language_detector.predict_batch(qs), emotion_detector.predict_batch(qs)))
+        actual_backend = language_detector.model.backend
+    load_time = time.perf_counter() - load_start
+
+    predictions = [predict(q) for q in SAMPLE_QUESTIONS]  # also warms up
+    predict_batch(SAMPLE_QUESTIONS)
+
+    latencies = []
+    for _ in range(runs):
+        for q in SAMPLE_QUESTIONS:
+            start = time.perf_counter()
+            predict(q)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    batch_times = []
+    for _ in range(max(runs // 5, 1)):
+        start = time.perf_counter()
+        predict_batch(SAMPLE_QUESTIONS)
+        batch_times.append((time.perf_counter() - start) * 1000)
+
+    latencies.sort()
+    return {
+        "backend": actual_backend,
+        "requested": backend,
+        "load_time_s": load_time,
+        "rss_mb": _rss_mb(),
+        "rss_delta_mb": _rss_mb() - rss_before,
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1],
+        "batch_ms_per_q": statistics.median(batch_times) / len(SAMPLE_QUESTIONS),
+        "predictions": predictions,
+    }
+
+
+def _spawn(backend: str, runs: int) -> dict:
+    output = subprocess.run(
+        [sys.executable, __file__, "--backend", backend, "--runs", str(runs)],
+        capture_output=True, text=True, cwd=backend_dir, check=True,
+        env={**os.environ, "CLASSIFIER_BACKEND": backend}
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backend", help=argparse.SUPPRESS)
+    parser.add_argument("--backends", nargs="+", default=["eager", "torchscript", "onnx"])
+    parser.add_argument("--runs", type=int, default=30)
+    parser.add_argument("--tolerance", type=float, default=0.05,
+                        help="Max allowed confidence delta vs eager (int8 is not bit-exact)")
+    args = parser.parse_args()
+
+    if args.backend:
+        print(json.dumps(run_backend(args.backend, args.runs)))
+        return
+
+    backends = ["eager"] + [b for b in args.backends if b != "eager"]
+    results = [_spawn(b, args.runs) for b in backends]
+    reference = results[0]
+
+    print("=" * 60)
+    print("PARITY vs eager")
+    print("=" * 60)
+    failures = 0
+    for r in results[1:]:
+        if r["backend"] != r["requested"]:
+            print(f"✗ {r['requested']}: backend could not be built, fell back to {r['backend']}")
+            failures += 1
+            continue
+        label_mismatches = 0
+        max_delta = 0.0
+        for (e_lang, e_emo), (b_lang, b_emo) in zip(reference["predictions"], r["predictions"]):
+            label_mismatches += (e_lang[0] != b_lang[0]) + (e_emo[0] != b_emo[0])
+            max_delta = max(max_delta, abs(e_lang[1] - b_lang[1]), abs(e_emo[1] - b_emo[1]))
+        ok = label_mismatches == 0 and max_delta <= args.tolerance
+        failures += 0 if ok else 1
+        print(f"{'✓' if ok else '✗'} {r['backend']:12s} label mismatches: {label_mismatches}/"
+              f"{2 * len(SAMPLE_QUESTIONS)}  max confidence Δ: {max_delta:.2e}")
+
+    print("\n" + "=" * 60)
+    print("CPU LATENCY / MEMORY")
+    print("=" * 60)
+    print(f"{'backend':12s} {'load s':>8s} {'p50 ms':>8s} {'p95 ms':>8s} {'batch ms/q':>11s} {'RSS MB':>8s}")
+    for r in results:
+        print(f"{r['backend']:12s} {r['load_time_s']:8.2f} {r['p50_ms']:8.2f} {r['p95_ms']:8.2f} "
+              f"{r['batch_ms_per_q']:11.2f} {r['rss_mb']:8.0f}")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Benchmark: documents.pkl vs the memory-mapped document store
+
+Writes the knowledge base documents (replicated --scale times to stand in for
+a large corpus) both as a pickle and as a document store. Then, in a fresh
+subprocess per format, it measures:
+  - load time and RSS growth on open,
+  - time to materialize the fields of top-k "search hits" (random ids),
+  - RSS after those lookups (the store only pages in what was read).
+
+Usage (from backend/):
+    python benchmarks/bench_document_store.py [--scale 1 100 1000] [--lookups 2000]
+"""
+import os
+import sys
+import json
+import time
+import random
+import pickle
+import argparse
+import tempfile
+import subprocess
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.dirname(script_dir)
+sys.path.insert(0, backend_dir)  # Make app/ importable
+
+
+def _rss_mb() -> float:
+    import psutil
+    return psutil.Process().memory_info().rss / (1024 * 1024)
+
+
+def run_format(fmt: str, path: str, lookups: int, top_k: int) -> dict:
+    """Open one format and read top-k hits (runs in a subprocess)"""
+    from app.core.document_store import DocumentStore
+
+    rss_before = _rss_mb()
+    start = time.perf_counter()
+    if fmt == "pickle":
+        with open(path, 'rb') as f:
+            documents = pickle.load(f)
+    else:
+        documents = DocumentStore(path)
+    load_time = time.perf_counter() - start
+    rss_loaded = _rss_mb()
+
+    rng = random.Random(0)
+    start = time.perf_counter()
+    for _ in range(lookups):
+        for idx in rng.sample(range(len(documents)), top_k):
+            doc = documents[idx]
+            # What chat reads from every hit
+            doc['content'], doc['title'], doc.get('source'), doc.get('category')
+    lookup_time = time.perf_counter() - start
+
+    return {
+        "format": fmt,
+        "documents": len(documents),
+        "load_ms": load_time * 1000,
+        "rss_load_mb": rss_loaded - rss_before,
+        "rss_after_lookups_mb": _rss_mb() - rss_before,
+        "lookup_us_per_hit": lookup_time / (lookups * top_k) * 1e6,
+    }
+
+
+def _spawn(fmt: str, path: str, lookups: int, top_k: int) -> dict:
+    output = subprocess.run(
+        [sys.executable, __file__, "--format", fmt, "--path", path,
+         "--lookups", str(lookups), "--top-k", str(top_k)],
+        capture_output=True, text=True, cwd=backend_dir, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--format", choices=["pickle", "store"])
+    parser.add_argument("--path")
+    parser.add_argument("--scale", type=int, nargs="+", default=[1, 100, 1000])
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--top-k", type=int, default=4)
+    args = parser.parse_args()
+
+    if args.format:
+        print(json.dumps(run_format(args.format, args.path, args.lookups, args.top_k)))
+        return
+
+    from app.config import settings
+    from app.core.knowledge_base import KnowledgeBaseProcessor
+    from app.core.document_store import write_document_store
+
+    base = KnowledgeBaseProcessor(settings.KNOWLEDGE_BASE_PATH).process_all_files()
+
+    print(f"{'docs':>9s} {'format':>7s} {'file MB':>8s} {'load ms':>9s} {'RSS load MB':>12s} "
+          f"{'RSS after MB':>13s} {'µs/hit':>7s}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in args.scale:
+            documents = [
+                {**doc, 'content': f"{doc['content']} #{copy}"} if copy else doc
+                for copy in range(scale) for doc in base
+            ]
+            pickle_path = os.path.join(tmp, "documents.pkl")
+            store_path = os.path.join(tmp, "documents.store")
+            with open(pickle_path, 'wb') as f:
+                pickle.dump(documents, f)
+            write_document_store(store_path, documents)
+            del documents
+
+            for fmt, path in (("pickle", pickle_path), ("store", store_path)):
+                r = _spawn(fmt, path, args.lookups, args.top_k)
+                print(f"{r['documents']:9d} {fmt:>7s} {os.path.getsize(path) / 1e6:8.1f} {r['load_ms']:9.1f} "
+                      f"{r['rss_load_mb']:12.1f} {r['rss_after_lookups_mb']:13.1f} {r['lookup_us_per_hit']:7.2f}")
+
+
+if __name__ == "__main__":
+    main()
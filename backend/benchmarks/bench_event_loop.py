@@ -0,0 +1,110 @@
+"""
+Load test: is the event loop still responsive while answers are being generated?
+
+Against a running server, probes a cheap endpoint (/api/v1/health/pools)
+every --probe-interval seconds, first with no load (baseline) and then while
+--clients concurrent /chat requests are in flight. If a pipeline stage blocked
+the event loop, probe latency would jump to the length of that stage (seconds
+for an LLM call); with the stages in worker pools it should stay in the
+millisecond range. Also prints the per-stage timings returned by /chat and
+the pool statistics at the end.
+
+Usage (server started separately, e.g. python start_claire.py):
+    python benchmarks/bench_event_loop.py [--url http://localhost:8000] [--clients 4] [--rounds 2]
+"""
+import time
+import argparse
+import statistics
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+SAMPLE_QUESTIONS = [
+    "How do I activate my credit card?",
+    "Pano i-activate ang credit card ko?",
+    "What are the requirements for a BPI housing loan?",
+    "Nawala ang ATM card ko, ano ang gagawin ko?",
+]
+
+
+def probe(url: str, interval: float, stop: threading.Event) -> list:
+    latencies = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        requests.get(url, timeout=60).raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+        time.sleep(interval)
+    return latencies
+
+
+def summarize(label: str, latencies: list):
+    latencies = sorted(latencies)
+    p99 = latencies[max(int(len(latencies) * 0.99) - 1, 0)]
+    print(f"{label:22s} n={len(latencies):4d}  p50={statistics.median(latencies):8.1f} ms  "
+          f"p99={p99:8.1f} ms  max={latencies[-1]:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--rounds", type=int, default=2, help="Chat requests per client")
+    parser.add_argument("--probe-interval", type=float, default=0.05)
+    parser.add_argument("--baseline-seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    probe_url = f"{args.url}/api/v1/health/pools"
+    chat_url = f"{args.url}/api/v1/chat/chat"
+
+    # Baseline: idle server
+    stop = threading.Event()
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        baseline = pool.submit(probe, probe_url, args.probe_interval, stop)
+        time.sleep(args.baseline_seconds)
+        stop.set()
+        baseline = baseline.result()
+
+    # Under load: probe while the chat requests run
+    def client(i: int) -> list:
+        timings = []
+        for r in range(args.rounds):
+            question = SAMPLE_QUESTIONS[(i + r) % len(SAMPLE_QUESTIONS)]
+            response = requests.post(chat_url, json={"question": question}, timeout=600)
+            response.raise_for_status()
+            body = response.json()
+            timings.append({**(body.get("stage_timings") or {}), "total": body["processing_time"]})
+        return timings
+
+    stop = threading.Event()
+    with ThreadPoolExecutor(max_workers=args.clients + 1) as pool:
+        loaded = pool.submit(probe, probe_url, args.probe_interval, stop)
+        start = time.perf_counter()
+        chat_timings = [t for result in pool.map(client, range(args.clients)) for t in result]
+        elapsed = time.perf_counter() - start
+        stop.set()
+        loaded = loaded.result()
+
+    print("=" * 70)
+    print(f"EVENT LOOP RESPONSIVENESS ({args.clients} clients x {args.rounds} chats, {elapsed:.1f}s)")
+    print("=" * 70)
+    summarize("idle", baseline)
+    summarize("during generation", loaded)
+
+    print("\n" + "=" * 70)
+    print("CHAT STAGE TIMINGS (mean seconds)")
+    print("=" * 70)
+    stages = sorted({stage for t in chat_timings for stage in t})
+    for stage in stages:
+        values = [t[stage] for t in chat_timings if stage in t]
+        print(f"{stage:22s} {statistics.mean(values):8.3f}  (n={len(values)})")
+
+    print("\n" + "=" * 70)
+    print("WORKER POOLS")
+    print("=" * 70)
+    for name, stats in requests.get(probe_url, timeout=60).json().items():
+        print(f"{name:12s} workers={stats['workers']:3d} completed={stats['completed']:5d} "
+              f"mean queue wait={stats['mean_queue_wait_ms']:8.1f} ms  mean run={stats['mean_run_ms']:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
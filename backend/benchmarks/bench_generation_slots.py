@@ -0,0 +1,80 @@
+"""
+Benchmark: LLM-answer rate vs concurrency for the generation scheduler
+
+Fires N simultaneous generate_answer() calls and reports how many got a
+real CLAIRE answer (method == 'claire_rag') versus a retrieval-only
+fallback, plus latency and the scheduler's queue/slot statistics.
+
+Compare configurations via the environment, e.g.:
+    GENERATION_SLOTS=1 GENERATION_QUEUE_SIZE=0  python benchmarks/bench_generation_slots.py  # old busy-flag behaviour
+    GENERATION_SLOTS=1 GENERATION_QUEUE_SIZE=32 python benchmarks/bench_generation_slots.py
+    GENERATION_SLOTS=2 GENERATION_QUEUE_SIZE=32 python benchmarks/bench_generation_slots.py
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(script_dir))  # Make app/ importable
+
+SAMPLE_REQUESTS = [
+    ("How do I activate my credit card?", "english", "neutral"),
+    ("Pano i-activate ang credit card ko?", "taglish", "confused"),
+    ("What are the requirements for a BPI housing loan?", "english", "neutral"),
+    ("Nawala ang ATM card ko, ano ang gagawin ko?", "tagalog", "worried"),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--max-tokens", type=int, default=128, help="Cap answer length to keep runs short")
+    args = parser.parse_args()
+
+    from app.config import settings
+    settings.MODEL_MAX_TOKENS = args.max_tokens
+    settings.ADAPTIVE_MAX_TOKENS = False  # Same answer length in every run
+
+    from app.core.answer_generator import AnswerGenerator
+    from app.core.knowledge_base import KnowledgeBaseProcessor
+    from app.core.vector_database import VectorDatabase
+
+    vector_db = VectorDatabase()
+    vector_db.build_index(KnowledgeBaseProcessor(settings.KNOWLEDGE_BASE_PATH).process_all_files())
+    generator = AnswerGenerator()
+    if generator.scheduler is None:
+        print("GGUF model not loaded - nothing to benchmark")
+        sys.exit(1)
+
+    prepared = [
+        (q, lang, emo, [{'content': d['content'], 'title': d['title'], 'score': d['score']}
+                        for d in vector_db.search(q, top_k=3)])
+        for q, lang, emo in SAMPLE_REQUESTS
+    ]
+
+    def one_request(i: int):
+        q, lang, emo, contexts = prepared[i % len(prepared)]
+        start = time.perf_counter()
+        result = generator.generate_answer(q, lang, emo, contexts)
+        return result['method'], time.perf_counter() - start
+
+    print(f"slots={settings.GENERATION_SLOTS} queue={settings.GENERATION_QUEUE_SIZE} "
+          f"queue_timeout={settings.GENERATION_QUEUE_TIMEOUT}s max_tokens={args.max_tokens}")
+    print(f"{'clients':>8s} {'LLM answers':>12s} {'rate':>6s} {'p50 s':>7s} {'max s':>7s} "
+          f"{'mean wait ms':>13s} {'util':>6s}")
+
+    for n in args.concurrency:
+        with ThreadPoolExecutor(max_workers=n) as pool:
+            outcomes = list(pool.map(one_request, range(n)))
+        llm = sum(1 for method, _ in outcomes if method == 'claire_rag')
+        latencies = [t for _, t in outcomes]
+        stats = generator.scheduler.stats()
+        print(f"{n:8d} {llm:5d}/{n:<6d} {llm / n:6.0%} {statistics.median(latencies):7.1f} "
+              f"{max(latencies):7.1f} {stats['mean_wait_ms']:13.0f} {stats['utilisation']:6.0%}")
+
+
+if __name__ == "__main__":
+    main()
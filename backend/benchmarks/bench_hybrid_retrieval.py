@@ -0,0 +1,114 @@
+"""
+Benchmark: dense-only vs hybrid (BM25 + dense, RRF) retrieval
+
+Every query has a known answer section. By default the queries are the
+knowledge base section titles, which the dense side never sees because only
+content is embedded. You can also pass --queries with a JSONL file of
+{"query": ..., "title": ...} lines (real user questions and the title of
+the section that answers them). For each corpus size it reports hit@k, MRR
+and per-query latency for:
+  - dense           FAISS only
+  - hybrid          BM25 and a full dense search, fused with RRF
+  - hybrid+prefilter  dense scoring limited to the BM25 candidates
+
+Larger corpora are the knowledge base replicated --scale times, with noisy
+copies of the section embeddings. A hit on any copy of the answer section
+counts.
+
+Usage (from backend/):
+    python benchmarks/bench_hybrid_retrieval.py [--scale 1 100 1000] [--k 4] [--queries questions.jsonl]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(script_dir))  # Make app/ importable
+
+import numpy as np
+
+MODES = [("dense", "dense", False), ("hybrid", "hybrid", False), ("hybrid+prefilter", "hybrid", True)]
+
+
+def load_queries(path, documents):
+    """(query, answer section id) pairs"""
+    if not path:
+        return [(doc['title'], i) for i, doc in enumerate(documents)]
+    by_title = {doc['title']: i for i, doc in enumerate(documents)}
+    pairs = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                item = json.loads(line)
+                if item['title'] in by_title:
+                    pairs.append((item['query'], by_title[item['title']]))
+    return pairs
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", type=int, nargs="+", default=[1, 100, 1000])
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--queries", help="JSONL file of {query, title} pairs (default: section titles)")
+    parser.add_argument("--noise", type=float, default=0.3, help="Noise norm of replicated section embeddings")
+    args = parser.parse_args()
+
+    from app.config import settings
+    from app.core.knowledge_base import KnowledgeBaseProcessor
+    from app.core.vector_database import VectorDatabase, IndexState
+    from app.core.index_factory import build_faiss_index
+    from app.core.lexical_index import LexicalIndex
+    from app.core.search_cache import LRUCache
+
+    base = KnowledgeBaseProcessor(settings.KNOWLEDGE_BASE_PATH).process_all_files()
+    vector_db = VectorDatabase()
+    vector_db.result_cache = LRUCache(0)  # Time the search itself, not the cache
+    base_embeddings = vector_db._embed_documents([doc['content'] for doc in base])
+    queries = load_queries(args.queries, base)
+    query_embeddings = vector_db.encode_queries([q for q, _ in queries])
+    n = len(base)
+    print(f"{n} sections, {len(queries)} queries, k={args.k}")
+
+    rng = np.random.default_rng(0)
+    print(f"\n{'docs':>9s} {'mode':>17s} {'hit@k':>7s} {'MRR':>6s} {'p50 ms':>8s} {'p95 ms':>8s}")
+    for scale in args.scale:
+        documents = [
+            {**doc, 'content': f"{doc['content']} #{copy}"} if copy else doc
+            for copy in range(scale) for doc in base
+        ]
+        noise = rng.standard_normal((n * (scale - 1), base_embeddings.shape[1])) * args.noise
+        noise /= np.sqrt(base_embeddings.shape[1])
+        copies = np.tile(base_embeddings, (scale - 1, 1)) + noise
+        copies /= np.linalg.norm(copies, axis=1, keepdims=True)
+        embeddings = np.vstack([base_embeddings, copies]).astype('float32')
+
+        index, _, _ = build_faiss_index(embeddings, "flat")
+        vector_db._publish(IndexState(
+            index, documents, LexicalIndex.build(documents), np.arange(len(documents)),
+            vector_db.index_version + 1, {}
+        ))
+
+        for label, mode, prefilter in MODES:
+            settings.HYBRID_PREFILTER_MIN_DOCS = 1 if prefilter else 0
+            latencies, hits, reciprocal_ranks = [], 0, []
+            for (query, answer), embedding in zip(queries, query_embeddings):
+                start = time.perf_counter()
+                results = vector_db.search(query, args.k, query_embedding=embedding, mode=mode)
+                latencies.append((time.perf_counter() - start) * 1000)
+                ranks = [
+                    rank for rank, hit in enumerate(results, 1)
+                    if hit['title'] == base[answer]['title'] and hit['content'].startswith(base[answer]['content'])
+                ]
+                hits += bool(ranks)
+                reciprocal_ranks.append(1 / ranks[0] if ranks else 0.0)
+
+            latencies.sort()
+            print(f"{len(documents):9d} {label:>17s} {hits / len(queries):7.3f} {statistics.mean(reciprocal_ranks):6.3f} "
+                  f"{statistics.median(latencies):8.3f} {latencies[int(len(latencies) * 0.95)]:8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark: Flat vs HNSW vs IVF-Flat vs IVF-PQ at several corpus sizes
+
+The corpus is synthetic but shaped like ours: every vector is a knowledge
+base section embedding plus Gaussian noise, re-normalized. This gives
+realistic clusters at any size. Held-out queries are drawn the same way.
+For each size and index type it reports build time, index memory, and
+recall@k against exact (Flat) search. It also reports single-query p50
+latency at a few values of the query-time knob (efSearch for HNSW, nprobe
+for IVF).
+
+Usage (from backend/):
+    python benchmarks/bench_index_types.py [--sizes 10000 100000 300000] [--k 4]
+    python benchmarks/bench_index_types.py --synthetic   # random cluster centres, no encoder needed
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(script_dir))  # Make app/ importable
+
+import numpy as np
+
+KNOBS = {
+    "flat": [None],
+    "hnsw": [16, 32, 64, 128],
+    "ivf_flat": [1, 4, 16, 64],
+    "ivf_pq": [1, 4, 16, 64],
+}
+
+
+def normalize(x: np.ndarray) -> np.ndarray:
+    return (x / np.linalg.norm(x, axis=1, keepdims=True)).astype('float32')
+
+
+def cluster_centres(synthetic: bool, dimension: int, rng) -> np.ndarray:
+    if synthetic:
+        return normalize(rng.standard_normal((500, dimension)))
+
+    from app.config import settings
+    from app.core.knowledge_base import KnowledgeBaseProcessor
+    from app.core.vector_database import VectorDatabase
+
+    vector_db = VectorDatabase()
+    documents = KnowledgeBaseProcessor(settings.KNOWLEDGE_BASE_PATH).process_all_files()
+    return vector_db._embed_documents([doc['content'] for doc in documents])
+
+
+def sample(centres: np.ndarray, n: int, noise: float, rng) -> np.ndarray:
+    picks = rng.integers(0, len(centres), n)
+    noisy = centres[picks] + rng.standard_normal((n, centres.shape[1])) * noise / np.sqrt(centres.shape[1])
+    return normalize(noisy)
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    k = truth.shape[1]
+    return float(np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)]))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 300000])
+    parser.add_argument("--types", nargs="+", default=["flat", "hnsw", "ivf_flat", "ivf_pq"])
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--noise", type=float, default=0.6, help="Noise norm relative to the unit-length centres")
+    parser.add_argument("--synthetic", action="store_true")
+    parser.add_argument("--dimension", type=int, default=384, help="Only used with --synthetic")
+    args = parser.parse_args()
+
+    import faiss
+    from app.core.index_factory import build_faiss_index, configure_search, index_memory_bytes
+
+    rng = np.random.default_rng(0)
+    centres = cluster_centres(args.synthetic, args.dimension, rng)
+    queries = sample(centres, args.queries, args.noise, rng)
+    print(f"{len(centres)} cluster centres, dimension {centres.shape[1]}, {args.queries} queries, k={args.k}")
+
+    for size in args.sizes:
+        corpus = sample(centres, size, args.noise, rng)
+        exact = faiss.IndexFlatIP(corpus.shape[1])
+        exact.add(corpus)
+        _, truth = exact.search(queries, args.k)
+
+        print("\n" + "=" * 78)
+        print(f"CORPUS SIZE {size:,}")
+        print("=" * 78)
+        print(f"{'type':10s} {'built as':10s} {'build s':>8s} {'memory MB':>10s} {'knob':>12s} "
+              f"{'recall@k':>9s} {'p50 ms':>8s} {'batch q/s':>10s}")
+
+        for index_type in args.types:
+            start = time.perf_counter()
+            index, built_as, _ = build_faiss_index(corpus, index_type)
+            build_time = time.perf_counter() - start
+            memory_mb = index_memory_bytes(index) / (1024 * 1024)
+
+            for knob in KNOBS[built_as]:
+                applied = configure_search(index, ef_search=knob, nprobe=knob)
+                knob_label = ", ".join(f"{name}={value}" for name, value in applied.items()) or "-"
+
+                latencies = []
+                for q in queries:
+                    t = time.perf_counter()
+                    index.search(q.reshape(1, -1), args.k)
+                    latencies.append((time.perf_counter() - t) * 1000)
+
+                t = time.perf_counter()
+                _, found = index.search(queries, args.k)
+                batch_qps = len(queries) / (time.perf_counter() - t)
+
+                print(f"{index_type:10s} {built_as:10s} {build_time:8.2f} {memory_mb:10.1f} {knob_label:>12s} "
+                      f"{recall_at_k(found, truth):9.3f} {statistics.median(latencies):8.3f} {batch_qps:10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark: per-call inference vs cross-request micro-batching
+
+Simulates 1, 8 and 32 concurrent clients against the classifiers and the
+query embedder, once calling the models one request at a time (as before)
+and once through MicroBatcher, and reports requests/sec plus the batcher's
+batch-size and queue-wait metrics.
+
+Usage (from backend/):
+    python benchmarks/bench_micro_batching.py [--requests 256] [--clients 1 8 32]
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(script_dir))  # Make app/ importable
+
+os.environ.setdefault("USE_CUDA", "false")
+
+from app.core.micro_batcher import MicroBatcher
+
+SAMPLE_QUESTIONS = [
+    "How do I activate my credit card?",
+    "Pano i-activate ang credit card ko?",
+    "Paano magbukas ng savings account sa BPI?",
+    "My online banking is locked and I need to pay my bills today!",
+    "What are the requirements for a BPI housing loan?",
+    "Nawala ang ATM card ko, ano ang gagawin ko?",
+    "How much is the annual fee of BPI Amore Cashback card?",
+    "Saan ang pinakamalapit na BPI branch sa Makati?",
+]
+
+
+async def run_clients(call, clients: int, total_requests: int) -> float:
+    """Run total_requests split across `clients` concurrent loops, return requests/sec"""
+    per_client = total_requests // clients
+
+    async def client(offset: int):
+        for i in range(per_client):
+            await call(SAMPLE_QUESTIONS[(offset + i) % len(SAMPLE_QUESTIONS)])
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(c) for c in range(clients)))
+    return per_client * clients / (time.perf_counter() - start)
+
+
+async def bench_model(name: str, single_fn, batch_fn, clients_list, total_requests):
+    # Baseline: every request is its own batch-of-one forward pass. One worker
+    # thread mirrors a single model instance being used by each request in turn.
+    executor = ThreadPoolExecutor(max_workers=1)
+    loop = asyncio.get_running_loop()
+
+    async def unbatched(q):
+        return await loop.run_in_executor(executor, single_fn, q)
+
+    print(f"\n{name}")
+    print(f"{'clients':>8s} {'unbatched rps':>14s} {'batched rps':>12s} {'speedup':>8s} "
+          f"{'mean batch':>11s} {'mean wait ms':>13s}")
+
+    for clients in clients_list:
+        baseline = await run_clients(unbatched, clients, total_requests)
+        batcher = MicroBatcher(batch_fn, name=name)
+        batched = await run_clients(batcher.submit, clients, total_requests)
+        stats = batcher.stats.to_dict()
+        batcher.close()
+        print(f"{clients:8d} {baseline:14.1f} {batched:12.1f} {batched / baseline:7.2f}x "
+              f"{stats['mean_batch_size']:11.2f} {stats['mean_queue_wait_ms']:13.2f}")
+
+    executor.shutdown()
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=256)
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 32])
+    args = parser.parse_args()
+
+    from app.config import settings
+    from app.core.vector_database import VectorDatabase
+    print(f"max batch size: {settings.MICRO_BATCH_MAX_SIZE}, max wait: {settings.MICRO_BATCH_MAX_WAIT_MS} ms")
+
+    if settings.SHARED_CLASSIFIER_BACKBONE:
+        from app.core.multi_head_detector import MultiHeadDetector
+        detector = MultiHeadDetector()
+        await bench_model("classifiers (shared backbone)", detector.predict, detector.predict_batch,
+                          args.clients, args.requests)
+    else:
+        from app.core.language_model import LanguageDetector
+        from app.core.emotion_model import EmotionDetector
+        for detector in (LanguageDetector(), EmotionDetector()):
+            await bench_model(type(detector).__name__, detector.predict, detector.predict_batch,
+                              args.clients, args.requests)
+
+    vector_db = VectorDatabase()
+    await bench_model("query embedder", lambda q: vector_db.encode_queries([q])[0], vector_db.encode_queries,
+                      args.clients, args.requests)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
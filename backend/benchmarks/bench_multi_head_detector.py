@@ -0,0 +1,130 @@
+"""
+Benchmark: separate LanguageDetector + EmotionDetector vs the shared-backbone MultiHeadDetector
+
+Checks that both paths return the same labels/confidences, then reports
+per-question latency and process RSS for each mode on CPU. Each mode runs in
+its own subprocess so the RSS numbers are not polluted by the other mode.
+
+Usage (from backend/):
+    python benchmarks/bench_multi_head_detector.py [--runs 50]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import statistics
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.dirname(script_dir)
+sys.path.insert(0, backend_dir)  # Make app/ importable
+
+os.environ.setdefault("USE_CUDA", "false")
+
+SAMPLE_QUESTIONS = [
+    "How do I activate my credit card?",
+    "Pano i-activate ang credit card ko?",
+    "Paano magbukas ng savings account sa BPI?",
+    "My online banking is locked and I need to pay my bills today!",
+    "Thank you so much for the help with my loan",
+    "Hindi ko maintindihan yung fees ng Bizlink",
+    "What are the requirements for a BPI housing loan?",
+    "Nawala ang ATM card ko, ano ang gagawin ko?",
+]
+
+
+def _rss_mb() -> float:
+    import psutil
+    return psutil.Process().memory_info().rss / (1024 * 1024)
+
+
+def run_mode(mode: str, runs: int) -> dict:
+    """Load one mode, predict on the sample set and report timings (runs in a subprocess)"""
+    import torch
+    torch.set_grad_enabled(False)
+
+    rss_before = _rss_mb()
+    load_start = time.perf_counter()
+    if mode == "separate":
+        from app.core.language_model import LanguageDetector
+        from app.core.emotion_model import EmotionDetector
+        language_detector = LanguageDetector()
+        emotion_detector = EmotionDetector()
+        predict = lambda q: (language_detector.predict(q), emotion_detector.predict(q))
+    else:
+        from app.core.multi_head_detector import MultiHeadDetector
+        detector = MultiHeadDetector()
+        predict = detector.predict
+    load_time = time.perf_counter() - load_start
+
+    predictions = [predict(q) for q in SAMPLE_QUESTIONS]  # also warms up
+
+    latencies = []
+    for _ in range(runs):
+        for q in SAMPLE_QUESTIONS:
+            start = time.perf_counter()
+            predict(q)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    latencies.sort()
+    return {
+        "mode": mode,
+        "load_time_s": load_time,
+        "rss_mb": _rss_mb(),
+        "rss_delta_mb": _rss_mb() - rss_before,
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1],
+        "mean_ms": statistics.mean(latencies),
+        "predictions": predictions,
+    }
+
+
+def _spawn(mode: str, runs: int) -> dict:
+    output = subprocess.run(
+        [sys.executable, __file__, "--mode", mode, "--runs", str(runs)],
+        capture_output=True, text=True, cwd=backend_dir, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", choices=["separate", "shared"])
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--tolerance", type=float, default=1e-4)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_mode(args.mode, args.runs)))
+        return
+
+    separate = _spawn("separate", args.runs)
+    shared = _spawn("shared", args.runs)
+
+    print("=" * 50)
+    print("PARITY")
+    print("=" * 50)
+    mismatches = 0
+    for q, (s_lang, s_emo), (m_lang, m_emo) in zip(SAMPLE_QUESTIONS, separate["predictions"], shared["predictions"]):
+        ok = (s_lang[0] == m_lang[0] and s_emo[0] == m_emo[0]
+              and abs(s_lang[1] - m_lang[1]) <= args.tolerance
+              and abs(s_emo[1] - m_emo[1]) <= args.tolerance)
+        mismatches += 0 if ok else 1
+        print(f"{'✓' if ok else '✗'} {q[:45]:45s} {s_lang[0]}/{s_emo[0]}  "
+              f"Δlang={abs(s_lang[1] - m_lang[1]):.2e} Δemo={abs(s_emo[1] - m_emo[1]):.2e}")
+
+    print("\n" + "=" * 50)
+    print("CPU LATENCY / MEMORY")
+    print("=" * 50)
+    print(f"{'mode':10s} {'load s':>8s} {'p50 ms':>8s} {'p95 ms':>8s} {'RSS MB':>8s}")
+    for r in (separate, shared):
+        print(f"{r['mode']:10s} {r['load_time_s']:8.2f} {r['p50_ms']:8.2f} {r['p95_ms']:8.2f} {r['rss_mb']:8.0f}")
+    print(f"\nLatency saving: {(1 - shared['p50_ms'] / separate['p50_ms']) * 100:.1f}% (p50)")
+    print(f"RSS saving: {separate['rss_mb'] - shared['rss_mb']:.0f} MB")
+
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Benchmark: throughput and memory of 1..N prefork uvicorn workers
+
+For each worker count, this starts the server the way start_claire.py does in
+prefork mode: the index is built once, and workers load it memory-mapped with
+the cores split between them. It waits until every worker has started, then keeps
+--clients concurrent requests in flight for --duration seconds. It reports:
+  - requests/s and p50 / p95 latency,
+  - total RSS of the server process tree, which counts shared mapped pages
+    once per process and so overstates real usage,
+  - total PSS (Linux), where shared pages are split between the processes
+    mapping them. This is the number that should grow far slower than N
+    times the single-worker figure.
+
+Usage (from backend/):
+    python benchmarks/bench_prefork_workers.py [--workers 1 2 4] [--clients 8] [--duration 60]
+    python benchmarks/bench_prefork_workers.py --endpoint retrieve   # retrieval only, no LLM
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+import threading
+import subprocess
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.dirname(script_dir)
+sys.path.insert(0, backend_dir)  # Make app/ importable
+
+import psutil
+import requests
+
+SAMPLE_QUESTIONS = [
+    "How do I activate my credit card?",
+    "Pano i-activate ang credit card ko?",
+    "What are the requirements for a BPI housing loan?",
+    "Nawala ang ATM card ko, ano ang gagawin ko?",
+]
+
+
+def worker_environment(workers: int) -> dict:
+    """Environment start_claire.py gives prefork workers"""
+    cpus = max(multiprocessing.cpu_count() // workers, 1)
+    env = dict(os.environ)
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        env[var] = str(cpus)
+    env.update({
+        "LLAMA_CPP_THREADS": str(max(cpus - 1, 1)),
+        "USE_MMAP": "true",
+        "VECTOR_INDEX_MMAP": "true",
+        "BUILD_INDEX_ON_STARTUP": "false",
+        "KB_WATCH_ENABLED": "false",
+        "TOKENIZERS_PARALLELISM": "false",
+    })
+    return env
+
+
+def tree_memory_mb(pid: int) -> tuple:
+    """(RSS, PSS) summed over the process and its children; PSS is 0 where unsupported"""
+    parent = psutil.Process(pid)
+    rss = pss = 0
+    for proc in [parent, *parent.children(recursive=True)]:
+        try:
+            info = proc.memory_full_info()
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+        rss += info.rss
+        pss += getattr(info, 'pss', 0)
+    return rss / (1024 * 1024), pss / (1024 * 1024)
+
+
+def request_once(session: requests.Session, base_url: str, endpoint: str, i: int) -> float:
+    question = SAMPLE_QUESTIONS[i % len(SAMPLE_QUESTIONS)]
+    start = time.perf_counter()
+    if endpoint == "chat":
+        response = session.post(f"{base_url}/api/v1/chat/chat", json={"question": question}, timeout=600)
+    else:
+        response = session.post(f"{base_url}/api/v1/retrieve/batch", json=[question], timeout=60)
+    response.raise_for_status()
+    return time.perf_counter() - start
+
+
+def wait_ready(server: subprocess.Popen, workers: int, timeout: float):
+    """Wait until every worker has finished its lifespan startup (uvicorn logs it once per worker)"""
+    started = threading.Semaphore(0)
+
+    def read_log():
+        for line in server.stderr:
+            if "Application startup complete" in line:
+                started.release()
+
+    threading.Thread(target=read_log, daemon=True).start()
+    deadline = time.time() + timeout
+    for _ in range(workers):
+        if not started.acquire(timeout=max(deadline - time.time(), 0)):
+            raise TimeoutError("Server workers did not start in time")
+
+
+def run(workers: int, args) -> dict:
+    env = worker_environment(workers)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(args.port),
+         "--workers", str(workers), "--log-level", "info"],
+        cwd=backend_dir, env=env, stderr=subprocess.PIPE, text=True
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        wait_ready(server, workers, args.startup_timeout)
+        session = requests.Session()
+        for i in range(workers * 2):
+            request_once(session, base_url, args.endpoint, i)  # Warm-up (lazy model loads, first prefill)
+        rss_idle, pss_idle = tree_memory_mb(server.pid)
+
+        latencies = []
+        stop_at = time.time() + args.duration
+
+        def client(offset: int):
+            client_session = requests.Session()
+            i = offset
+            while time.time() < stop_at:
+                latencies.append(request_once(client_session, base_url, args.endpoint, i))
+                i += 1
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.clients) as pool:
+            list(pool.map(client, range(args.clients)))
+        elapsed = time.perf_counter() - start
+        rss_load, pss_load = tree_memory_mb(server.pid)
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+
+    latencies.sort()
+    return {
+        "workers": workers,
+        "requests": len(latencies),
+        "rps": len(latencies) / elapsed,
+        "p50": statistics.median(latencies) * 1000,
+        "p95": latencies[int(len(latencies) * 0.95)] * 1000,
+        "rss_idle": rss_idle,
+        "pss_idle": pss_idle,
+        "rss_load": rss_load,
+        "pss_load": pss_load,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=60)
+    parser.add_argument("--endpoint", choices=["chat", "retrieve"], default="chat")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--startup-timeout", type=float, default=600)
+    args = parser.parse_args()
+
+    # Build the shared index once, as start_claire.py does
+    subprocess.run([sys.executable, "build_index.py"], cwd=backend_dir, check=True)
+
+    results = [run(workers, args) for workers in args.workers]
+    print(f"\n{args.endpoint}, {args.clients} clients, {args.duration:.0f}s per run, "
+          f"{multiprocessing.cpu_count()} cores")
+    print(f"{'workers':>7s} {'req/s':>7s} {'p50 ms':>8s} {'p95 ms':>8s} {'RSS MB':>8s} {'PSS MB':>8s} "
+          f"{'RSS load':>9s} {'PSS load':>9s}")
+    for r in results:
+        print(f"{r['workers']:7d} {r['rps']:7.2f} {r['p50']:8.0f} {r['p95']:8.0f} {r['rss_idle']:8.0f} "
+              f"{r['pss_idle']:8.0f} {r['rss_load']:9.0f} {r['pss_load']:9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark: prompt-lookup speculative decoding vs plain decoding
+
+Asks --questions real knowledge-base questions (section titles), each with
+its retrieved contexts. Each question is answered once with plain decoding
+and once per --draft-tokens setting, all greedy (temperature 0). The same
+llama.cpp context is used throughout; only its draft model is swapped.
+Reports per setting:
+  - decode tokens/s (after the first token) and mean time to first token,
+  - draft acceptance rate and tokens per decode step,
+  - how many answers are identical to plain decoding (should be all).
+
+Usage (from backend/):
+    python benchmarks/bench_speculative_decoding.py [--questions 12] [--draft-tokens 4 10 16] [--max-tokens 256]
+"""
+import os
+import re
+import sys
+import argparse
+import statistics
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(script_dir))  # Make app/ importable
+
+
+def kb_questions(documents: list, n: int) -> list:
+    """n section titles spread evenly over the knowledge base, without their "12." numbering"""
+    titles = [re.sub(r'^\d+\.\s*', '', doc['title']) for doc in documents]
+    step = max(len(titles) // n, 1)
+    return titles[::step][:n]
+
+
+def run(generator, prepared: list, draft_model) -> list:
+    generator.model.draft_model = draft_model
+    results = []
+    for question, contexts in prepared:
+        done = list(generator.generate_answer_stream(question, "english", "neutral", contexts))[-1]
+        results.append(done)
+    return results
+
+
+def summarize(label: str, results: list, baseline: list, draft=None):
+    from app.core.speculative import speculation_stats
+
+    generated = [r for r in results if r['method'] == 'claire_rag' and r['tokens_per_second']]
+    tps = statistics.mean(r['tokens_per_second'] for r in generated) if generated else 0.0
+    ttft = statistics.mean(r['time_to_first_token'] for r in generated) if generated else 0.0
+    identical = sum(r['answer'] == b['answer'] for r, b in zip(results, baseline))
+    stats = speculation_stats([draft]) if draft is not None else {}
+    acceptance = stats.get('acceptance_rate')
+    per_step = stats.get('tokens_per_step')
+    print(f"{label:>10s} {len(generated):5d} {tps:9.1f} {ttft * 1000:9.0f} "
+          f"{(f'{acceptance:.1%}' if acceptance is not None else '-'):>10s} "
+          f"{(f'{per_step:.2f}' if per_step is not None else '-'):>10s} {identical:5d}/{len(results)}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--questions", type=int, default=12)
+    parser.add_argument("--draft-tokens", type=int, nargs="+", default=[4, 10, 16])
+    parser.add_argument("--ngram", type=int, default=2, help="SPECULATIVE_NGRAM_SIZE")
+    parser.add_argument("--max-tokens", type=int, default=256)
+    args = parser.parse_args()
+
+    from app.config import settings
+    settings.SPECULATIVE_DECODING = True  # Contexts keep all-position logits, needed to verify drafts
+    settings.MODEL_TEMPERATURE = 0.0  # Greedy: drafts must not change the answer
+    settings.MODEL_MAX_TOKENS = args.max_tokens
+    settings.ADAPTIVE_MAX_TOKENS = False  # Same answer length in every run
+    settings.GENERATION_SLOTS = 1
+
+    from app.core.answer_generator import AnswerGenerator
+    from app.core.knowledge_base import KnowledgeBaseProcessor
+    from app.core.speculative import PromptLookupDraft
+    from app.core.vector_database import VectorDatabase
+
+    documents = KnowledgeBaseProcessor(settings.KNOWLEDGE_BASE_PATH).process_all_files()
+    vector_db = VectorDatabase()
+    vector_db.build_index(documents)
+    generator = AnswerGenerator()
+    if generator.model is None:
+        print("GGUF model not loaded - nothing to benchmark")
+        sys.exit(1)
+    if not isinstance(generator.model.draft_model, PromptLookupDraft):
+        print("Prompt-lookup decoding is not available in this llama-cpp-python")
+        sys.exit(1)
+
+    prepared = [
+        (q, [{'content': d['content'], 'title': d['title'], 'score': d['score']} for d in vector_db.search(q, top_k=4)])
+        for q in kb_questions(documents, args.questions)
+    ]
+    run(generator, prepared[:1], None)  # Warm-up (page in weights)
+
+    baseline = run(generator, prepared, None)
+    print(f"\n{len(prepared)} questions, greedy, max_tokens={args.max_tokens}, n-gram {args.ngram}")
+    print(f"{'draft':>10s} {'LLM':>5s} {'decode t/s':>9s} {'TTFT ms':>9s} {'accepted':>10s} {'tok/step':>10s} {'same':>9s}")
+    summarize("none", baseline, baseline)
+    for draft_tokens in args.draft_tokens:
+        draft = PromptLookupDraft(max_ngram_size=args.ngram, num_pred_tokens=draft_tokens)
+        summarize(str(draft_tokens), run(generator, prepared, draft), baseline, draft)
+
+
+if __name__ == "__main__":
+    main()
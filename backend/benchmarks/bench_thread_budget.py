@@ -0,0 +1,158 @@
+"""
+Benchmark: oversubscribed thread pools vs the CPU thread budget under mixed load
+
+Starts the server once per configuration:
+  - oversubscribed: THREAD_BUDGET_ENABLED=false, with the previous defaults
+    (OMP/MKL threads = all cores, llama.cpp threads = cores - 1, two OCR
+    workers),
+  - budgeted: THREAD_BUDGET_ENABLED=true,
+  - budgeted+affinity: the same, with each engine pinned to its cores
+    (Linux; --affinity).
+Each configuration gets --chat-clients concurrent /chat requests and
+--upload-clients concurrent image uploads (OCR). The uploads are a
+generated page of text. The benchmark reports p50 / p95 / p99 latency and
+throughput per request type. For the budgeted runs it also prints the
+allocation from /api/v1/health/threads.
+
+Usage (from backend/):
+    python benchmarks/bench_thread_budget.py [--chat-clients 4] [--upload-clients 2] [--duration 120] [--affinity]
+"""
+import io
+import os
+import sys
+import time
+import argparse
+import threading
+import subprocess
+import multiprocessing
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.dirname(script_dir)
+sys.path.insert(0, backend_dir)  # Make app/ importable
+
+import requests
+from bench_prefork_workers import SAMPLE_QUESTIONS, wait_ready
+
+
+def sample_image() -> bytes:
+    """A PNG page of text for the OCR path"""
+    from PIL import Image, ImageDraw
+
+    image = Image.new("RGB", (1200, 900), "white")
+    draw = ImageDraw.Draw(image)
+    for line in range(30):
+        draw.text((40, 20 + line * 28), f"Statement line {line}: account 1234-5678, amount PHP {line * 137.5:,.2f}",
+                  fill="black")
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def configurations(affinity: bool) -> list:
+    cores = multiprocessing.cpu_count()
+    oversubscribed = {
+        "THREAD_BUDGET_ENABLED": "false",
+        "OMP_NUM_THREADS": str(cores),
+        "MKL_NUM_THREADS": str(cores),
+        "LLAMA_CPP_THREADS": str(max(cores - 1, 1)),
+    }
+    budgeted = {"THREAD_BUDGET_ENABLED": "true", "THREAD_BUDGET_AFFINITY": "false"}
+    configs = [("oversubscribed", oversubscribed), ("budgeted", budgeted)]
+    if affinity:
+        configs.append(("budgeted+affinity", {**budgeted, "THREAD_BUDGET_AFFINITY": "true"}))
+    return configs
+
+
+def percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * q), len(values) - 1)] * 1000
+
+
+def run(label: str, overrides: dict, args, image: bytes) -> dict:
+    env = {**os.environ, "KB_WATCH_ENABLED": "false", "TOKENIZERS_PARALLELISM": "false", **overrides}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(args.port),
+         "--log-level", "info"],
+        cwd=backend_dir, env=env, stderr=subprocess.PIPE, text=True
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    latencies = {"chat": [], "upload": []}
+    errors = {"chat": 0, "upload": 0}
+    try:
+        wait_ready(server, 1, args.startup_timeout)
+        allocation = requests.get(f"{base_url}/api/v1/health/threads", timeout=30).json()
+        requests.post(f"{base_url}/api/v1/chat/chat", json={"question": SAMPLE_QUESTIONS[0]}, timeout=600)  # Warm-up
+        stop_at = time.time() + args.duration
+
+        def chat_client(offset: int):
+            session = requests.Session()
+            i = offset
+            while time.time() < stop_at:
+                start = time.perf_counter()
+                response = session.post(f"{base_url}/api/v1/chat/chat",
+                                        json={"question": SAMPLE_QUESTIONS[i % len(SAMPLE_QUESTIONS)]}, timeout=600)
+                if response.ok:
+                    latencies["chat"].append(time.perf_counter() - start)
+                else:
+                    errors["chat"] += 1
+                i += 1
+
+        def upload_client(_):
+            session = requests.Session()
+            while time.time() < stop_at:
+                start = time.perf_counter()
+                response = session.post(f"{base_url}/api/v1/upload/extract-text",
+                                        files={"file": ("statement.png", image, "image/png")}, timeout=120)
+                if response.ok:
+                    latencies["upload"].append(time.perf_counter() - start)
+                else:
+                    errors["upload"] += 1
+
+        threads = [threading.Thread(target=chat_client, args=(i,)) for i in range(args.chat_clients)]
+        threads += [threading.Thread(target=upload_client, args=(i,)) for i in range(args.upload_clients)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+
+    return {"label": label, "latencies": latencies, "errors": errors, "elapsed": elapsed, "allocation": allocation}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chat-clients", type=int, default=4)
+    parser.add_argument("--upload-clients", type=int, default=2)
+    parser.add_argument("--duration", type=float, default=120)
+    parser.add_argument("--affinity", action="store_true", help="Also run with THREAD_BUDGET_AFFINITY=true")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--startup-timeout", type=float, default=600)
+    args = parser.parse_args()
+
+    image = sample_image()
+    results = [run(label, overrides, args, image) for label, overrides in configurations(args.affinity)]
+
+    print(f"\n{multiprocessing.cpu_count()} cores, {args.chat_clients} chat + {args.upload_clients} upload clients, "
+          f"{args.duration:.0f}s per configuration")
+    print(f"{'configuration':18s} {'type':7s} {'done':>5s} {'err':>4s} {'req/s':>6s} "
+          f"{'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s}")
+    for r in results:
+        for kind in ("chat", "upload"):
+            values = r["latencies"][kind]
+            print(f"{r['label']:18s} {kind:7s} {len(values):5d} {r['errors'][kind]:4d} {len(values) / r['elapsed']:6.2f} "
+                  f"{percentile(values, 0.5):8.0f} {percentile(values, 0.95):8.0f} {percentile(values, 0.99):8.0f}")
+
+    for r in results:
+        if r["allocation"].get("enabled"):
+            engines = ", ".join(f"{engine}={info['threads']}" for engine, info in r["allocation"]["engines"].items())
+            print(f"\n{r['label']} allocation: {engines} (torch threads {r['allocation']['torch_threads']})")
+
+
+if __name__ == "__main__":
+    main()
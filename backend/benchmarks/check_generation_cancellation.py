@@ -0,0 +1,106 @@
+"""
+Check: a generation that overruns its timeout returns within the timeout
+
+Loads the GGUF model with its generation timeout set to --timeout and asks a
+question over the longest knowledge-base sections with a large max_tokens,
+so the answer cannot finish in time. The check passes only if:
+  - generate_answer() and generate_answer_stream() each return the
+    retrieval-only fallback (timeout=True) within timeout + --slack seconds;
+    the slack covers one prefill chunk or decode step,
+  - a CancelToken cancelled from another thread (client gone) stops the
+    generation just as quickly,
+  - the generation slot is free again right afterwards.
+Exits non-zero on failure.
+
+Usage (from backend/):
+    python benchmarks/check_generation_cancellation.py [--timeout 3] [--slack 1.5]
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(script_dir))  # Make app/ importable
+
+QUESTION = "Explain every fee, requirement and step mentioned in these documents in full detail."
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--timeout", type=float, default=3.0)
+    parser.add_argument("--slack", type=float, default=1.5, help="Allowed overrun past the timeout (seconds)")
+    args = parser.parse_args()
+
+    from app.config import settings
+    settings.MODEL_MAX_TOKENS = 1024
+    settings.ADAPTIVE_MAX_TOKENS = False  # Otherwise the answer is sized to finish within the timeout
+    settings.GENERATION_SLOTS = 1
+
+    from app.core.answer_generator import AnswerGenerator
+    from app.core.cancellation import CancelToken
+    from app.core.knowledge_base import KnowledgeBaseProcessor
+
+    documents = KnowledgeBaseProcessor(settings.KNOWLEDGE_BASE_PATH).process_all_files()
+    longest = sorted(documents, key=lambda d: len(d['content']), reverse=True)[:4]
+    contexts = [{'content': d['content'], 'title': d['title'], 'score': 0.9 - 0.1 * i} for i, d in enumerate(longest)]
+
+    generator = AnswerGenerator()
+    if generator.scheduler is None:
+        print("GGUF model not loaded - nothing to check")
+        sys.exit(1)
+    generator.generation_timeout = args.timeout  # MODEL_INFERENCE_TIMEOUT is a read-only property
+    generator.generate_answer("Hello there, what is BPI?", "english", "neutral", contexts[:1])  # Warm-up
+
+    def blocking(cancel=None):
+        return generator.generate_answer(QUESTION, "english", "neutral", contexts, cancel=cancel)
+
+    def streaming(cancel=None):
+        return list(generator.generate_answer_stream(QUESTION, "english", "neutral", contexts, cancel=cancel))[-1]
+
+    def client_gone(run):
+        token = CancelToken()
+        # Before the generation's own timeout, so the disconnect is what stops it
+        threading.Timer(args.timeout / 2, token.cancel, args=("client disconnected",)).start()
+        return run(token)
+
+    cases = [
+        ("generate_answer, timeout", lambda: blocking(), True),
+        ("generate_answer_stream, timeout", lambda: streaming(), True),
+        ("generate_answer, cancelled", lambda: client_gone(blocking), False),
+        ("generate_answer_stream, cancelled", lambda: client_gone(streaming), False),
+    ]
+
+    failures = 0
+    for label, run, expect_timeout in cases:
+        generator.last_timeout = 0  # No cooldown between cases
+        start = time.perf_counter()
+        result = run()
+        wall = time.perf_counter() - start
+
+        slot_free = generator.scheduler.stats()['busy_slots'] == 0
+        try:
+            generator.scheduler.release(generator.scheduler.acquire(timeout=0.1))
+        except Exception:
+            slot_free = False
+
+        problems = []
+        if wall > args.timeout + args.slack:
+            problems.append(f"took {wall:.2f}s, limit {args.timeout + args.slack:.2f}s")
+        if result['cancelled'] is None:
+            problems.append("generation finished before the timeout; lower --timeout")
+        elif result['timeout'] != expect_timeout:
+            problems.append(f"timeout={result['timeout']}, expected {expect_timeout}")
+        if not slot_free:
+            problems.append("generation slot still busy")
+
+        failures += bool(problems)
+        print(f"{'FAIL' if problems else 'ok  '} {label:36s} {wall:6.2f}s  method={result['method']}"
+              + (f"  ({'; '.join(problems)})" if problems else ""))
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+Build the knowledge base index (FAISS, BM25 and document store) into VECTOR_STORE_PATH
+
+The server normally builds it on startup. In prefork mode (SERVER_WORKERS > 1)
+start_claire.py runs this once before the workers start, and the workers load
+and memory-map the result instead of each rebuilding it.
+
+Usage (from backend/):
+    python build_index.py
+"""
+import os
+import sys
+import time
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, script_dir)  # Make app/ importable
+
+
+def main():
+    from app.config import settings
+    from app.core.knowledge_base import KnowledgeBaseProcessor
+    from app.core.vector_database import VectorDatabase
+
+    start = time.perf_counter()
+    kb_processor = KnowledgeBaseProcessor(settings.KNOWLEDGE_BASE_PATH)
+    documents = kb_processor.process_all_files()
+    if not documents:
+        print(f"✗ No sections found in {settings.KNOWLEDGE_BASE_PATH}")
+        sys.exit(1)
+
+    vector_db = VectorDatabase()
+    vector_db.build_index(documents, lexical_index=kb_processor.build_lexical_index())
+
+    info = vector_db.index_info()
+    stats = vector_db.last_build_stats
+    print(f"✓ {info['documents']} sections indexed as {info['index_type']} "
+          f"({stats.get('cache_hits', 0)} embeddings reused, {stats.get('encoded', 0)} encoded) "
+          f"in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
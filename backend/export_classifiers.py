@@ -0,0 +1,59 @@
+"""
+Export the language and emotion classifiers to ONNX (int8 dynamic quantization by default)
+
+The exports land in CLASSIFIER_EXPORT_DIR, keyed by the .pt checkpoints, and
+are picked up by CLASSIFIER_BACKEND=onnx. The server also exports on first
+start; running this ahead of time keeps that out of startup.
+
+Usage (from backend/):
+    python export_classifiers.py [--force] [--no-quantize]
+"""
+import os
+import sys
+import argparse
+from pathlib import Path
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, script_dir)  # Make app/ importable
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--force", action="store_true", help="Delete existing exports first")
+    parser.add_argument("--no-quantize", action="store_true", help="Keep the fp32 ONNX model")
+    args = parser.parse_args()
+
+    os.environ["CLASSIFIER_BACKEND"] = "onnx"
+    os.environ["CLASSIFIER_ONNX_QUANTIZE"] = "false" if args.no_quantize else "true"
+    os.environ.setdefault("DEVICE", "cpu")
+
+    from app.config import settings
+
+    export_dir = Path(settings.CLASSIFIER_EXPORT_DIR)
+    if args.force and export_dir.exists():
+        for path in export_dir.glob("*.onnx"):
+            path.unlink()
+            print(f"Removed {path.name}")
+
+    if settings.SHARED_CLASSIFIER_BACKBONE:
+        from app.core.multi_head_detector import MultiHeadDetector
+        runners = [MultiHeadDetector().runner]
+    else:
+        from app.core.language_model import LanguageDetector
+        from app.core.emotion_model import EmotionDetector
+        runners = [LanguageDetector().model, EmotionDetector().model]
+
+    failed = False
+    for runner in runners:
+        if runner.backend != "onnx":
+            print("✗ Export failed, see the log above")
+            failed = True
+        else:
+            size_mb = Path(runner.location).stat().st_size / (1024 * 1024)
+            print(f"✓ {runner.location} ({size_mb:.0f} MB)")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -40,10 +40,21 @@ def detect_hardware():
     
     return has_gpu, cpu_count
 
+def server_workers():
+    """Number of uvicorn worker processes (SERVER_WORKERS, default 1)"""
+    try:
+        return max(int(os.environ.get("SERVER_WORKERS", "1")), 1)
+    except ValueError:
+        return 1
+
 def optimize_settings():
     """Set environment variables for optimal performance based on hardware"""
     has_gpu, cpu_count = detect_hardware()
     
+    # Prefork workers each get an equal share of the cores
+    workers = server_workers()
+    worker_cpus = max(cpu_count // workers, 1)
+    
     # Read current env settings
     use_cuda = os.environ.get("USE_CUDA", "auto").lower()
     
@@ -61,16 +72,16 @@ def optimize_settings():
     # Thread optimization for CPU operations
     threads = os.environ.get("OMP_NUM_THREADS", "auto")
     if threads == "auto":
-        os.environ["OMP_NUM_THREADS"] = str(cpu_count)
-        os.environ["MKL_NUM_THREADS"] = str(cpu_count)
-        os.environ["NUMEXPR_NUM_THREADS"] = str(cpu_count)
-        os.environ["VECLIB_MAXIMUM_THREADS"] = str(cpu_count)
-        os.environ["OPENBLAS_NUM_THREADS"] = str(cpu_count)
+        os.environ["OMP_NUM_THREADS"] = str(worker_cpus)
+        os.environ["MKL_NUM_THREADS"] = str(worker_cpus)
+        os.environ["NUMEXPR_NUM_THREADS"] = str(worker_cpus)
+        os.environ["VECLIB_MAXIMUM_THREADS"] = str(worker_cpus)
+        os.environ["OPENBLAS_NUM_THREADS"] = str(worker_cpus)
         
     # Set llama-cpp threads if auto
     llama_threads = os.environ.get("LLAMA_CPP_THREADS", "auto")
     if llama_threads == "auto":
-        os.environ["LLAMA_CPP_THREADS"] = str(max(cpu_count - 1, 1))
+        os.environ["LLAMA_CPP_THREADS"] = str(max(worker_cpus - 1, 1))
     
     # Disable GPU if not available but requested
     if use_cuda == "true" and not has_gpu:
@@ -176,6 +187,26 @@ def check_requirements():
     
     return issues, warnings
 
+def prepare_prefork(workers):
+    """
+    Build the shared artifacts once, before the workers start. Each worker then
+    loads its models after the fork and maps the same files read-only: the GGUF
+    weights (use_mmap), the FAISS index and the document store are held once
+    in the page cache instead of once per worker.
+    """
+    print(f"\n✓ Prefork mode: {workers} workers, {os.environ.get('OMP_NUM_THREADS')} threads each")
+    os.environ["USE_MMAP"] = "true"
+    os.environ["VECTOR_INDEX_MMAP"] = "true"
+    os.environ["BUILD_INDEX_ON_STARTUP"] = "false"
+    # Every worker would rebuild the same files on each change
+    os.environ["KB_WATCH_ENABLED"] = "false"
+    
+    print("  Building the knowledge base index...")
+    subprocess.run([sys.executable, "build_index.py"], cwd=script_dir, check=True)
+    if os.environ.get("CLASSIFIER_BACKEND", "eager").lower() == "onnx":
+        print("  Exporting classifiers...")
+        subprocess.run([sys.executable, "export_classifiers.py"], cwd=script_dir, check=True)
+
 def display_configuration():
     """Display current configuration from environment"""
     print("\n" + "="*50)
@@ -187,6 +218,7 @@ def display_configuration():
     
     print(f"Device Mode: {device.upper()}")
     print(f"CUDA Enabled: {use_cuda}")
+    print(f"Server Workers: {server_workers()}")
     
     if device == "cuda":
         gpu_layers = os.environ.get("GPU_LAYERS", "35")
@@ -225,8 +257,10 @@ def start_server():
     display_configuration()
     
     try:
-        # Determine workers based on device
-        workers = "1"  # Single worker for model consistency
+        # Several workers share the mmapped weights and index; --reload needs a single process
+        workers = server_workers()
+        if workers > 1:
+            prepare_prefork(workers)
         
         print(f"\nStarting server on http://0.0.0.0:8000")
         print("API Docs available at: http://localhost:8000/docs")
@@ -247,11 +281,11 @@ def start_server():
             "app.main:app",
             "--host", "0.0.0.0",
             "--port", "8000",
-            "--reload",
+            *(["--reload"] if workers == 1 else []),
             "--log-level", "info",
             "--timeout-keep-alive", "300",
             "--timeout-graceful-shutdown", "30",
-            "--workers", workers,
+            "--workers", str(workers),
             "--limit-concurrency", "10"
         ], cwd=script_dir)
     except KeyboardInterrupt:
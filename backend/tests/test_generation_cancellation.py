@@ -0,0 +1,226 @@
+"""
+Generation stops within one token of its CancelToken firing
+
+A stub slot stands in for a llama.cpp context: eval() takes TOKEN_SECONDS
+per prompt chunk and the completion stream TOKEN_SECONDS per token, and it
+honours stopping_criteria like llama.cpp does. Run from backend/:
+    python -m pytest -q tests
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.config import settings
+from app.api.chat import chat_stream
+from app.core import answer_generator as answer_generator_module
+from app.core.answer_generator import AnswerGenerator
+from app.core.cancellation import CancelToken, Deadline
+from app.core.generation_scheduler import GenerationScheduler
+from app.core.stage_pool import StagePools
+from app.models import ChatRequest
+
+TOKEN_SECONDS = 0.05
+GENERATION_TIMEOUT = 0.5
+CANCEL_AFTER = 0.5
+SLACK = 0.25  # Thread wake-up and fallback formatting
+
+QUESTION = "What documents do I need to open a savings account?"
+CONTEXTS = [
+    {
+        'title': "Opening a savings account",
+        'content': "Bring one valid government-issued ID and proof of billing to any branch. " * 20,
+        'score': 0.91
+    }
+]
+
+
+class SlowSlot:
+    """Stands in for a llama.cpp context; one word is one token"""
+
+    def __init__(self):
+        self.n_tokens = 0
+        self._input_ids = []
+        self.generated = 0
+
+    def tokenize(self, text: bytes, add_bos: bool = False):
+        return ([1] if add_bos else []) + [2] * len(text.split())
+
+    def detokenize(self, tokens):
+        return b" ".join(b"word" for _ in tokens)
+
+    def eval(self, tokens):
+        time.sleep(TOKEN_SECONDS)
+        self.n_tokens += len(tokens)
+
+    def __call__(self, prompt, max_tokens=16, stopping_criteria=None, stream=False, **kwargs):
+        assert stream, "AnswerGenerator always streams from llama.cpp"
+        return self._stream(prompt, max_tokens, stopping_criteria or [])
+
+    def _stream(self, prompt, max_tokens, stopping_criteria):
+        for i in range(max_tokens):
+            time.sleep(TOKEN_SECONDS)
+            if any(criterion(prompt, None) for criterion in stopping_criteria):
+                return
+            self.generated += 1
+            yield {'choices': [{'text': f" word{i}"}]}
+
+
+@pytest.fixture
+def generator(monkeypatch):
+    monkeypatch.setattr(settings, "SKIP_MODEL_LOADING", True)
+    monkeypatch.setattr(settings, "ADAPTIVE_MAX_TOKENS", False)
+    # llama.cpp's StoppingCriteriaList is a list of callables; the stub calls them itself
+    monkeypatch.setattr(answer_generator_module, "StoppingCriteriaList", list, raising=False)
+
+    generator = AnswerGenerator()
+    slot = SlowSlot()
+    generator.model = slot
+    generator.models = [slot]
+    generator.scheduler = GenerationScheduler([slot], max_queue=settings.GENERATION_QUEUE_SIZE)
+    generator.generation_timeout = GENERATION_TIMEOUT
+    return generator
+
+
+@pytest.fixture
+def slow_prefill(monkeypatch):
+    """Prefill in 8-token chunks so the prompt alone outlasts the timeout and nothing is streamed"""
+    monkeypatch.setattr(settings, "MODEL_N_BATCH", 8)
+    monkeypatch.setattr(settings, "MODEL_N_BATCH_CPU", 8)
+
+
+def _generate(generator, stream: bool, cancel=None):
+    """Run one generation; returns the result, the streamed token texts and the wall time"""
+    start = time.perf_counter()
+    if stream:
+        events = list(generator.generate_answer_stream(QUESTION, "english", "neutral", CONTEXTS, cancel=cancel))
+        result = events[-1]
+        assert result['type'] == 'done'
+        tokens = [event['text'] for event in events[:-1]]
+    else:
+        result = generator.generate_answer(QUESTION, "english", "neutral", CONTEXTS, cancel=cancel)
+        tokens = []
+    return result, tokens, time.perf_counter() - start
+
+
+def test_generate_answer_stops_at_timeout(generator):
+    result, _, elapsed = _generate(generator, stream=False)
+
+    assert result['method'] == 'retrieval_only'
+    assert result['cancelled'] == 'timeout'
+    assert result['timeout'] is True
+    assert elapsed < GENERATION_TIMEOUT + TOKEN_SECONDS + SLACK
+    assert generator.model.generated < settings.MODEL_MAX_TOKENS
+    assert generator.scheduler.stats()['busy_slots'] == 0
+
+
+def test_generate_answer_stream_stops_at_timeout(generator, slow_prefill):
+    result, tokens, elapsed = _generate(generator, stream=True)
+
+    assert tokens == []
+    assert result['method'] == 'retrieval_only'
+    assert result['cancelled'] == 'timeout'
+    assert result['timeout'] is True
+    assert elapsed < GENERATION_TIMEOUT + TOKEN_SECONDS + SLACK
+    assert generator.scheduler.stats()['busy_slots'] == 0
+
+
+@pytest.mark.parametrize("stream", [False, True], ids=["generate_answer", "generate_answer_stream"])
+def test_cancel_token_stops_generation(generator, slow_prefill, stream):
+    generator.generation_timeout = 30
+    cancel = CancelToken()
+    threading.Timer(CANCEL_AFTER, cancel.cancel, args=("client disconnected",)).start()
+
+    result, tokens, elapsed = _generate(generator, stream=stream, cancel=cancel)
+
+    assert tokens == []
+    assert result['method'] == 'retrieval_only'
+    assert result['cancelled'] == 'client disconnected'
+    assert result['timeout'] is False
+    assert elapsed < CANCEL_AFTER + TOKEN_SECONDS + SLACK
+    assert generator.scheduler.stats()['busy_slots'] == 0
+
+
+def test_timeout_does_not_affect_next_generation(generator, monkeypatch):
+    _generate(generator, stream=False)
+    generator.last_timeout = 0  # Skip the cooldown the timeout started
+    generator.generation_timeout = 30
+    monkeypatch.setattr(settings, "MODEL_MAX_TOKENS", 8)
+
+    result, tokens, _ = _generate(generator, stream=True)
+
+    assert result['method'] == 'claire_rag'
+    assert result['cancelled'] is None
+    assert tokens
+    assert generator.scheduler.stats()['busy_slots'] == 0
+
+
+class ConnectedClient:
+    """The parts of a Starlette Request that /stream polls"""
+
+    async def is_disconnected(self) -> bool:
+        return False
+
+
+class StubClassifier:
+    def predict(self, text: str):
+        return "english", 0.9
+
+
+class StubVectorDB:
+    def lookup_query_embedding(self, query: str):
+        return None
+
+    def encode_queries(self, queries):
+        return [[0.0] for _ in queries]
+
+    def search(self, query: str, top_k: int = 4, query_embedding=None):
+        return [{**context, 'source': "savings.md"} for context in CONTEXTS]
+
+
+def test_stream_disconnect_mid_token_frees_slot(generator):
+    """Starlette cancels the response task on disconnect, while a pool thread is inside next(events)"""
+    generator.generation_timeout = 30
+
+    async def disconnect_mid_token():
+        pools = StagePools()
+        deadline = Deadline(60, route="/api/v1/chat/stream")
+        response = await chat_stream(
+            ChatRequest(question=QUESTION),
+            http_request=ConnectedClient(),
+            language_detector=StubClassifier(),
+            emotion_detector=StubClassifier(),
+            vector_db=StubVectorDB(),
+            answer_generator=generator,
+            multi_head_detector=None,
+            classifier_batcher=None,
+            embedding_batcher=None,
+            pools=pools,
+            deadline=deadline
+        )
+        chunks = []
+
+        async def consume():
+            async for chunk in response.body_iterator:
+                chunks.append(chunk)
+
+        task = asyncio.create_task(consume())
+        while sum(chunk.startswith("event: token") for chunk in chunks) < 3:
+            await asyncio.sleep(TOKEN_SECONDS / 5)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        cancelled_at = time.perf_counter()
+        while generator.scheduler.stats()['busy_slots'] and time.perf_counter() - cancelled_at < 5:
+            await asyncio.sleep(TOKEN_SECONDS / 5)
+        pools.close()
+        return deadline, time.perf_counter() - cancelled_at
+
+    deadline, released_after = asyncio.run(disconnect_mid_token())
+
+    assert deadline.reason == "client disconnected"
+    assert generator.scheduler.stats()['busy_slots'] == 0
+    assert released_after < TOKEN_SECONDS + SLACK
+    assert generator.model.generated < settings.MODEL_MAX_TOKENS